@@ -0,0 +1,212 @@
+"""Load test of ZooCalrissianRunner.execute() with the in-process fake backend
+
+Runs `jobs` executions of an app package, `concurrency` at a time, against a
+FakeBackend simulating the namespace creation, pod start, run and cleanup latencies.
+Reports the throughput, the runner overhead (execution wall time not spent in the
+simulated Kubernetes/Calrissian latencies), the monitoring latency (time between a
+job completion and its detection) and the cleanup throughput. Runs offline.
+
+With --asyncio, the executions run with ZooCalrissianRunner.execute_async() on a
+single event loop instead of one thread per execution.
+
+Usage:
+
+    python benchmarks/bench_execute.py --jobs 1000 --concurrency 200
+    python benchmarks/bench_execute.py --monitor-mode poll --run-latency 5
+    python benchmarks/bench_execute.py --jobs 1000 --concurrency 500 --asyncio
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from loguru import logger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from zoo_calrissian_runner import ZooCalrissianRunner, zoo  # noqa: E402
+from zoo_calrissian_runner.backends import FakeBackend  # noqa: E402
+from zoo_calrissian_runner.handlers import ExecutionHandler  # noqa: E402
+
+SIMULATED_PHASES = ["namespace_init", "upload", "queue_wait", "run", "dispose"]
+
+
+class NoOpHandler(ExecutionHandler):
+    def pre_execution_hook(self, **kwargs):
+        pass
+
+    def post_execution_hook(self, **kwargs):
+        pass
+
+    def get_secrets(self):
+        return None
+
+    def get_pod_env_vars(self):
+        return {}
+
+    def get_pod_node_selector(self):
+        return None
+
+    def handle_outputs(self, **kwargs):
+        pass
+
+    def get_additional_parameters(self):
+        return {}
+
+
+class NullZoo:
+    """replaces the zoo module, update_status is not thread-safe in the stub"""
+
+    SERVICE_SUCCEEDED = zoo.SERVICE_SUCCEEDED
+    SERVICE_FAILED = zoo.SERVICE_FAILED
+
+    def update_status(self, conf, progress):
+        pass
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else 0
+
+
+def run(args) -> dict:
+    with open(os.path.join(ROOT, "tests", "app-packages", "app-package-1.cwl"), "r") as stream:
+        cwl = yaml.safe_load(stream)
+
+    inputs = {
+        "pre_stac_item": {"value": "https://earth-search.aws.element84.com/v0/items/pre"},
+        "post_stac_item": {"value": "https://earth-search.aws.element84.com/v0/items/post"},
+        "aoi": {"value": "136.659,-35.96,136.923,-35.791"},
+    }
+
+    backend = FakeBackend(
+        namespace_latency=args.namespace_latency,
+        pod_start_latency=args.pod_start_latency,
+        run_latency=args.run_latency,
+        dispose_latency=args.dispose_latency,
+        retrieval_latency=args.retrieval_latency,
+        failure_rate=args.failure_rate,
+        seed=0,
+    )
+
+    overheads = []
+    dispose_times = []
+    lock = threading.Lock()
+
+    def create_runner():
+        conf = {"lenv": {"Identifier": "dnbr", "message": ""}, "main": {"tmpPath": "/tmp"}}
+        runner = ZooCalrissianRunner(
+            cwl=cwl,
+            conf=conf,
+            inputs=dict(inputs),
+            outputs={"Result": {"value": ""}},
+            execution_handler=NoOpHandler(conf=conf),
+            backend=backend,
+        )
+        runner.monitor_mode = args.monitor_mode
+        return runner
+
+    def record(runner, elapsed):
+        simulated = sum(runner.timer.timings.get(phase, 0) for phase in SIMULATED_PHASES)
+        with lock:
+            overheads.append(elapsed - simulated)
+            dispose_times.append(runner.timer.timings.get("dispose", 0))
+
+    def execute(index):
+        runner = create_runner()
+        start = time.perf_counter()
+        exit_value = runner.execute()
+        record(runner, time.perf_counter() - start)
+        return exit_value
+
+    async def execute_async(semaphore):
+        async with semaphore:
+            runner = create_runner()
+            start = time.perf_counter()
+            exit_value = await runner.execute_async()
+            record(runner, time.perf_counter() - start)
+            return exit_value
+
+    async def execute_all():
+        # the blocking calls of the runners run in the default executor of the event loop
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=args.executor_workers)
+        )
+        semaphore = asyncio.Semaphore(args.concurrency)
+        return await asyncio.gather(*(execute_async(semaphore) for _ in range(args.jobs)))
+
+    start = time.perf_counter()
+    if args.asyncio:
+        results = asyncio.run(execute_all())
+    else:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(execute, range(args.jobs)))
+    wall_time = time.perf_counter() - start
+
+    stats = backend.stats()
+    return {
+        "jobs": args.jobs,
+        "succeeded": results.count(zoo.SERVICE_SUCCEEDED),
+        "wall_time_s": wall_time,
+        "throughput_jobs_per_s": args.jobs / wall_time,
+        "runner_overhead_p50_ms": percentile(overheads, 0.5) * 1000,
+        "runner_overhead_p99_ms": percentile(overheads, 0.99) * 1000,
+        "monitor_latency_mean_ms": (stats["monitor_latency_mean"] or 0) * 1000,
+        "monitor_latency_max_ms": (stats["monitor_latency_max"] or 0) * 1000,
+        "namespaces_peak": stats["namespaces_peak"],
+        "namespaces_disposed": stats["namespaces_disposed"],
+        "cleanup_throughput_per_s": stats["namespaces_disposed"] / wall_time,
+        "dispose_mean_ms": statistics.mean(dispose_times) * 1000 if dispose_times else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--jobs", type=int, default=200, help="number of executions")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent executions")
+    parser.add_argument("--monitor-mode", default="watch", choices=["watch", "poll"])
+    parser.add_argument("--namespace-latency", type=float, default=0.5)
+    parser.add_argument("--pod-start-latency", type=float, default=0.5)
+    parser.add_argument("--run-latency", type=float, default=2.0)
+    parser.add_argument("--dispose-latency", type=float, default=0.5)
+    parser.add_argument("--retrieval-latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--asyncio", action="store_true", help="run the executions on one event loop with execute_async"
+    )
+    parser.add_argument(
+        "--executor-workers", type=int, default=64, help="event loop executor threads, with --asyncio"
+    )
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    for variable, template in [
+        ("WRAPPER_STAGE_IN", "stagein.yaml"),
+        ("WRAPPER_STAGE_OUT", "stageout.yaml"),
+        ("WRAPPER_MAIN", "maincwl.yaml"),
+        ("WRAPPER_RULES", "rules.yaml"),
+    ]:
+        os.environ.setdefault(variable, os.path.join(ROOT, "assets", template))
+    os.environ.setdefault("DEFAULT_MAX_CORES", "4")
+    os.environ.setdefault("DEFAULT_MAX_RAM", "4096")
+
+    import zoo_calrissian_runner
+
+    zoo_calrissian_runner.zoo = NullZoo()
+
+    for name, value in run(args).items():
+        print(f"{name:<30} {value:12.3f}" if isinstance(value, float) else f"{name:<30} {value:12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Benchmarks of the runner's work before the Calrissian job is submitted
+
+Times Workflow.__init__, get_workflow_inputs, eval_resource,
+ZooInputs.get_processing_parameters, assert_parameters and wrap() on the bundled
+app packages and on synthetic workflows with hundreds of steps. Runs offline.
+
+Usage:
+
+    python benchmarks/bench_pre_submission.py            # print the timings
+    python benchmarks/bench_pre_submission.py --save     # store them as baselines
+    python benchmarks/bench_pre_submission.py --compare  # fail on regressions
+    python benchmarks/bench_pre_submission.py --compare --threshold 1
+
+The timings are the best of `repeat` runs in milliseconds. A benchmark regresses if it
+is more than `threshold` (relative) and `min-delta` milliseconds slower than its baseline.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import yaml
+from loguru import logger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from zoo_calrissian_runner import Workflow, ZooCalrissianRunner  # noqa: E402
+from zoo_calrissian_runner.cache import parsed_cwl_cache, wrapped_cwl_cache  # noqa: E402
+
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines.json")
+
+APP_PACKAGES = {
+    "app-package-1": ("tests/app-packages/app-package-1.cwl", "dnbr"),
+    "app-package-2": ("tests/app-packages/app-package-2.cwl", "dnbr"),
+    "app-package-3": ("tests/app-packages/app-package-3.cwl", "dnbr"),
+    "app-package-4": ("tests/app-packages/app-package-4.cwl", "dnbr"),
+    "dNBR": ("app-packages/dNBR.cwl", "dnbr"),
+    "s2-composites": ("tests/app-s2-composites.0.1.0.cwl", "dnbr"),
+    "burned-area": ("tests/app-burned-area.1.0.cwl", "burned-area"),
+    "s-expression": ("tests/app-s-expression.dev.0.0.2.cwl", "s-expression"),
+}
+
+SYNTHETIC_SIZES = [100, 500]
+
+
+def synthetic_workflow(steps: int) -> dict:
+    """returns a workflow chaining `steps` command line tools with resource hints"""
+    tools = [
+        {
+            "class": "CommandLineTool",
+            "id": f"tool_{i}",
+            "requirements": {
+                "ResourceRequirement": {"coresMin": 1 + i % 4, "ramMin": 512 * (1 + i % 8)}
+            },
+            "baseCommand": "process",
+            "inputs": {"item": {"type": "string", "inputBinding": {"position": 1}}},
+            "outputs": {"result": {"type": "Directory", "outputBinding": {"glob": "."}}},
+        }
+        for i in range(steps)
+    ]
+    workflow_steps = {
+        f"step_{i}": {
+            "run": f"#tool_{i}",
+            "in": {"item": "item" if i == 0 else {"source": f"step_{i - 1}/result", "valueFrom": "x"}},
+            "out": ["result"],
+        }
+        for i in range(steps)
+    }
+    workflow = {
+        "class": "Workflow",
+        "id": "synthetic",
+        "requirements": [{"class": "StepInputExpressionRequirement"}],
+        "inputs": {"item": {"type": "string"}, "option": {"type": "string", "default": "a"}},
+        "outputs": {"result": {"type": "Directory", "outputSource": [f"step_{steps - 1}/result"]}},
+        "steps": workflow_steps,
+    }
+    return {"cwlVersion": "v1.0", "$graph": [workflow] + tools}
+
+
+def zoo_inputs(workflow: Workflow) -> dict:
+    """returns zoo inputs with a value for each workflow input"""
+    return {
+        inp.id.split("/")[-1]: {"value": "value", "dataType": "string"}
+        for inp in workflow.get_workflow().inputs
+    }
+
+
+def timeit(function, repeat, setup=None) -> float:
+    """returns the best wall time of function() in milliseconds, after a warm-up run
+
+    As with the timeit module, the garbage collector is disabled while timing.
+    """
+    timings = []
+    for _ in range(repeat + 1):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+    return min(timings[1:])
+
+
+def bench(name, cwl, workflow_id, repeat) -> dict:
+    conf = {"lenv": {"Identifier": workflow_id}, "main": {"tmpPath": "/tmp"}}
+
+    parsed_cwl_cache.clear()
+    workflow = Workflow(cwl, workflow_id)
+    inputs = zoo_inputs(workflow)
+    runner = ZooCalrissianRunner(cwl=cwl, conf=conf, inputs=inputs, outputs={})
+
+    def reset_resources():
+        workflow._resources = {}
+
+    results = {
+        "Workflow.__init__": timeit(
+            lambda: Workflow(cwl, workflow_id), repeat, setup=parsed_cwl_cache.clear
+        ),
+        "Workflow.__init__ (cached)": timeit(lambda: Workflow(cwl, workflow_id), repeat),
+        "get_workflow_inputs": timeit(lambda: workflow.get_workflow_inputs(mandatory=True), repeat),
+        "eval_resource": timeit(workflow.eval_resource, repeat, setup=reset_resources),
+        "eval_resource (cached)": timeit(workflow.eval_resource, repeat),
+        "get_processing_parameters": timeit(runner.inputs.get_processing_parameters, repeat),
+        "assert_parameters": timeit(runner.assert_parameters, repeat),
+        "wrap": timeit(runner.wrap, repeat, setup=wrapped_cwl_cache.clear),
+        "wrap (cached)": timeit(runner.wrap, repeat),
+    }
+    return {f"{name}: {function}": value for function, value in results.items()}
+
+
+def run(repeat) -> dict:
+    for variable, template in [
+        ("WRAPPER_STAGE_IN", "stagein.yaml"),
+        ("WRAPPER_STAGE_OUT", "stageout.yaml"),
+        ("WRAPPER_MAIN", "maincwl.yaml"),
+        ("WRAPPER_RULES", "rules.yaml"),
+    ]:
+        os.environ.setdefault(variable, os.path.join(ROOT, "assets", template))
+
+    results = {}
+    for name, (path, workflow_id) in APP_PACKAGES.items():
+        with open(os.path.join(ROOT, path), "r") as stream:
+            results.update(bench(name, yaml.safe_load(stream), workflow_id, repeat))
+
+    for steps in SYNTHETIC_SIZES:
+        results.update(
+            bench(f"synthetic-{steps}", synthetic_workflow(steps), "synthetic", max(repeat // 2, 3))
+        )
+
+    return results
+
+
+def compare(results, baselines, threshold, min_delta) -> list:
+    """returns the benchmarks slower than their baseline by threshold and min_delta ms"""
+    return [
+        (name, baselines[name], value)
+        for name, value in results.items()
+        if name in baselines
+        and value > baselines[name] * (1 + threshold)
+        and value - baselines[name] > min_delta
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="number of runs per benchmark")
+    parser.add_argument("--save", action="store_true", help="store the timings as baselines")
+    parser.add_argument("--compare", action="store_true", help="fail if a benchmark regressed")
+    parser.add_argument(
+        "--threshold", type=float, default=0.5, help="tolerated slowdown relative to the baseline"
+    )
+    parser.add_argument(
+        "--min-delta", type=float, default=1.0, help="ignored slowdown in ms (timer noise)"
+    )
+    parser.add_argument("--baselines", default=BASELINES, help="baselines file")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    results = run(args.repeat)
+
+    for name, value in results.items():
+        print(f"{name:<60} {value:10.3f} ms")
+
+    if args.save:
+        with open(args.baselines, "w") as f:
+            json.dump({name: round(value, 3) for name, value in results.items()}, f, indent=2)
+            f.write("\n")
+        print(f"baselines stored in {args.baselines}")
+
+    if args.compare:
+        with open(args.baselines, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta)
+        for name, baseline, value in regressions:
+            print(f"REGRESSION {name}: {value:.3f} ms (baseline {baseline:.3f} ms)")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
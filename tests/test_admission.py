@@ -0,0 +1,196 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from zoo_calrissian_runner.admission import (
+    AdmissionController,
+    AdmissionTimeout,
+    ResourceDemand,
+    capacity_from_nodes,
+    get_admission_controller,
+    to_mebibytes,
+)
+
+
+class TestResourceDemand(unittest.TestCase):
+    def test_demand(self):
+        capacity = ResourceDemand(cores=8, ram=16384, disk=float("inf"))
+
+        self.assertTrue(ResourceDemand(4, 8192, 20000).fits(capacity))
+        self.assertFalse(ResourceDemand(16, 1024, 0).fits(capacity))
+        self.assertEqual(ResourceDemand(16, 1024, 0).clamp(capacity), ResourceDemand(8, 1024, 0))
+        self.assertEqual(ResourceDemand(2, 8192, 20000).share(capacity), 0.5)
+
+    def test_to_mebibytes(self):
+        self.assertEqual(to_mebibytes("20000Mi"), 20000)
+        self.assertEqual(to_mebibytes("2Gi"), 2048)
+        self.assertEqual(to_mebibytes("4096"), 4096)
+        self.assertEqual(to_mebibytes("NoneMi"), 0)
+
+    def test_capacity_from_nodes(self):
+        core_v1_api = mock.Mock()
+        core_v1_api.list_node.return_value.items = [
+            SimpleNamespace(
+                spec=SimpleNamespace(unschedulable=None),
+                status=SimpleNamespace(allocatable={"cpu": "3800m", "memory": "16Gi"}),
+            ),
+            SimpleNamespace(
+                spec=SimpleNamespace(unschedulable=True),
+                status=SimpleNamespace(allocatable={"cpu": "4", "memory": "16Gi"}),
+            ),
+        ]
+
+        capacity = capacity_from_nodes(core_v1_api)
+
+        self.assertAlmostEqual(capacity.cores, 3.8)
+        self.assertEqual(capacity.ram, 16384)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.controller = AdmissionController(ResourceDemand(cores=4, ram=8192, disk=float("inf")))
+
+    def wait_queued(self, count):
+        for _ in range(500):
+            if sum(self.controller.stats()["waiting"].values()) == count:
+                return
+            time.sleep(0.01)
+        self.fail(f"{count} executions not queued")
+
+    def acquire_in_thread(self, admitted, name, demand, service, priority_class=None):
+        def acquire():
+            ticket = self.controller.acquire(demand, service, priority_class)
+            admitted.append(name)
+            self.controller.release(ticket)
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        return thread
+
+    def test_queue_until_released(self):
+        ticket = self.controller.acquire(ResourceDemand(4, 1024), "dnbr")
+        admitted = []
+
+        thread = self.acquire_in_thread(admitted, "second", ResourceDemand(1, 1024), "dnbr")
+        self.wait_queued(1)
+        self.assertEqual(admitted, [])
+
+        self.controller.release(ticket)
+        thread.join(timeout=5)
+        self.assertEqual(admitted, ["second"])
+        self.assertEqual(self.controller.stats()["used"], ResourceDemand(0, 0, 0))
+
+    def test_priority(self):
+        ticket = self.controller.acquire(ResourceDemand(4, 1024), "dnbr")
+        admitted = []
+        threads = []
+
+        for name, service, priority_class in [
+            ("dnbr-low", "dnbr", "low"),
+            ("dnbr-normal", "dnbr", "normal"),
+            ("ndvi-normal", "ndvi", "normal"),
+            ("ndvi-high", "ndvi", "high"),
+        ]:
+            threads.append(
+                self.acquire_in_thread(admitted, name, ResourceDemand(4, 1024), service, priority_class)
+            )
+            self.wait_queued(len(threads))
+
+        self.controller.release(ticket)
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(admitted, ["ndvi-high", "dnbr-normal", "ndvi-normal", "dnbr-low"])
+
+    def test_fair_share(self):
+        dnbr = self.controller.acquire(ResourceDemand(2, 1024), "dnbr")
+        other = self.controller.acquire(ResourceDemand(2, 1024), "dnbr")
+        admitted = []
+
+        first = self.acquire_in_thread(admitted, "dnbr", ResourceDemand(2, 1024), "dnbr")
+        self.wait_queued(1)
+        second = self.acquire_in_thread(admitted, "ndvi", ResourceDemand(2, 1024), "ndvi")
+        self.wait_queued(2)
+
+        # dnbr still holds 2 cores, ndvi has no share and goes first
+        self.controller.release(other)
+        second.join(timeout=5)
+        first.join(timeout=5)
+        self.assertEqual(admitted, ["ndvi", "dnbr"])
+
+        self.controller.release(dnbr)
+
+    def test_oversized_demand(self):
+        ticket = self.controller.acquire(ResourceDemand(64, 1024), "dnbr")
+
+        self.assertEqual(ticket.demand, ResourceDemand(4, 1024, 0))
+        self.controller.release(ticket)
+
+    def test_timeout(self):
+        ticket = self.controller.acquire(ResourceDemand(4, 1024), "dnbr")
+
+        with self.assertRaises(AdmissionTimeout):
+            self.controller.acquire(ResourceDemand(1, 1024), "dnbr", timeout=0.05)
+        self.assertEqual(self.controller.stats()["waiting"], {})
+        self.controller.release(ticket)
+
+    def test_acquire_async(self):
+        ticket = self.controller.acquire(ResourceDemand(4, 1024), "dnbr")
+
+        async def cancel_waiting():
+            task = asyncio.ensure_future(self.controller.acquire_async(ResourceDemand(2, 1024), "dnbr"))
+            while not self.controller.stats()["waiting"]:
+                await asyncio.sleep(0.01)
+            start = time.monotonic()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # the event loop is not blocked by the wait going on
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(cancel_waiting()), 1)
+
+        # the ticket admitted after the cancellation is released
+        self.controller.release(ticket)
+        for _ in range(500):
+            if self.controller.stats()["used"] == ResourceDemand(0, 0, 0):
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.controller.stats()["used"], ResourceDemand(0, 0, 0))
+
+        async def acquire():
+            return await self.controller.acquire_async(ResourceDemand(1, 1024), "dnbr")
+
+        ticket = asyncio.run(acquire())
+        self.assertEqual(self.controller.stats()["used"], ResourceDemand(1, 1024, 0))
+        self.controller.release(ticket)
+
+    def test_unknown_priority_class(self):
+        with self.assertRaises(ValueError):
+            self.controller.acquire(ResourceDemand(1, 1024), "dnbr", "urgent")
+
+
+class TestGetAdmissionController(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.admission._admission_controller", None)
+    def test_get_admission_controller(self):
+        with mock.patch.dict(os.environ, {"ADMISSION_CONTROL": "false"}):
+            self.assertIsNone(get_admission_controller())
+
+        env = {
+            "ADMISSION_CONTROL": "true",
+            "ADMISSION_CORES": "32",
+            "ADMISSION_RAM": "131072",
+            "ADMISSION_DISK": "1048576",
+            "ADMISSION_PRIORITY_CLASSES": "urgent=10,batch=1",
+            "ADMISSION_DEFAULT_PRIORITY": "batch",
+        }
+        with mock.patch.dict(os.environ, env):
+            controller = get_admission_controller()
+
+        self.assertEqual(controller.capacity, ResourceDemand(32, 131072, 1048576))
+        self.assertEqual(controller.priority_classes, {"urgent": 10, "batch": 1})
+        self.assertEqual(controller.default_priority, "batch")
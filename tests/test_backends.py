@@ -0,0 +1,322 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import yaml
+
+from zoo_calrissian_runner import ZooCalrissianRunner, pool, zoo
+from zoo_calrissian_runner.backends import CalrissianBackend, FakeBackend, get_execution_backend
+from zoo_calrissian_runner.handlers import ExecutionHandler
+from zoo_calrissian_runner.history import get_usage_history
+from zoo_calrissian_runner.reaper import get_session_reaper
+
+WRAPPER_ENV = {
+    "WRAPPER_STAGE_IN": os.path.join("assets", "stagein.yaml"),
+    "WRAPPER_STAGE_OUT": os.path.join("assets", "stageout.yaml"),
+    "WRAPPER_MAIN": os.path.join("assets", "maincwl.yaml"),
+    "WRAPPER_RULES": os.path.join("assets", "rules.yaml"),
+    "DEFAULT_MAX_CORES": "4",
+    "DEFAULT_MAX_RAM": "4096",
+}
+
+INPUTS = {
+    "pre_stac_item": {"value": "https://earth-search.aws.element84.com/v0/items/pre"},
+    "post_stac_item": {"value": "https://earth-search.aws.element84.com/v0/items/post"},
+    "aoi": {"value": "136.659,-35.96,136.923,-35.791"},
+}
+
+
+class RecordingHandler(ExecutionHandler):
+    def pre_execution_hook(self, **kwargs):
+        pass
+
+    def post_execution_hook(self, **kwargs):
+        pass
+
+    def get_secrets(self):
+        return None
+
+    def get_pod_env_vars(self):
+        return {}
+
+    def get_pod_node_selector(self):
+        return None
+
+    def handle_outputs(self, **kwargs):
+        self.outputs = kwargs
+
+    def handle_log_chunk(self, pod, chunk):
+        self.log_chunks = getattr(self, "log_chunks", []) + [(pod, chunk)]
+
+    def get_additional_parameters(self):
+        return {}
+
+
+def get_fast_backend(**kwargs) -> FakeBackend:
+    latencies = dict(
+        namespace_latency=0.01,
+        pod_start_latency=0.01,
+        run_latency=0.02,
+        dispose_latency=0.01,
+        upload_latency=0.01,
+        retrieval_latency=0.01,
+        seed=0,
+    )
+    latencies.update(kwargs)
+    return FakeBackend(**latencies)
+
+
+@mock.patch.dict(os.environ, WRAPPER_ENV)
+class TestFakeBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-1.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+    def get_runner(self, backend):
+        conf = {"lenv": {"Identifier": "dnbr", "message": ""}, "main": {"tmpPath": "/tmp"}}
+        return ZooCalrissianRunner(
+            cwl=self.cwl,
+            conf=conf,
+            inputs=dict(INPUTS),
+            outputs={"Result": {"value": ""}},
+            execution_handler=RecordingHandler(conf=conf),
+            backend=backend,
+        )
+
+    def test_execute(self):
+        backend = get_fast_backend()
+        runner = self.get_runner(backend)
+
+        self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+
+        self.assertIsNotNone(runner.outputs.outputs["Result"]["value"])
+        self.assertIn("simulated execution", runner.handler.outputs["log"])
+        for phase in ["namespace_init", "wrap", "submit", "queue_wait", "run", "dispose"]:
+            self.assertIn(phase, runner.timer.timings)
+
+        stats = backend.stats()
+        self.assertEqual(stats["namespaces_created"], 1)
+        self.assertEqual(stats["namespaces_disposed"], 1)
+        self.assertEqual(stats["namespaces_active"], 0)
+        self.assertEqual(stats["jobs_submitted"], 1)
+        self.assertGreaterEqual(stats["monitor_latency_mean"], 0)
+
+    def test_execute_in_event_loop(self):
+        backend = get_fast_backend()
+
+        async def execute():
+            # the synchronous API called from a coroutine
+            return self.get_runner(backend).execute()
+
+        self.assertEqual(asyncio.run(execute()), zoo.SERVICE_SUCCEEDED)
+        self.assertEqual(backend.stats()["namespaces_active"], 0)
+
+    def test_execute_failure_clean_up(self):
+        backend = get_fast_backend()
+
+        runner = self.get_runner(backend)
+        with mock.patch.object(
+            runner, "upload_parameter_files", side_effect=RuntimeError("upload failed")
+        ):
+            with self.assertRaises(RuntimeError):
+                runner.execute()
+        self.assertEqual(backend.stats()["namespaces_active"], 0)
+
+        runner = self.get_runner(backend)
+        with mock.patch.object(
+            runner.handler, "post_execution_hook", side_effect=RuntimeError("hook failed")
+        ), mock.patch.object(backend, "release_execution") as release_execution:
+            with self.assertRaises(RuntimeError):
+                runner.execute()
+        release_execution.assert_called_once_with(runner.execution)
+        self.assertEqual(backend.stats()["namespaces_active"], 0)
+        self.assertIn("dispose", runner.timer.timings)
+
+    def test_execute_pooled_session(self):
+        backend = get_fast_backend()
+        runner = self.get_runner(backend)
+
+        with mock.patch.dict(os.environ, {"SESSION_POOL_SIZE": "1", "DEFAULT_VOLUME_SIZE": "1000"}):
+            try:
+                self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+            finally:
+                pool.get_session_pool(backend).close()
+                pool._session_pools.pop(backend)
+
+        # the namespace of the leased session is reported, not the computed one
+        self.assertTrue(runner.handler.job_id.startswith("zoo-pool-"))
+        self.assertEqual(runner.execution.job.params["params"]["process"], runner.handler.job_id)
+
+    def test_execute_failed(self):
+        backend = get_fast_backend(failure_rate=1)
+
+        self.assertEqual(self.get_runner(backend).execute(), zoo.SERVICE_FAILED)
+        self.assertEqual(backend.stats()["namespaces_active"], 0)
+
+    def test_namespace_failure(self):
+        backend = get_fast_backend(namespace_failure_rate=1)
+
+        with self.assertRaises(RuntimeError):
+            self.get_runner(backend).execute()
+        self.assertEqual(backend.stats()["namespaces_failed"], 1)
+        self.assertEqual(backend.stats()["jobs_submitted"], 0)
+
+    def test_concurrent_executions(self):
+        backend = get_fast_backend()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: self.get_runner(backend).execute(), range(16)))
+
+        self.assertEqual(results, [zoo.SERVICE_SUCCEEDED] * 16)
+        stats = backend.stats()
+        self.assertEqual(stats["namespaces_created"], 16)
+        self.assertEqual(stats["namespaces_disposed"], 16)
+        self.assertLessEqual(stats["namespaces_peak"], 8)
+
+    def test_execute_async(self):
+        backend = get_fast_backend(run_latency=0.5)
+
+        async def execute_all():
+            # the runs wait in the event loop, not in the executor threads
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=4))
+            return await asyncio.gather(*(self.get_runner(backend).execute_async() for _ in range(16)))
+
+        self.assertEqual(asyncio.run(execute_all()), [zoo.SERVICE_SUCCEEDED] * 16)
+        stats = backend.stats()
+        self.assertEqual(stats["namespaces_peak"], 16)
+        self.assertEqual(stats["namespaces_active"], 0)
+
+    def test_async_dispose(self):
+        backend = get_fast_backend(dispose_latency=0.5, jitter=0)
+        runner = self.get_runner(backend)
+
+        with mock.patch.dict(os.environ, {"ASYNC_DISPOSE": "true"}):
+            self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+            reaper = get_session_reaper(backend)
+
+        self.assertLess(runner.timer.timings["dispose"], 0.5)
+        self.assertTrue(reaper.wait(timeout=5))
+        self.assertEqual(backend.stats()["namespaces_disposed"], 1)
+
+    @mock.patch("zoo_calrissian_runner.admission._admission_controller", None)
+    def test_admission_control(self):
+        backend = get_fast_backend()
+        env = {"ADMISSION_CONTROL": "true", "ADMISSION_CORES": "4", "ADMISSION_RAM": "8192"}
+
+        with mock.patch.dict(os.environ, env):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                runners = [self.get_runner(backend) for _ in range(4)]
+                results = list(executor.map(lambda runner: runner.execute(), runners))
+
+        self.assertEqual(results, [zoo.SERVICE_SUCCEEDED] * 4)
+        # each execution needs the 4 cores, they run one after the other
+        self.assertEqual(backend.stats()["namespaces_peak"], 1)
+        self.assertTrue(all("admission" in runner.timer.timings for runner in runners))
+
+    def test_usage_history(self):
+        backend = get_fast_backend()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = {
+                "USAGE_HISTORY_PATH": os.path.join(tmp_dir, "usage.db"),
+                "USAGE_HISTORY_MIN_SAMPLES": "2",
+            }
+            with mock.patch.dict(os.environ, env):
+                for _ in range(2):
+                    self.assertEqual(self.get_runner(backend).execute(), zoo.SERVICE_SUCCEEDED)
+                usage_history = get_usage_history()
+                self.assertEqual(usage_history.get_records("dnbr", "cores"), [4, 4])
+
+                runner = self.get_runner(backend)
+                self.assertEqual(runner.get_max_cores(), 4)
+
+                for _ in range(2):
+                    usage_history.record(
+                        "dnbr",
+                        {"max_parallel_cpus": 1, "max_parallel_ram_megabytes": 512},
+                        bucket=runner.get_input_size_bucket(),
+                    )
+                usage_history.q = 50
+                with mock.patch.dict(os.environ, {"USAGE_HISTORY_SIZING": "true"}):
+                    # bounded by the declared (default) resources
+                    self.assertEqual(runner.get_max_cores(), 2)
+                    self.assertEqual(runner.get_max_ram(), "615Mi")
+                    usage_history.q = 100
+                    self.assertEqual(runner.get_max_cores(), 4)
+
+                    # the default volume size is a quantity
+                    with mock.patch.dict(os.environ, {"DEFAULT_VOLUME_SIZE": "2Gi"}):
+                        self.assertEqual(runner.get_volume_size(), "2048Mi")
+                        for _ in range(2):
+                            usage_history.record(
+                                "dnbr",
+                                {"total_disk_megabytes": 1024},
+                                bucket=runner.get_input_size_bucket(),
+                            )
+                        self.assertEqual(runner.get_volume_size(), "1229Mi")
+
+    def test_log_streaming(self):
+        backend = get_fast_backend(run_latency=0.1, jitter=0)
+        runner = self.get_runner(backend)
+
+        with mock.patch.dict(os.environ, {"LOG_STREAMING": "true"}):
+            self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+
+        pods = {pod for pod, _ in runner.handler.log_chunks}
+        self.assertEqual(len(pods), 2)
+        self.assertGreater(len(runner.handler.log_chunks), 2)
+        self.assertTrue(runner.handler.outputs["log"].startswith("calrissian line 1\n"))
+        self.assertNotIn("simulated execution", runner.handler.outputs["log"])
+
+    def test_progress_reporting(self):
+        backend = get_fast_backend(run_latency=0.2, jitter=0)
+        runner = self.get_runner(backend)
+
+        with mock.patch.dict(os.environ, {"PROGRESS_INTERVAL": "0"}):
+            with mock.patch.object(runner, "update_status", wraps=runner.update_status) as update_status:
+                self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+
+        progress = [call.kwargs["progress"] for call in update_status.call_args_list]
+        during_run = progress[progress.index(23) + 1 : progress.index(90)]
+        self.assertGreater(len(during_run), 0)
+        self.assertEqual(during_run, sorted(during_run))
+        self.assertTrue(all(23 < value < 90 for value in during_run))
+
+    def test_concurrent_retrieval(self):
+        backend = get_fast_backend(retrieval_latency=0.2, jitter=0)
+        runner = self.get_runner(backend)
+
+        self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+
+        # 4 x 0.2s one after the other, the usage report and the tool logs in sequence
+        self.assertLess(runner.timer.timings["output_retrieval"], 0.6)
+        self.assertIsNotNone(runner.outputs.outputs["Result"]["value"])
+        self.assertIn("simulated execution", runner.handler.outputs["log"])
+
+    def test_polling(self):
+        backend = get_fast_backend()
+        runner = self.get_runner(backend)
+        runner.monitor_mode = "poll"
+        runner.polling_policy.initial = 0.005
+
+        self.assertEqual(runner.execute(), zoo.SERVICE_SUCCEEDED)
+
+
+class TestGetExecutionBackend(unittest.TestCase):
+    def test_get_execution_backend(self):
+        with mock.patch.dict(os.environ, {"EXECUTION_BACKEND": "calrissian"}):
+            self.assertIsInstance(get_execution_backend(), CalrissianBackend)
+
+        with mock.patch.dict(os.environ, {"EXECUTION_BACKEND": "fake", "FAKE_BACKEND_RUN_LATENCY": "3"}):
+            backend = get_execution_backend()
+            self.assertIsInstance(backend, FakeBackend)
+            self.assertEqual(backend.run_latency, 3)
+            self.assertIs(get_execution_backend(), backend)
+
+        with mock.patch.dict(os.environ, {"EXECUTION_BACKEND": "docker"}):
+            with self.assertRaises(ValueError):
+                get_execution_backend()
@@ -0,0 +1,213 @@
+import asyncio
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import yaml
+
+from tests.test_backends import INPUTS, WRAPPER_ENV, RecordingHandler, get_fast_backend
+from zoo_calrissian_runner import ZooCalrissianRunner, batching, zoo
+from zoo_calrissian_runner.batching import (
+    BATCH_ENTRY_POINT,
+    JobBatcher,
+    build_batch_workflow,
+    expand_type,
+    get_batch_parameters,
+    split_batch_output,
+)
+
+WORKFLOW = {
+    "cwlVersion": "v1.2",
+    "$graph": [
+        {
+            "class": "Workflow",
+            "id": "main",
+            "inputs": {
+                "process": {"type": "string"},
+                "aoi": {"type": "string?"},
+                "bands": {"type": "string[]", "default": ["red", "nir"]},
+            },
+            "outputs": [{"id": "stac", "type": "Directory", "outputSource": "node/stac"}],
+            "steps": {},
+        }
+    ],
+}
+
+
+class TestBatchWorkflow(unittest.TestCase):
+    def test_expand_type(self):
+        self.assertEqual(expand_type("string?"), ["null", "string"])
+        self.assertEqual(expand_type("File[]?"), ["null", {"type": "array", "items": "File"}])
+        self.assertEqual(expand_type({"type": "enum"}), {"type": "enum"})
+
+    def test_build_batch_workflow(self):
+        batch_workflow = build_batch_workflow(WORKFLOW)
+
+        self.assertEqual(len(WORKFLOW["$graph"]), 1)
+        batch = batch_workflow["$graph"][-1]
+        self.assertEqual(batch["id"], BATCH_ENTRY_POINT)
+        self.assertEqual(
+            batch["inputs"]["process"]["type"], {"type": "array", "items": ["null", "string"]}
+        )
+        self.assertEqual(batch["inputs"]["aoi"]["type"], {"type": "array", "items": ["null", "string"]})
+        self.assertEqual(
+            batch["inputs"]["bands"]["type"],
+            {"type": "array", "items": ["null", {"type": "array", "items": "string"}]},
+        )
+        self.assertEqual(
+            batch["outputs"]["stac"],
+            {"type": {"type": "array", "items": "Directory"}, "outputSource": "run/stac"},
+        )
+        step = batch["steps"]["run"]
+        self.assertEqual(step["run"], "#main")
+        self.assertEqual(step["scatter"], ["process", "aoi", "bands"])
+        self.assertEqual(step["out"], ["stac"])
+
+    def test_batch_parameters(self):
+        batch_workflow = build_batch_workflow(WORKFLOW)
+
+        self.assertEqual(
+            get_batch_parameters(
+                batch_workflow,
+                [{"process": "a", "aoi": "1,2,3,4"}, {"process": "b", "bands": ["red"]}],
+            ),
+            {"process": ["a", "b"], "aoi": ["1,2,3,4", None], "bands": [None, ["red"]]},
+        )
+        self.assertEqual(split_batch_output({"stac": ["a", "b"]}, 2), [{"stac": "a"}, {"stac": "b"}])
+        self.assertEqual(split_batch_output(None, 2), [{}, {}])
+
+
+class TestJobBatcher(unittest.TestCase):
+    def test_window(self):
+        batches = []
+
+        def run_batch(runners):
+            batches.append(runners)
+            return list(range(len(runners)))
+
+        batcher = JobBatcher(run_batch, window=0.2, max_size=10)
+        with mock.patch.object(batching, "batch_key", lambda runner: runner.key):
+            futures = [batcher.submit(mock.Mock(key=key)) for key in ["a", "a", "b", "a"]]
+            results = [future.result(timeout=5) for future in futures]
+
+        # the single execution of b is not batched
+        self.assertEqual(results, [0, 1, None, 2])
+        self.assertEqual([len(batch) for batch in batches], [3])
+
+    def test_max_size(self):
+        batcher = JobBatcher(lambda runners: [len(runners)] * len(runners), window=60, max_size=2)
+        with mock.patch.object(batching, "batch_key", lambda runner: "a"):
+            start = time.monotonic()
+            futures = [batcher.submit(mock.Mock()) for _ in range(2)]
+            self.assertEqual([future.result(timeout=5) for future in futures], [2, 2])
+        self.assertLess(time.monotonic() - start, 60)
+
+    def test_failures(self):
+        def run_batch(runners):
+            raise RuntimeError("batch failed")
+
+        batcher = JobBatcher(run_batch, window=0.1)
+        with mock.patch.object(batching, "batch_key", lambda runner: "a"):
+            futures = [batcher.submit(mock.Mock()) for _ in range(2)]
+            self.assertEqual([future.result(timeout=5) for future in futures], [None, None])
+
+        batcher = JobBatcher(lambda runners: [1, ValueError("hook failed")], window=0.1)
+        with mock.patch.object(batching, "batch_key", lambda runner: "a"):
+            futures = [batcher.submit(mock.Mock()) for _ in range(2)]
+            self.assertEqual(futures[0].result(timeout=5), 1)
+            with self.assertRaises(ValueError):
+                futures[1].result(timeout=5)
+
+
+@mock.patch.dict(os.environ, {**WRAPPER_ENV, "BATCH_WINDOW": "0.5", "BATCH_MAX_SIZE": "4"})
+class TestBatchedExecution(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-1.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+    def setUp(self):
+        batching._job_batcher = None
+
+    def tearDown(self):
+        batching._job_batcher = None
+
+    def get_runner(self, backend):
+        conf = {"lenv": {"Identifier": "dnbr", "message": ""}, "main": {"tmpPath": "/tmp"}}
+        return ZooCalrissianRunner(
+            cwl=self.cwl,
+            conf=conf,
+            inputs=dict(INPUTS),
+            outputs={"Result": {"value": ""}},
+            execution_handler=RecordingHandler(conf=conf),
+            backend=backend,
+        )
+
+    def execute_all(self, runners):
+        async def execute_all():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=8))
+            return await asyncio.gather(*(runner.execute_async() for runner in runners))
+
+        return asyncio.run(execute_all())
+
+    def test_batched(self):
+        backend = get_fast_backend()
+        runners = [self.get_runner(backend) for _ in range(4)]
+
+        with mock.patch.object(ZooCalrissianRunner, "update_status", autospec=True) as update_status:
+            self.assertEqual(self.execute_all(runners), [zoo.SERVICE_SUCCEEDED] * 4)
+
+        # the executions report the statuses of an execution run alone
+        for runner in runners:
+            statuses = [
+                call.kwargs["progress"]
+                for call in update_status.call_args_list
+                if call.args[0] is runner
+            ]
+            self.assertEqual(statuses, [2, 5, 10, 15, 20, 23, 90, 97, 99, 100])
+
+        stats = backend.stats()
+        self.assertEqual(stats["jobs_submitted"], 1)
+        self.assertEqual(stats["namespaces_created"], 1)
+        self.assertEqual(stats["namespaces_active"], 0)
+
+        catalogs = [runner.outputs.outputs["Result"]["value"]["stac_catalog"] for runner in runners]
+        self.assertEqual(len(set(catalogs)), 4)
+        # the batch runs in a namespace of its own, the job id of its executions
+        self.assertEqual(len({runner.handler.job_id for runner in runners}), 1)
+        self.assertTrue(runners[0].handler.job_id.startswith("batch-"))
+        for index, runner in enumerate(runners):
+            self.assertEqual(runner.handler.outputs["output"]["stac_catalog"], catalogs[index])
+            self.assertIn(f"execution {index + 1} of the batch", runner.handler.outputs["log"])
+            self.assertIn("those of the whole batch", runner.handler.outputs["log"])
+            self.assertIn("run", runner.timer.timings)
+
+    def test_batch_failed(self):
+        backend = get_fast_backend(failure_rate=1)
+        runners = [self.get_runner(backend) for _ in range(2)]
+
+        # the executions of the failed batch run alone
+        self.assertEqual(self.execute_all(runners), [zoo.SERVICE_FAILED] * 2)
+        self.assertEqual(backend.stats()["jobs_submitted"], 3)
+        self.assertEqual(backend.stats()["namespaces_created"], 3)
+        self.assertEqual(backend.stats()["namespaces_active"], 0)
+        # the executions run alone in namespaces of their own
+        job_ids = {runner.handler.job_id for runner in runners}
+        self.assertEqual(len(job_ids), 2)
+        self.assertFalse(any(job_id.startswith("batch-") for job_id in job_ids))
+
+    def test_single_execution(self):
+        backend = get_fast_backend()
+
+        self.assertEqual(self.execute_all([self.get_runner(backend)]), [zoo.SERVICE_SUCCEEDED])
+        self.assertEqual(backend.stats()["jobs_submitted"], 1)
+
+    @mock.patch.dict(os.environ, {"BATCH_WINDOW": "0"})
+    def test_disabled(self):
+        self.assertIsNone(batching.get_job_batcher(ZooCalrissianRunner.run_batch))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml
+
+from tests.test_backends import INPUTS, WRAPPER_ENV, get_fast_backend
+from zoo_calrissian_runner.backends import SharedClientContext, get_api_client
+from zoo_calrissian_runner.bulk import (
+    BulkExecutionHandler,
+    BulkSubmission,
+    load_handler_factory,
+    read_manifest,
+)
+
+
+class FailingHandler(BulkExecutionHandler):
+    def handle_outputs(self, **kwargs):
+        raise ValueError("not handled")
+
+
+@mock.patch.dict(os.environ, WRAPPER_ENV)
+class TestBulkSubmission(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-1.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+    def test_read_manifest(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as manifest:
+            manifest.write(json.dumps(INPUTS) + "\n\n" + json.dumps(INPUTS) + "\n")
+        try:
+            self.assertEqual(list(read_manifest(manifest.name)), [INPUTS, INPUTS])
+        finally:
+            os.remove(manifest.name)
+
+    def test_run(self):
+        backend = get_fast_backend(failure_rate=0.5)
+        submission = BulkSubmission(
+            cwl=self.cwl, workflow_id="dnbr", max_concurrency=4, executor_workers=4, backend=backend
+        )
+
+        results = io.StringIO()
+        summary = submission.run(iter([INPUTS] * 10), results)
+
+        records = [json.loads(line) for line in results.getvalue().splitlines()]
+        self.assertEqual(sorted(record["index"] for record in records), list(range(10)))
+        self.assertEqual(sum(summary.values()), 10)
+        self.assertEqual(
+            summary.get("successful", 0), len([r for r in records if r["status"] == "successful"])
+        )
+        self.assertEqual(len({record["job_id"] for record in records}), 10)
+        for record in records:
+            self.assertIn("run", record["timings"])
+            if record["status"] == "successful":
+                self.assertIsNotNone(record["outputs"]["stac"])
+
+        stats = backend.stats()
+        self.assertEqual(stats["namespaces_created"], 10)
+        self.assertLessEqual(stats["namespaces_peak"], 4)
+        # the runners share the parsed workflow
+        self.assertIs(submission.create_runner(INPUTS).cwl, submission.workflow)
+
+    def test_run_error(self):
+        backend = get_fast_backend(namespace_failure_rate=1)
+        submission = BulkSubmission(cwl=self.cwl, workflow_id="dnbr", max_concurrency=2, backend=backend)
+
+        results = io.StringIO()
+        self.assertEqual(submission.run(iter([INPUTS] * 3), results), {"error": 3})
+        self.assertIsNotNone(json.loads(results.getvalue().splitlines()[0])["error"])
+
+    def test_run_handler_error(self):
+        backend = get_fast_backend()
+        submission = BulkSubmission(
+            cwl=self.cwl,
+            workflow_id="dnbr",
+            max_concurrency=2,
+            handler_factory=lambda conf: FailingHandler(conf=conf),
+            backend=backend,
+        )
+
+        results = io.StringIO()
+        with mock.patch.object(backend, "release_execution") as release_execution:
+            self.assertEqual(submission.run(iter([INPUTS] * 3), results), {"error": 3})
+
+        # the files of each execution are removed
+        self.assertEqual(release_execution.call_count, 3)
+        self.assertEqual(len({call.args[0] for call in release_execution.call_args_list}), 3)
+
+    def test_load_handler_factory(self):
+        handler = load_handler_factory("zoo_calrissian_runner.bulk:BulkExecutionHandler")({"lenv": {}})
+        self.assertEqual(handler.conf, {"lenv": {}})
+
+
+class TestSharedApiClient(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.backends.CalrissianContext._get_api_client")
+    def test_shared_api_client(self, _get_api_client):
+        with mock.patch.dict(os.environ, {"KUBECONFIG": "/a/shared/kubeconfig"}):
+            self.assertIs(get_api_client(), get_api_client())
+            self.assertIs(SharedClientContext._get_api_client(), get_api_client())
+        _get_api_client.assert_called_once_with(None)
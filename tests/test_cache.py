@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import yaml
+
+from zoo_calrissian_runner import Workflow, ZooCalrissianRunner
+from zoo_calrissian_runner.cache import LRUCache, cwl_digest, parsed_cwl_cache, wrapped_cwl_cache
+
+WRAPPER_ENV = {
+    "WRAPPER_STAGE_IN": os.path.join("assets", "stagein.yaml"),
+    "WRAPPER_STAGE_OUT": os.path.join("assets", "stageout.yaml"),
+    "WRAPPER_MAIN": os.path.join("assets", "maincwl.yaml"),
+    "WRAPPER_RULES": os.path.join("assets", "rules.yaml"),
+}
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+    def test_ttl(self):
+        cache = LRUCache(max_size=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get("a"))
+
+    def test_counters(self):
+        cache = LRUCache(max_size=2)
+        cache.get_or_create("a", lambda: 1)
+        cache.get_or_create("a", lambda: 2)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+class TestParsedCWLCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-3.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+    def test_digest_is_stable(self):
+        self.assertEqual(cwl_digest({"a": 1, "b": [1, 2]}), cwl_digest({"b": [1, 2], "a": 1}))
+        self.assertNotEqual(cwl_digest({"a": 1}), cwl_digest({"a": 2}))
+
+    def test_shared_parsed_cwl(self):
+        parsed_cwl_cache.clear()
+
+        workflow_1 = Workflow(cwl=self.cwl, workflow_id="dnbr")
+        workflow_2 = Workflow(cwl=self.cwl, workflow_id="dnbr")
+
+        self.assertIs(workflow_1.cwl, workflow_2.cwl)
+        self.assertEqual(parsed_cwl_cache.stats()["misses"], 1)
+        self.assertEqual(parsed_cwl_cache.stats()["hits"], 1)
+
+
+class TestWrappedCWLCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-3.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+    def get_runner(self):
+        return ZooCalrissianRunner(
+            cwl=self.cwl, conf={"lenv": {"Identifier": "dnbr"}}, inputs={}, outputs={}
+        )
+
+    @mock.patch.dict(os.environ, WRAPPER_ENV)
+    def test_wrap_cached(self):
+        wrapped_cwl_cache.clear()
+
+        wrapped = self.get_runner().wrap()
+        wrapped["$graph"] = []
+
+        self.assertNotEqual(self.get_runner().wrap()["$graph"], [])
+        self.assertEqual(wrapped_cwl_cache.stats()["misses"], 1)
+        self.assertEqual(wrapped_cwl_cache.stats()["hits"], 1)
+
+    def test_wrap_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.dict(os.environ, {**WRAPPER_ENV, "WRAPPER_CACHE_DIR": cache_dir}):
+                wrapped_cwl_cache.clear()
+                wrapped = self.get_runner().wrap()
+
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+                wrapped_cwl_cache.clear()
+                self.assertEqual(self.get_runner().wrap(), wrapped)
+                self.assertEqual(wrapped_cwl_cache.stats()["misses"], 1)
@@ -0,0 +1,32 @@
+import unittest
+
+from zoo_calrissian_runner.dag import max_weight_antichain, transitive_closure
+
+
+class TestDag(unittest.TestCase):
+    def test_transitive_closure(self):
+        ancestors = transitive_closure({"a": set(), "b": {"a"}, "c": {"b"}, "d": {"a"}})
+
+        self.assertEqual(ancestors, {"a": set(), "b": {"a"}, "c": {"a", "b"}, "d": {"a"}})
+
+    def test_cycle(self):
+        with self.assertRaises(ValueError):
+            transitive_closure({"a": {"b"}, "b": {"a"}})
+
+    def test_chain(self):
+        ancestors = transitive_closure({"a": set(), "b": {"a"}, "c": {"b"}})
+
+        self.assertEqual(max_weight_antichain({"a": 2, "b": 5, "c": 1}, ancestors), 5)
+
+    def test_diamond(self):
+        # a -> (b, c) -> d, b and c run at the same time
+        ancestors = transitive_closure({"a": set(), "b": {"a"}, "c": {"a"}, "d": {"b", "c"}})
+
+        self.assertEqual(max_weight_antichain({"a": 1, "b": 3, "c": 3, "d": 1}, ancestors), 6)
+        self.assertEqual(max_weight_antichain({"a": 8, "b": 3, "c": 3, "d": 1}, ancestors), 8)
+
+    def test_independent_chains(self):
+        # a -> b and c -> d, the heaviest steps of each chain run at the same time
+        ancestors = transitive_closure({"a": set(), "b": {"a"}, "c": set(), "d": {"c"}})
+
+        self.assertEqual(max_weight_antichain({"a": 4, "b": 1, "c": 1, "d": 2}, ancestors), 6)
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from zoo_calrissian_runner.history import (
+    EXECUTION_STEP,
+    UsageHistory,
+    input_size_bucket,
+    parse_usage_report,
+    percentile,
+)
+
+USAGE_REPORT = {
+    "max_parallel_cpus": 6,
+    "max_parallel_ram_megabytes": 12288,
+    "total_disk_megabytes": 3000,
+    "elapsed_seconds": 120,
+    "children": [
+        {
+            "name": "node_stac",
+            "cpus": 2,
+            "ram_megabytes": 4096,
+            "disk_megabytes": 1000,
+            "elapsed_hours": 0.01,
+        },
+        {
+            "name": "node_cog",
+            "cpus": 1,
+            "ram_megabytes": 2048,
+            "disk_megabytes": 2000,
+            "elapsed_seconds": 60,
+        },
+    ],
+}
+
+
+class TestUsageHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history = UsageHistory(
+            os.path.join(self.tmp_dir.name, "usage.db"), q=50, headroom=1.5, min_samples=3, max_records=4
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 95), 5)
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0), 1)
+
+    def test_input_size_bucket(self):
+        self.assertEqual(input_size_bucket({}), 1)
+        self.assertEqual(input_size_bucket({"aoi": "1,2,3,4"}), 1)
+        self.assertEqual(input_size_bucket({"aoi": "1,2,3,4", "items": ["a", "b", "c"]}), 4)
+        self.assertEqual(input_size_bucket({"items": list(range(5))}), 8)
+
+    def test_parse_usage_report(self):
+        usage = parse_usage_report(USAGE_REPORT)
+
+        self.assertEqual(
+            usage[EXECUTION_STEP], {"cores": 6, "ram": 12288, "disk": 3000, "duration": 120}
+        )
+        self.assertEqual(usage["node_stac"]["duration"], 36)
+        self.assertEqual(usage["node_cog"]["disk"], 2000)
+
+    def test_record(self):
+        self.history.record("dnbr", USAGE_REPORT)
+
+        self.assertEqual(self.history.get_records("dnbr", "cores"), [6])
+        self.assertEqual(self.history.get_records("dnbr", "ram", step="node_stac"), [4096])
+        self.assertEqual(self.history.get_records("other", "cores"), [])
+
+        with self.assertRaises(ValueError):
+            self.history.get_records("dnbr", "gpus")
+
+    def test_max_records(self):
+        for i in range(6):
+            self.history.record("dnbr", {"max_parallel_cpus": i}, recorded=i)
+
+        # the most recent records are kept
+        self.assertEqual(sorted(self.history.get_records("dnbr", "cores")), [2, 3, 4, 5])
+
+    def test_buckets(self):
+        for cores in [2, 4, 8]:
+            self.history.record("dnbr", {"max_parallel_cpus": cores}, bucket=1)
+        for cores in [16, 32]:
+            self.history.record("dnbr", {"max_parallel_cpus": cores}, bucket=8)
+
+        self.assertEqual(self.history.estimate("dnbr", "cores", bucket=1), 6)
+        # not enough records of the larger inputs
+        self.assertIsNone(self.history.estimate("dnbr", "cores", bucket=8))
+        self.assertEqual(sorted(self.history.get_records("dnbr", "cores")), [2, 4, 8, 16, 32])
+
+    def test_unbucketed_database(self):
+        path = os.path.join(self.tmp_dir.name, "old.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE usage (service TEXT NOT NULL, step TEXT NOT NULL, "
+                "recorded REAL NOT NULL, cores REAL, ram REAL, disk REAL, duration REAL)"
+            )
+            connection.execute(
+                "INSERT INTO usage (service, step, recorded, cores) VALUES ('dnbr', '', 0, 2)"
+            )
+        connection.close()
+
+        history = UsageHistory(path, min_samples=1)
+        history.record("dnbr", {"max_parallel_cpus": 4}, bucket=1)
+
+        self.assertEqual(history.get_records("dnbr", "cores", bucket=1), [4])
+        self.assertEqual(sorted(history.get_records("dnbr", "cores")), [2, 4])
+
+    def test_estimate(self):
+        for cores in [2, 4]:
+            self.history.record("dnbr", {"max_parallel_cpus": cores})
+        self.assertIsNone(self.history.estimate("dnbr", "cores"))
+
+        self.history.record("dnbr", {"max_parallel_cpus": 8})
+        self.assertEqual(self.history.estimate("dnbr", "cores"), 6)
@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+
+from kubernetes.client.rest import ApiException
+
+from zoo_calrissian_runner.logs import LogChunk, LogSpool, PodLogStreamer
+
+
+def get_pod(name, phase="Running", labels=None):
+    pod = mock.Mock()
+    pod.metadata.name = name
+    pod.metadata.labels = labels
+    pod.status.phase = phase
+    return pod
+
+
+class TestLogSpool(unittest.TestCase):
+    def test_spill_to_disk(self):
+        spool = LogSpool(max_size=16)
+        for i in range(10):
+            spool.write(LogChunk(pod="tool", text=f"line {i}\n"))
+        spool.write(LogChunk(pod="job", text="started\n", execution=True))
+
+        self.assertTrue(spool._files["tool"]._rolled)
+        self.assertFalse(spool._files["job"]._rolled)
+        self.assertEqual(spool.read("tool"), "".join(f"line {i}\n" for i in range(10)))
+        self.assertEqual(spool.read("tool", max_size=14), "[56 bytes not shown]\nline 8\nline 9\n")
+        self.assertEqual(spool.execution_pod, "job")
+        self.assertEqual(spool.pods(), ["tool", "job"])
+
+        spool.close()
+        self.assertEqual(spool.read("tool"), "")
+
+
+class TestPodLogStreamer(unittest.TestCase):
+    def get_execution(self, pods, logs):
+        execution = mock.Mock()
+        execution.job.job_name = "job-1"
+        core_v1_api = execution.runtime_context.core_v1_api
+        # complete at the second pod discovery
+        execution.is_complete.side_effect = lambda: core_v1_api.list_namespaced_pod.call_count >= 1
+        core_v1_api.list_namespaced_pod.side_effect = lambda **kwargs: pods[
+            min(core_v1_api.list_namespaced_pod.call_count, len(pods)) - 1
+        ]
+
+        def read_namespaced_pod_log(name, **kwargs):
+            if name not in logs:
+                raise ApiException(status=400, reason="container not started")
+            response = mock.Mock()
+            response.stream.return_value = iter(logs[name])
+            return response
+
+        core_v1_api.read_namespaced_pod_log.side_effect = read_namespaced_pod_log
+        return execution
+
+    def test_stream(self):
+        job_pod = get_pod("job-1-abc", labels={"job-name": "job-1"})
+        tool_pod = get_pod("node-stac-xyz")
+        pods = [
+            mock.Mock(items=[job_pod, get_pod("node-cog", phase="Pending"), get_pod("kube-cp-123")]),
+            mock.Mock(items=[job_pod, tool_pod]),
+        ]
+        # the euro sign is split across two chunks
+        logs = {"job-1-abc": [b"start\n", b"cost: \xe2\x82", b"\xac\n"], "node-stac-xyz": [b"stac\n"]}
+        execution = self.get_execution(pods, logs)
+
+        chunks = list(PodLogStreamer(execution, poll_interval=0.01).stream())
+
+        self.assertEqual(
+            "".join(chunk.text for chunk in chunks if chunk.pod == "job-1-abc"), "start\ncost: €\n"
+        )
+        self.assertTrue(all(chunk.execution for chunk in chunks if chunk.pod == "job-1-abc"))
+        self.assertEqual([chunk.text for chunk in chunks if chunk.pod == "node-stac-xyz"], ["stac\n"])
+        read_log = execution.runtime_context.core_v1_api.read_namespaced_pod_log
+        self.assertEqual(
+            sorted(call.kwargs["name"] for call in read_log.call_args_list),
+            ["job-1-abc", "node-stac-xyz"],
+        )
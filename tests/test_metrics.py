@@ -0,0 +1,112 @@
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from zoo_calrissian_runner.metrics import (
+    PhaseTimer,
+    PrometheusTextFileSink,
+    StatsdSink,
+    get_metrics_sink,
+)
+
+RECORD = {
+    "workflow_id": "dnbr",
+    "job_id": "dnbr-1234",
+    "status": "successful",
+    "timings": {"wrap": 0.5, "run": 12.0},
+    "total": 12.5,
+}
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_phases(self):
+        timer = PhaseTimer()
+
+        with timer.phase("wrap"):
+            pass
+        timer.record("run", 2)
+        timer.record("run", 3)
+
+        self.assertEqual(list(timer.timings.keys()), ["wrap", "run"])
+        self.assertEqual(timer.timings["run"], 5)
+        self.assertAlmostEqual(timer.total(), 5, places=2)
+
+    @mock.patch("zoo_calrissian_runner.metrics.time.monotonic")
+    def test_elapsed(self, monotonic):
+        monotonic.return_value = 100
+        timer = PhaseTimer()
+
+        # overlapping phases
+        timer.record("wrap", 3)
+        timer.record("namespace_init", 4)
+        monotonic.return_value = 104
+
+        self.assertEqual(timer.total(), 7)
+        self.assertEqual(timer.elapsed(), 4)
+
+    def test_phase_with_error(self):
+        timer = PhaseTimer()
+
+        with self.assertRaises(RuntimeError):
+            with timer.phase("upload"):
+                raise RuntimeError()
+
+        self.assertIn("upload", timer.timings)
+
+
+class TestMetricsSinks(unittest.TestCase):
+    def test_prometheus_text_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sink = PrometheusTextFileSink(path=os.path.join(tmp_dir, "runner.prom"))
+            sink.emit(RECORD)
+            sink.emit(RECORD)
+
+            with open(sink.path) as f:
+                content = f.read()
+
+        labels = 'workflow_id="dnbr",phase="run"'
+        self.assertIn(f"zoo_calrissian_runner_phase_seconds_sum{{{labels}}} 24.0", content)
+        self.assertIn(f"zoo_calrissian_runner_phase_seconds_count{{{labels}}} 2", content)
+
+    def test_prometheus_gauge(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sink = PrometheusTextFileSink(path=os.path.join(tmp_dir, "runner.prom"))
+            sink.emit(RECORD)
+            sink.gauge("cleanup_backlog", 3)
+
+            with open(sink.path) as f:
+                content = f.read()
+
+        self.assertIn("zoo_calrissian_runner_phase_seconds_count", content)
+        self.assertIn("zoo_calrissian_runner_cleanup_backlog 3\n", content)
+
+    def test_statsd(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(5)
+
+        StatsdSink(host="127.0.0.1", port=server.getsockname()[1]).emit(RECORD)
+
+        metrics = {server.recv(1024).decode("utf-8") for _ in RECORD["timings"]}
+        server.close()
+
+        self.assertEqual(
+            metrics,
+            {
+                "zoo_calrissian_runner.dnbr.wrap:500.000|ms",
+                "zoo_calrissian_runner.dnbr.run:12000.000|ms",
+            },
+        )
+
+    def test_get_metrics_sink(self):
+        with mock.patch.dict(os.environ, {"METRICS_SINK": "prometheus:///tmp/runner.prom"}):
+            self.assertEqual(get_metrics_sink().path, "/tmp/runner.prom")
+            self.assertIs(get_metrics_sink(), get_metrics_sink())
+
+        with mock.patch.dict(os.environ, {"METRICS_SINK": "statsd://statsd:9125"}):
+            self.assertEqual(get_metrics_sink().address, ("statsd", 9125))
+
+        with mock.patch.dict(os.environ, {"METRICS_SINK": ""}):
+            self.assertIsNone(get_metrics_sink())
@@ -0,0 +1,193 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from kubernetes.client.rest import ApiException
+
+from zoo_calrissian_runner.backends import CalrissianBackend
+from zoo_calrissian_runner.monitoring import (
+    AdaptiveBackoffPolicy,
+    FixedIntervalPolicy,
+    JobPoller,
+    JobWatcher,
+    WatchUnavailable,
+)
+
+
+def job_event(active=None, succeeded=None, failed=None, resource_version="1"):
+    return {
+        "type": "MODIFIED",
+        "object": SimpleNamespace(
+            metadata=SimpleNamespace(resource_version=resource_version),
+            status=SimpleNamespace(active=active, succeeded=succeeded, failed=failed),
+        ),
+    }
+
+
+def get_execution():
+    context = mock.MagicMock(namespace="a-namespace")
+    return SimpleNamespace(runtime_context=context, job=SimpleNamespace(job_name="a-job"), killed=False)
+
+
+class Clock:
+    """a monotonic clock moved forward by the sleeps and the watch streams"""
+
+    def __init__(self):
+        self.now = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestJobWatcher(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.monitoring.watch.Watch")
+    def test_completion(self, Watch):
+        Watch.return_value.stream.return_value = iter(
+            [job_event(active=1), job_event(succeeded=1, resource_version="2")]
+        )
+        execution = get_execution()
+
+        JobWatcher(execution=execution).monitor()
+
+        _, kwargs = Watch.return_value.stream.call_args
+        self.assertEqual(kwargs["field_selector"], "metadata.name=a-job")
+        self.assertEqual(kwargs["namespace"], "a-namespace")
+        Watch.return_value.stop.assert_called()
+
+    @mock.patch("zoo_calrissian_runner.monitoring.watch.Watch")
+    def test_expired_stream(self, Watch):
+        def stream(*args, **kwargs):
+            if Watch.return_value.stream.call_count == 1:
+                raise ApiException(status=410)
+            return iter([job_event(failed=1)])
+
+        Watch.return_value.stream.side_effect = stream
+
+        JobWatcher(execution=get_execution()).monitor()
+
+        self.assertEqual(Watch.return_value.stream.call_count, 2)
+
+    @mock.patch("zoo_calrissian_runner.monitoring.watch.Watch")
+    def test_watch_unavailable(self, Watch):
+        Watch.return_value.stream.side_effect = ApiException(status=403)
+
+        with self.assertRaises(WatchUnavailable):
+            JobWatcher(execution=get_execution()).monitor()
+
+    @mock.patch("zoo_calrissian_runner.monitoring.time")
+    @mock.patch("zoo_calrissian_runner.monitoring.watch.Watch")
+    def test_wall_time(self, Watch, time):
+        clock = Clock()
+        time.monotonic.side_effect = clock.monotonic
+
+        def stream(*args, **kwargs):
+            clock.sleep(kwargs["timeout_seconds"])
+            return iter([job_event(active=1)])
+
+        Watch.return_value.stream.side_effect = stream
+        execution = get_execution()
+
+        JobWatcher(execution=execution, timeout=60, wall_time=150).monitor()
+
+        timeouts = [call.kwargs["timeout_seconds"] for call in Watch.return_value.stream.call_args_list]
+        self.assertEqual(timeouts, [60, 60, 30])
+        self.assertTrue(execution.killed)
+        execution.runtime_context.batch_v1_api.delete_namespaced_job.assert_called_once_with(
+            namespace="a-namespace", name="a-job"
+        )
+
+
+class TestPollingPolicy(unittest.TestCase):
+    def test_fixed_interval(self):
+        policy = FixedIntervalPolicy(interval=5)
+
+        self.assertEqual([policy.next_interval("active") for _ in range(3)], [5, 5, 5])
+
+    def test_adaptive_backoff(self):
+        policy = AdaptiveBackoffPolicy(initial=1, factor=2, maximum=5)
+
+        self.assertEqual([policy.next_interval("pending") for _ in range(5)], [1, 2, 4, 5, 5])
+        self.assertEqual(policy.next_interval("active"), 1)
+        self.assertEqual(policy.next_interval("active"), 2)
+
+        policy.reset()
+        self.assertEqual(policy.next_interval("active"), 1)
+
+
+class TestJobPoller(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.monitoring.time.sleep")
+    def test_completion(self, sleep):
+        execution = get_execution()
+        execution.runtime_context.batch_v1_api.read_namespaced_job_status.side_effect = [
+            job_event(active=1)["object"],
+            job_event(active=1)["object"],
+            job_event(succeeded=1)["object"],
+        ]
+
+        JobPoller(
+            execution=execution, policy=AdaptiveBackoffPolicy(initial=1, factor=3, maximum=10)
+        ).monitor()
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 3])
+
+    @mock.patch("zoo_calrissian_runner.monitoring.asyncio.sleep")
+    def test_completion_async(self, sleep):
+        execution = get_execution()
+        execution.runtime_context.batch_v1_api.read_namespaced_job_status.side_effect = [
+            job_event(active=1)["object"],
+            job_event(active=1)["object"],
+            job_event(succeeded=1)["object"],
+        ]
+
+        asyncio.run(
+            JobPoller(
+                execution=execution, policy=AdaptiveBackoffPolicy(initial=1, factor=3, maximum=10)
+            ).monitor_async()
+        )
+
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 3])
+
+    @mock.patch("zoo_calrissian_runner.monitoring.time")
+    def test_wall_time(self, time):
+        clock = Clock()
+        time.monotonic.side_effect = clock.monotonic
+        time.sleep.side_effect = clock.sleep
+        execution = get_execution()
+        execution.runtime_context.batch_v1_api.read_namespaced_job_status.return_value = job_event(
+            active=1
+        )["object"]
+
+        JobPoller(execution=execution, policy=FixedIntervalPolicy(interval=30), wall_time=75).monitor()
+
+        self.assertEqual([call.args[0] for call in time.sleep.call_args_list], [30, 30, 15])
+        self.assertTrue(execution.killed)
+        execution.runtime_context.batch_v1_api.delete_namespaced_job.assert_called_once_with(
+            namespace="a-namespace", name="a-job"
+        )
+
+
+class TestCalrissianBackendMonitoring(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.backends.JobPoller")
+    @mock.patch("zoo_calrissian_runner.backends.JobWatcher")
+    def test_bounded_watchers(self, JobWatcher, JobPoller):
+        async def watch(executor=None):
+            await asyncio.sleep(0.1)
+
+        JobWatcher.return_value.monitor_async = mock.Mock(side_effect=watch)
+        JobPoller.return_value.monitor_async = mock.AsyncMock()
+        backend = CalrissianBackend(watch_workers=1)
+
+        async def monitor_all():
+            await asyncio.gather(
+                *(backend.monitor_async(mock.Mock(), mode="watch", policy=None) for _ in range(3))
+            )
+
+        asyncio.run(monitor_all())
+
+        # one execution is watched in the watch pool, the others are polled
+        JobWatcher.return_value.monitor_async.assert_called_once_with(executor=backend._watch_executor)
+        self.assertEqual(JobPoller.return_value.monitor_async.call_count, 2)
@@ -0,0 +1,130 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from zoo_calrissian_runner import ZooCalrissianRunner
+from zoo_calrissian_runner.pool import SessionPool, volume_bucket
+
+
+class TestVolumeBucket(unittest.TestCase):
+    def test_volume_bucket(self):
+        self.assertEqual(volume_bucket("100Mi"), "1024Mi")
+        self.assertEqual(volume_bucket("20000Mi"), "32768Mi")
+        self.assertEqual(volume_bucket("10Gi"), "16384Mi")
+        self.assertEqual(volume_bucket("2048"), "2048Mi")
+        self.assertEqual(volume_bucket("20G"), "32768Mi")
+        self.assertEqual(volume_bucket("1.5e3Mi"), "2048Mi")
+
+        with self.assertRaises(ValueError):
+            volume_bucket("a lot")
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        def create_session(key, image_pull_secrets):
+            return SimpleNamespace(namespace="zoo-pool-ns", pool_key=key, dispose=mock.Mock())
+
+        self.pool = SessionPool(size=1, max_workers=1)
+        self.pool._create_session = mock.Mock(side_effect=create_session)
+        self.pool.scrub = mock.Mock()
+
+    def tearDown(self):
+        self.pool._executor.shutdown(wait=True)
+
+    def test_lease_and_release(self):
+        self.pool.fill("nfs", "20000Mi")
+        self.pool._executor.shutdown(wait=True)
+
+        key = SessionPool.get_key("nfs", "30000Mi")
+        self.assertEqual(len(self.pool._idle[key]), 1)
+
+        pool = self.pool
+        pool._executor = mock.Mock()
+        session = pool.lease("nfs", "30000Mi")
+
+        self.assertEqual(pool._create_session.call_count, 1)
+        self.assertEqual(pool._idle[key], [])
+
+        pool._recycle(session)
+
+        pool.scrub.assert_called_once_with(session)
+        self.assertEqual(pool._idle[key], [session])
+
+    def test_release_when_full(self):
+        self.pool._executor = mock.Mock()
+        session = self.pool.lease("nfs", "1000Mi")
+        other = self.pool.lease("nfs", "1000Mi")
+
+        self.pool._recycle(session)
+        self.pool._recycle(other)
+
+        session.dispose.assert_not_called()
+        other.dispose.assert_called_once()
+
+    def test_dispose_unscrubbed_session(self):
+        self.pool._executor = mock.Mock()
+        self.pool.scrub.side_effect = RuntimeError("scrub failed")
+        session = self.pool.lease("nfs", "1000Mi")
+
+        self.pool._recycle(session)
+
+        session.dispose.assert_called_once()
+        self.assertEqual(self.pool._idle.get(session.pool_key, []), [])
+
+    def test_max_idle(self):
+        self.pool._executor = mock.Mock()
+        self.pool.size = 2
+        self.pool.max_idle = 2
+        sessions = [self.pool.lease("nfs", size) for size in ["1000Mi", "1000Mi", "20000Mi"]]
+
+        for session in sessions:
+            self.pool._recycle(session)
+
+        # the pool holds 2 idle sessions in total, the last one is disposed
+        self.assertEqual(sum(len(idle) for idle in self.pool._idle.values()), 2)
+        sessions[2].dispose.assert_called_once()
+
+    @mock.patch("zoo_calrissian_runner.pool.time.monotonic")
+    def test_idle_ttl(self, monotonic):
+        self.pool._executor = mock.Mock()
+        self.pool.idle_ttl = 60
+        monotonic.return_value = 0
+        session = self.pool.lease("nfs", "1000Mi")
+        self.pool._recycle(session)
+
+        monotonic.return_value = 30
+        self.assertEqual(self.pool.evict_expired(), 0)
+        monotonic.return_value = 90
+        self.assertEqual(self.pool.evict_expired(), 1)
+
+        session.dispose.assert_called_once()
+        self.assertEqual(self.pool._idle, {})
+
+
+class TestKeepSession(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"SESSION_POOL_SIZE": "1", "KEEP_SESSION": "true"})
+    @mock.patch("zoo_calrissian_runner.get_session_pool")
+    def test_kept_session_not_leased(self, get_session_pool):
+        backend = mock.Mock()
+        runner = mock.Mock(backend=backend, storage_class="nfs")
+        runner.get_workflow_id.return_value = "dnbr"
+
+        session = ZooCalrissianRunner.create_session(runner, namespace="ns", volume_size="1000Mi")
+
+        get_session_pool.return_value.lease.assert_not_called()
+        self.assertIs(session, backend.create_context.return_value)
+        session.initialise.assert_called_once()
+
+
+class TestPooledSessionRelease(unittest.TestCase):
+    @mock.patch.dict(os.environ, {"SESSION_POOL_SIZE": "0"})
+    @mock.patch("zoo_calrissian_runner.get_session_reaper", return_value=None)
+    def test_pool_disabled_on_release(self, get_session_reaper):
+        runner = mock.Mock()
+        session = mock.Mock(pool_key=("nfs", "1024Mi", ""))
+
+        # the session leased before the pool was disabled is disposed
+        ZooCalrissianRunner.dispose_session(runner, session)
+
+        session.dispose.assert_called_once()
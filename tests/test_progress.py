@@ -0,0 +1,96 @@
+import time
+import unittest
+from unittest import mock
+
+from zoo_calrissian_runner.progress import PodCompletionWatcher, ProgressTracker
+
+
+def get_event(event_type, name, phase, labels=None):
+    pod = mock.Mock()
+    pod.metadata.name = name
+    pod.metadata.labels = labels
+    pod.status.phase = phase
+    return {"type": event_type, "object": pod}
+
+
+class TestProgressTracker(unittest.TestCase):
+    def test_update(self):
+        reports = []
+        tracker = ProgressTracker(total=4, callback=lambda *args: reports.append(args), min_interval=0)
+
+        self.assertFalse(tracker.update(0))
+        self.assertTrue(tracker.update(1))
+        self.assertTrue(tracker.update(3))
+        # the progress never goes back
+        self.assertFalse(tracker.update(2))
+        self.assertTrue(tracker.update(10))
+
+        self.assertEqual(
+            reports,
+            [
+                (39, "1 of 4 steps completed"),
+                (73, "3 of 4 steps completed"),
+                (90, "4 of 4 steps completed"),
+            ],
+        )
+
+    def test_throttling(self):
+        reports = []
+        tracker = ProgressTracker(total=10, callback=lambda *args: reports.append(args), min_interval=60)
+
+        for completed in range(1, 11):
+            tracker.update(completed)
+
+        self.assertEqual(len(reports), 1)
+
+        # the latest throttled progress is reported when the tracker is closed
+        tracker.close()
+        self.assertEqual(reports, [(29, "1 of 10 steps completed"), (90, "10 of 10 steps completed")])
+
+    def test_throttle_window(self):
+        reports = []
+        tracker = ProgressTracker(total=4, callback=lambda *args: reports.append(args), min_interval=0.2)
+
+        for completed in range(1, 4):
+            tracker.update(completed)
+        self.assertEqual(len(reports), 1)
+
+        # the latest throttled progress is reported when the throttle window ends
+        time.sleep(0.5)
+        self.assertEqual(reports, [(39, "1 of 4 steps completed"), (73, "3 of 4 steps completed")])
+
+        tracker.close()
+        self.assertEqual(len(reports), 2)
+
+    def test_close(self):
+        reports = []
+        tracker = ProgressTracker(total=2, callback=lambda *args: reports.append(args), min_interval=0)
+
+        tracker.close()
+
+        self.assertFalse(tracker.update(1))
+        self.assertEqual(reports, [])
+
+
+class TestPodCompletionWatcher(unittest.TestCase):
+    @mock.patch("zoo_calrissian_runner.progress.watch.Watch")
+    def test_stream(self, watch_class):
+        execution = mock.Mock()
+        execution.job.job_name = "job-1"
+        execution.is_complete.return_value = False
+        watch_class.return_value.stream.return_value = iter(
+            [
+                get_event("ADDED", "job-1-abc", "Running", labels={"job-name": "job-1"}),
+                get_event("ADDED", "kube-cp-123", "Running"),
+                get_event("MODIFIED", "kube-cp-123", "Succeeded"),
+                get_event("ADDED", "node-stac", "Running"),
+                get_event("MODIFIED", "node-stac", "Succeeded"),
+                get_event("DELETED", "node-stac", "Succeeded"),
+                get_event("DELETED", "node-cog", "Running"),
+                get_event("MODIFIED", "job-1-abc", "Succeeded", labels={"job-name": "job-1"}),
+                get_event("MODIFIED", "node-late", "Succeeded"),
+            ]
+        )
+
+        self.assertEqual(list(PodCompletionWatcher(execution).stream()), [1, 2])
+        watch_class.return_value.stop.assert_called_once()
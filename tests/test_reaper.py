@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from kubernetes.client.rest import ApiException
+
+from zoo_calrissian_runner.reaper import SessionReaper, get_session_reaper
+
+
+def get_session(namespace="zoo-job-1", side_effect=None):
+    return SimpleNamespace(
+        namespace=namespace,
+        storage_class="nfs",
+        volume_size="20000Mi",
+        dispose=mock.Mock(side_effect=side_effect),
+    )
+
+
+class TestSessionReaper(unittest.TestCase):
+    def test_dispose(self):
+        sink = mock.Mock()
+        reaper = SessionReaper(backend=mock.Mock(), metrics_sink=sink)
+        sessions = [get_session(f"zoo-job-{i}") for i in range(5)]
+
+        for session in sessions:
+            reaper.submit(session)
+
+        self.assertTrue(reaper.wait(timeout=5))
+        for session in sessions:
+            session.dispose.assert_called_once()
+        self.assertEqual(reaper.stats()["disposed"], 5)
+        self.assertEqual(reaper.stats()["backlog"], 0)
+        sink.gauge.assert_called_with("cleanup_backlog", 0)
+
+    def test_retry(self):
+        reaper = SessionReaper(backend=mock.Mock(), max_attempts=3, retry_delay=0.01)
+        session = get_session(side_effect=[RuntimeError("timeout"), None])
+
+        reaper.submit(session)
+
+        self.assertTrue(reaper.wait(timeout=5))
+        self.assertEqual(session.dispose.call_count, 2)
+        self.assertEqual(reaper.stats()["retried"], 1)
+        self.assertEqual(reaper.stats()["disposed"], 1)
+
+    def test_give_up(self):
+        reaper = SessionReaper(backend=mock.Mock(), max_attempts=2, retry_delay=0.01)
+        session = get_session(side_effect=RuntimeError("timeout"))
+
+        reaper.submit(session)
+
+        self.assertTrue(reaper.wait(timeout=5))
+        self.assertEqual(session.dispose.call_count, 2)
+        self.assertEqual(reaper.stats()["failed"], 1)
+
+    def test_already_disposed(self):
+        reaper = SessionReaper(backend=mock.Mock(), max_attempts=2, retry_delay=0.01)
+        session = get_session(side_effect=ApiException(status=404))
+
+        reaper.submit(session)
+
+        self.assertTrue(reaper.wait(timeout=5))
+        self.assertEqual(session.dispose.call_count, 1)
+        self.assertEqual(reaper.stats()["disposed"], 1)
+
+    def test_durable_queue(self):
+        backend = mock.Mock()
+
+        with tempfile.TemporaryDirectory() as queue_dir:
+            with open(os.path.join(queue_dir, "zoo-job-1.json"), "w") as f:
+                json.dump(
+                    {
+                        "namespace": "zoo-job-1",
+                        "storage_class": "nfs",
+                        "volume_size": "20000Mi",
+                        "attempts": 0,
+                        "submitted": 0,
+                    },
+                    f,
+                )
+
+            reaper = SessionReaper(backend=backend, queue_dir=queue_dir)
+            self.assertEqual(reaper.recover(min_age=600), 1)
+            self.assertTrue(reaper.wait(timeout=5))
+
+            backend.create_context.assert_called_once_with(
+                namespace="zoo-job-1", storage_class="nfs", volume_size="20000Mi"
+            )
+            backend.create_context.return_value.dispose.assert_called_once()
+            self.assertEqual(os.listdir(queue_dir), [])
+
+    def test_get_session_reaper(self):
+        with mock.patch.dict(os.environ, {"ASYNC_DISPOSE": "false"}):
+            self.assertIsNone(get_session_reaper())
+
+        backend = mock.Mock()
+        with mock.patch.dict(os.environ, {"ASYNC_DISPOSE": "true", "REAPER_WORKERS": "1"}):
+            reaper = get_session_reaper(backend)
+            self.assertIs(reaper.backend, backend)
+            self.assertIs(get_session_reaper(backend), reaper)
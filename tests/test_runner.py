@@ -3,6 +3,7 @@ import json
 import os
 import tempfile
 import unittest
+from unittest import mock
 
 import yaml
 from dotenv import load_dotenv
@@ -187,3 +188,57 @@ class TestRunnerResources(unittest.TestCase):
             execution_handler=self.execution_handler(conf=self.conf),
         )
         self.assertEqual(runner.get_volume_size(), "20000Mi")
+
+
+class TestRunnerUpload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join("tests", "app-packages", "app-package-1.cwl"), "r") as stream:
+            cls.cwl = yaml.safe_load(stream)
+
+        cls.conf = {"lenv": {"Identifier": "dnbr"}, "main": {"tmpPath": "/tmp/zoo"}}
+
+    @mock.patch("zoo_calrissian_runner.backends.VolumeStager")
+    def test_upload_files(self, VolumeStager):
+        VolumeStager.return_value.stage.return_value = {
+            "/tmp/zoo/a.txt": "/calrissian/a.txt",
+            "/tmp/zoo/b.txt": "/calrissian/b.txt",
+            "/tmp/zoo/copy-of-a.txt": "/calrissian/a.txt",
+        }
+        runner = ZooCalrissianRunner(cwl=self.cwl, conf=self.conf, inputs={}, outputs={})
+
+        processing_parameters = {
+            "aoi": "136.659,-35.96,136.923,-35.791",
+            "a_file": {"class": "File", "path": "/tmp/zoo/a.txt", "format": "text/plain"},
+            "b_file": {"class": "File", "path": "/tmp/zoo/b.txt", "format": "text/plain"},
+            "same_file": {"class": "File", "path": "/tmp/zoo/copy-of-a.txt", "format": "text/plain"},
+        }
+        runner.upload_files(mock.MagicMock(calrissian_wdir="calrissian-wdir"), processing_parameters)
+
+        VolumeStager.return_value.stage.assert_called_once_with(
+            ["/tmp/zoo/a.txt", "/tmp/zoo/b.txt", "/tmp/zoo/copy-of-a.txt"]
+        )
+        self.assertEqual(processing_parameters["aoi"], "136.659,-35.96,136.923,-35.791")
+        self.assertEqual(processing_parameters["a_file"]["path"], "/calrissian/a.txt")
+        self.assertEqual(processing_parameters["b_file"]["path"], "/calrissian/b.txt")
+        self.assertEqual(processing_parameters["same_file"]["path"], "/calrissian/a.txt")
+
+    @mock.patch("zoo_calrissian_runner.backends.VolumeStager")
+    def test_upload_parameter_files(self, VolumeStager):
+        VolumeStager.return_value.stage.return_value = {
+            "/tmp/zoo/1/data.txt": "/calrissian/data.txt",
+            "/tmp/zoo/2/data.txt": "/calrissian/0a1b2c3d4e5f/data.txt",
+        }
+        runner = ZooCalrissianRunner(cwl=self.cwl, conf=self.conf, inputs={}, outputs={})
+
+        parameter_sets = [
+            {"data": {"class": "File", "path": f"/tmp/zoo/{index}/data.txt"}} for index in [1, 2]
+        ]
+        runner.upload_parameter_files(mock.MagicMock(calrissian_wdir="calrissian-wdir"), parameter_sets)
+
+        # the files of the parameter sets are staged together
+        VolumeStager.return_value.stage.assert_called_once_with(
+            ["/tmp/zoo/1/data.txt", "/tmp/zoo/2/data.txt"]
+        )
+        self.assertEqual(parameter_sets[0]["data"]["path"], "/calrissian/data.txt")
+        self.assertEqual(parameter_sets[1]["data"]["path"], "/calrissian/0a1b2c3d4e5f/data.txt")
@@ -0,0 +1,262 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from zoo_calrissian_runner.backends import CalrissianBackend, SessionExecution
+from zoo_calrissian_runner.staging import SessionVolume, VolumeStager, file_digest
+
+
+class TestVolumeStager(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        def write(name, content):
+            path = os.path.join(self.tmp_dir.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+            return path
+
+        self.a = write("a.txt", "a")
+        self.copy_of_a = write("copy-of-a.txt", "a")
+        self.b = write("b.txt", "b")
+        self.other_b = write(os.path.join("other", "b.txt"), "another b")
+
+        self.volume = mock.MagicMock()
+        self.volume.exec.return_value = ""
+        self.stager = VolumeStager(volume=self.volume, max_workers=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_plan(self):
+        paths = [self.a, self.copy_of_a, self.b, self.other_b]
+        digests = {path: file_digest(path) for path in paths}
+
+        volume_paths = self.stager.plan(paths, digests)
+
+        self.assertEqual(volume_paths[self.a], "/calrissian/a.txt")
+        self.assertEqual(volume_paths[self.copy_of_a], "/calrissian/a.txt")
+        self.assertEqual(volume_paths[self.b], "/calrissian/b.txt")
+        self.assertEqual(volume_paths[self.other_b], f"/calrissian/{digests[self.other_b][:12]}/b.txt")
+
+    def test_stage(self):
+        self.volume.exec.return_value = f"{file_digest(self.b)}  /calrissian/b.txt\n"
+
+        self.stager.stage([self.a, self.copy_of_a, self.b, self.other_b])
+
+        copied = sorted(call.args[0] for call in self.volume.upload.call_args_list)
+        self.assertEqual(copied, sorted([self.a, self.other_b]))
+        # the helper pod is kept for the session
+        self.volume.close.assert_not_called()
+
+    def test_compressed_upload(self):
+        self.stager.compress_threshold = 0
+
+        def upload(source_path, volume_path):
+            self.assertEqual(volume_path, "/calrissian/a.txt.gz")
+            with gzip.open(source_path, "rt") as f:
+                self.assertEqual(f.read(), "a")
+
+        self.volume.upload.side_effect = upload
+        self.stager._upload(self.a, "/calrissian/a.txt")
+
+        self.volume.exec.assert_called_once_with("gunzip -f /calrissian/a.txt.gz")
+
+    def test_quoted_paths(self):
+        quoted = os.path.join(self.tmp_dir.name, "it's.txt")
+        with open(quoted, "w") as f:
+            f.write("quoted")
+
+        self.stager.stage([quoted])
+
+        self.assertEqual(
+            self.volume.exec.call_args.args[0],
+            "sha256sum '/calrissian/it'\"'\"'s.txt' 2>/dev/null || true",
+        )
+        self.volume.upload.assert_called_once_with(quoted, "/calrissian/it's.txt")
+
+
+class FakeExecResponse:
+    """In-process stand-in of a kubernetes exec websocket in binary mode"""
+
+    def __init__(self, stdout=b"", returncode=0):
+        self.stdin = io.BytesIO()
+        self.stdout = [stdout] if stdout else []
+        self.returncode = returncode
+        self.open = True
+
+    def is_open(self):
+        return self.open
+
+    def update(self, timeout=0):
+        self.open = False
+
+    def peek_stdout(self):
+        return bool(self.stdout)
+
+    def read_stdout(self):
+        return self.stdout.pop(0)
+
+    def peek_stderr(self):
+        return self.returncode != 0
+
+    def read_stderr(self):
+        return b"tar: error"
+
+    def write_stdin(self, data):
+        self.stdin.write(data)
+
+    def close(self):
+        self.open = False
+
+
+@mock.patch("zoo_calrissian_runner.staging.HelperPod")
+class TestSessionVolume(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.volume = SessionVolume(context=mock.MagicMock(namespace="ns", calrissian_wdir="wdir"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_helper_pod_started_once(self, HelperPod):
+        with mock.patch(
+            "zoo_calrissian_runner.staging.stream",
+            side_effect=lambda *args, **kwargs: FakeExecResponse(stdout=b"out"),
+        ):
+            self.assertEqual(self.volume.exec("ls"), "out")
+            self.volume.exec("ls")
+
+        HelperPod.assert_called_once()
+        self.volume.close()
+        HelperPod.return_value.dismiss.assert_called_once()
+        self.assertIsNone(self.volume.helper_pod)
+
+    def test_failed_exec(self, HelperPod):
+        with mock.patch(
+            "zoo_calrissian_runner.staging.stream", return_value=FakeExecResponse(returncode=2)
+        ):
+            with self.assertRaises(RuntimeError):
+                self.volume.exec("gunzip -f /calrissian/a.txt.gz")
+
+    def test_upload(self, HelperPod):
+        source_path = os.path.join(self.tmp_dir.name, "a.txt")
+        with open(source_path, "w") as f:
+            f.write("a")
+
+        response = FakeExecResponse()
+        with mock.patch("zoo_calrissian_runner.staging.stream", return_value=response) as stream:
+            self.volume.upload(source_path, "/calrissian/sub/b.txt")
+
+        command = stream.call_args.kwargs["command"][-1]
+        size = len(response.stdin.getvalue())
+        self.assertEqual(command, f"head -c {size} | tar xf - -C /calrissian/sub")
+
+        response.stdin.seek(0)
+        with tarfile.open(fileobj=response.stdin, mode="r:") as tar:
+            self.assertEqual(tar.getnames(), ["b.txt"])
+            self.assertEqual(tar.extractfile("b.txt").read(), b"a")
+
+    def test_failed_upload(self, HelperPod):
+        source_path = os.path.join(self.tmp_dir.name, "a.txt")
+        with open(source_path, "w") as f:
+            f.write("a")
+
+        with mock.patch(
+            "zoo_calrissian_runner.staging.stream", return_value=FakeExecResponse(returncode=1)
+        ):
+            with self.assertRaises(RuntimeError):
+                self.volume.upload(source_path, "/calrissian/a.txt")
+
+    def test_download(self, HelperPod):
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            for name, content in [("calrissian/output.json", b"{}"), ("calrissian/report.json", b"[]")]:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+        response = FakeExecResponse(stdout=archive.getvalue())
+        with mock.patch("zoo_calrissian_runner.staging.stream", return_value=response) as stream:
+            local_paths = self.volume.download(
+                ["/calrissian/output.json", "/calrissian/report.json"], destination=self.tmp_dir.name
+            )
+
+        self.assertEqual(
+            stream.call_args.kwargs["command"][-1],
+            "tar cf - /calrissian/output.json /calrissian/report.json",
+        )
+        self.assertEqual(
+            local_paths,
+            [
+                os.path.join(self.tmp_dir.name, "output.json"),
+                os.path.join(self.tmp_dir.name, "report.json"),
+            ],
+        )
+        with open(local_paths[0]) as f:
+            self.assertEqual(f.read(), "{}")
+
+    def test_download_missing(self, HelperPod):
+        with mock.patch(
+            "zoo_calrissian_runner.staging.stream", return_value=FakeExecResponse(returncode=1)
+        ):
+            self.assertEqual(self.volume.download(["/calrissian/output.json"]), [])
+
+
+class TestSessionVolumeBackend(unittest.TestCase):
+    def test_volume_per_session(self):
+        backend = CalrissianBackend()
+        context = mock.MagicMock(namespace="ns")
+
+        volume = backend.get_session_volume(context)
+        self.assertIs(backend.get_session_volume(context), volume)
+        self.assertIsNot(backend.get_session_volume(mock.MagicMock(namespace="other")), volume)
+
+        with mock.patch.object(volume, "close") as close:
+            backend.release_session(context)
+            close.assert_called_once()
+        self.assertIsNot(backend.get_session_volume(context), volume)
+
+    def test_failed_staging(self):
+        backend = CalrissianBackend()
+        context = mock.MagicMock(namespace="ns")
+        volume = backend.get_session_volume(context)
+
+        with mock.patch.object(volume, "close") as close, mock.patch(
+            "zoo_calrissian_runner.backends.VolumeStager"
+        ) as VolumeStager:
+            VolumeStager.return_value.stage.side_effect = RuntimeError("upload failed")
+            with self.assertRaises(RuntimeError):
+                backend.stage_files(context, ["/tmp/a.txt"], mount_path="/calrissian")
+
+        # the helper pod is deleted and the volume is no longer kept
+        close.assert_called_once()
+        self.assertEqual(backend._volumes, {})
+
+    def test_execution_files(self):
+        backend = CalrissianBackend()
+        context = mock.MagicMock(namespace="ns")
+        job = mock.MagicMock(calrissian_base_path="/calrissian")
+
+        execution = backend.create_execution(job=job, runtime_context=context)
+        self.assertIsInstance(execution, SessionExecution)
+
+        with mock.patch.object(execution.volume, "download") as download:
+            filenames = execution.get_file_from_volume(["output.json"])
+
+        # each execution copies its files to its own folder
+        local_path = execution.get_local_path()
+        self.assertTrue(os.path.isdir(local_path))
+        other = backend.create_execution(job=job, runtime_context=context)
+        self.assertNotEqual(other.get_local_path(), local_path)
+        other.cleanup()
+        download.assert_called_once_with(["/calrissian/output.json"], destination=local_path)
+        self.assertEqual(filenames, [os.path.join(local_path, "output.json")])
+
+        backend.release_execution(execution)
+        self.assertFalse(os.path.exists(local_path))
@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from zoo_calrissian_runner.sweeper import NamespaceSweeper, label_value, session_labels
+
+NOW = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+
+
+def namespace(name, hours, phase="Active", **labels):
+    return SimpleNamespace(
+        metadata=SimpleNamespace(
+            name=name,
+            labels=session_labels(workflow_id="dnbr", **labels),
+            creation_timestamp=NOW - timedelta(hours=hours),
+        ),
+        status=SimpleNamespace(phase=phase),
+    )
+
+
+def job(*conditions):
+    return SimpleNamespace(
+        status=SimpleNamespace(
+            conditions=[SimpleNamespace(type=type_, status="True") for type_ in conditions]
+        )
+    )
+
+
+def claim(storage):
+    return SimpleNamespace(
+        status=SimpleNamespace(capacity={"storage": storage}),
+        spec=SimpleNamespace(resources=SimpleNamespace(requests={"storage": storage})),
+    )
+
+
+class TestSessionLabels(unittest.TestCase):
+    def test_session_labels(self):
+        self.assertEqual(
+            session_labels(workflow_id="water_bodies", keep_session=True),
+            {
+                "app.kubernetes.io/managed-by": "zoo-calrissian-runner",
+                "zoo-calrissian-runner/workflow-id": "water_bodies",
+                "zoo-calrissian-runner/keep-session": "true",
+            },
+        )
+        self.assertEqual(label_value("#main/workflow"), "main-workflow")
+        self.assertEqual(len(label_value("a" * 100)), 63)
+
+
+class TestNamespaceSweeper(unittest.TestCase):
+    def setUp(self):
+        self.core_v1_api = mock.Mock()
+        self.batch_v1_api = mock.Mock()
+        self.core_v1_api.list_namespace.return_value.items = [
+            namespace("dnbr-recent", hours=1),
+            namespace("dnbr-old", hours=10),
+            namespace("dnbr-running", hours=10),
+            namespace("dnbr-kept", hours=10, keep_session=True),
+            namespace("dnbr-kept-old", hours=100, keep_session=True),
+            namespace("zoo-pool-1", hours=100, pooled=True),
+            namespace("dnbr-deleting", hours=10, phase="Terminating"),
+        ]
+        self.batch_v1_api.list_namespaced_job.side_effect = lambda namespace: SimpleNamespace(
+            items=[job("Complete"), job()] if namespace == "dnbr-running" else [job("Failed")]
+        )
+        self.core_v1_api.list_namespaced_persistent_volume_claim.return_value.items = [claim("10Gi")]
+
+        self.sweeper = NamespaceSweeper(self.core_v1_api, self.batch_v1_api, max_workers=2)
+
+    def test_get_candidates(self):
+        self.assertEqual(
+            self.sweeper.get_candidates(now=NOW), ["dnbr-old", "dnbr-running", "dnbr-kept-old"]
+        )
+        self.core_v1_api.list_namespace.assert_called_once_with(
+            label_selector="app.kubernetes.io/managed-by=zoo-calrissian-runner"
+        )
+
+        self.sweeper.include_pooled = True
+        self.assertIn("zoo-pool-1", self.sweeper.get_candidates(now=NOW))
+
+    @mock.patch("zoo_calrissian_runner.sweeper.datetime")
+    def test_sweep(self, datetime_):
+        datetime_.now.return_value = NOW
+
+        report = self.sweeper.sweep()
+
+        self.assertEqual(report["deleted"], ["dnbr-old", "dnbr-kept-old"])
+        self.assertEqual(report["running"], ["dnbr-running"])
+        self.assertEqual(report["reclaimed_bytes"], 20 * 2**30)
+        self.assertEqual(self.core_v1_api.delete_namespace.call_count, 2)
+
+    @mock.patch("zoo_calrissian_runner.sweeper.datetime")
+    def test_dry_run(self, datetime_):
+        datetime_.now.return_value = NOW
+        self.sweeper.dry_run = True
+
+        report = self.sweeper.sweep()
+
+        self.assertEqual(report["orphaned"], ["dnbr-old", "dnbr-kept-old"])
+        self.assertEqual(report["reclaimed_bytes"], 20 * 2**30)
+        self.core_v1_api.delete_namespace.assert_not_called()
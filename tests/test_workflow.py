@@ -1,5 +1,6 @@
 import os
 import unittest
+import unittest.mock
 
 import cwl_utils
 import yaml
@@ -144,3 +145,192 @@ class TestWorkflow(unittest.TestCase):
             max_cores = int(os.environ.get("DEFAULT_MAX_CORES"))
 
         self.assertEqual(max_cores, int(os.environ["DEFAULT_MAX_CORES"]))
+
+    def test_get_object_by_id(self):
+        workflow = Workflow(cwl=self.reference_wf3["cwl"], workflow_id=self.reference_wf3["workflow_id"])
+
+        self.assertEqual(workflow.get_object_by_id("nbr_wf").id.split("#")[-1], "nbr_wf")
+
+        with self.assertRaises(ValueError):
+            workflow.get_object_by_id("not_available")
+
+    def test_eval_resource_memoized(self):
+        workflow = Workflow(cwl=self.reference_wf3["cwl"], workflow_id=self.reference_wf3["workflow_id"])
+
+        resources = workflow.eval_resource()
+        resources["coresMin"].append(100)
+
+        self.assertNotIn(100, workflow.eval_resource()["coresMin"])
+
+    def test_eval_resource_invalidation(self):
+        workflow = Workflow(cwl=self.reference_wf3["cwl"], workflow_id=self.reference_wf3["workflow_id"])
+
+        self.assertEqual(len(workflow.eval_resource()["coresMin"]), 9)
+
+        workflow.raw_cwl = self.reference_wf4["cwl"]
+
+        self.assertEqual(workflow.eval_resource()["coresMin"], [3])
+
+
+SCATTER_CWL = {
+    "cwlVersion": "v1.0",
+    "$graph": [
+        {
+            "class": "Workflow",
+            "id": "tiles",
+            "requirements": [{"class": "ScatterFeatureRequirement"}],
+            "inputs": {
+                "items": {"type": "string[]"},
+                "tiles": {"type": "string[]", "default": ["a", "b"]},
+            },
+            "outputs": {"out": {"type": "Any", "outputSource": "node_cross/out"}},
+            "steps": {
+                "node_dot": {
+                    "run": "#tile_clt",
+                    "in": {"item": "items", "tile": "tiles"},
+                    "out": ["out"],
+                    "scatter": ["item", "tile"],
+                    "scatterMethod": "dotproduct",
+                },
+                "node_cross": {
+                    "run": "#tile_clt",
+                    "in": {"item": "items", "tile": "tiles"},
+                    "out": ["out"],
+                    "scatter": ["item", "tile"],
+                    "scatterMethod": "flat_crossproduct",
+                },
+                "node_downstream": {
+                    "run": "#tile_clt",
+                    "in": {"item": "node_dot/out", "tile": "tiles"},
+                    "out": ["out"],
+                    "scatter": "item",
+                },
+            },
+        },
+        {
+            "class": "CommandLineTool",
+            "id": "tile_clt",
+            "requirements": {"ResourceRequirement": {"coresMin": 1, "ramMin": 1024, "outdirMin": 100}},
+            "baseCommand": "tile",
+            "inputs": {"item": {"type": "string"}, "tile": {"type": "string"}},
+            "outputs": {"out": {"type": "string", "outputBinding": {"outputEval": "$(inputs.item)"}}},
+        },
+    ],
+}
+
+
+class TestScatterResources(unittest.TestCase):
+    def setUp(self):
+        self.workflow = Workflow(cwl=SCATTER_CWL, workflow_id="tiles")
+
+    def test_scatter_multiplier(self):
+        # without inputs the scatter widths are unknown
+        with unittest.mock.patch.dict(os.environ, {"SCATTER_MULTIPLIER": "2"}):
+            self.assertEqual(self.workflow.eval_resource()["coresMin"], [2, 2, 2])
+
+    def test_scatter_width(self):
+        resources = self.workflow.eval_resource(inputs={"items": ["x", "y", "z"]})
+
+        # flat_crossproduct: 3 x 2 shards, dotproduct and its downstream step: 3 shards
+        self.assertEqual(resources["coresMin"], [6, 3, 3])
+        self.assertEqual(resources["ramMin"], [6144, 3072, 3072])
+        self.assertEqual(resources["outdirMin"], [600, 300, 300])
+
+    def test_scatter_max_parallel(self):
+        with unittest.mock.patch.dict(os.environ, {"SCATTER_MAX_PARALLEL": "4"}):
+            resources = self.workflow.eval_resource(inputs={"items": ["x", "y", "z"]})
+
+        # the outputs of all the shards are kept
+        self.assertEqual(resources["coresMin"], [4, 3, 3])
+        self.assertEqual(resources["outdirMin"], [600, 300, 300])
+
+    def test_memoized_per_inputs(self):
+        self.assertEqual(self.workflow.eval_resource(inputs={"items": ["x"]})["coresMin"], [2, 2, 2])
+        self.assertEqual(
+            self.workflow.eval_resource(inputs={"items": ["x"] * 5, "tiles": ["a"]})["coresMin"],
+            [5, 5, 5],
+        )
+        self.assertEqual(len(self.workflow._resources), 2)
+
+
+PARALLEL_CWL = {
+    "cwlVersion": "v1.0",
+    "$graph": [
+        {
+            "class": "Workflow",
+            "id": "branches",
+            "inputs": {"item": {"type": "string"}},
+            "outputs": {"out": {"type": "Any", "outputSource": "node_merge/out"}},
+            "steps": {
+                "node_left": {"run": "#large_clt", "in": {"item": "item"}, "out": ["out"]},
+                "node_right": {"run": "#small_clt", "in": {"item": "item"}, "out": ["out"]},
+                "node_merge": {
+                    "run": "#large_clt",
+                    "in": {"item": {"source": ["node_left/out", "node_right/out"]}},
+                    "out": ["out"],
+                },
+            },
+        },
+        {
+            "class": "CommandLineTool",
+            "id": "large_clt",
+            "requirements": {
+                "ResourceRequirement": {
+                    "coresMin": 4,
+                    "ramMin": 8192,
+                    "tmpdirMin": 1000,
+                    "outdirMin": 500,
+                }
+            },
+            "baseCommand": "large",
+            "inputs": {"item": {"type": "Any"}},
+            "outputs": {"out": {"type": "string", "outputBinding": {"outputEval": "$(inputs.item)"}}},
+        },
+        {
+            "class": "CommandLineTool",
+            "id": "small_clt",
+            "requirements": {
+                "ResourceRequirement": {
+                    "coresMin": 1,
+                    "ramMin": 1024,
+                    "tmpdirMin": 200,
+                    "outdirMin": 100,
+                }
+            },
+            "baseCommand": "small",
+            "inputs": {"item": {"type": "Any"}},
+            "outputs": {"out": {"type": "string", "outputBinding": {"outputEval": "$(inputs.item)"}}},
+        },
+    ],
+}
+
+
+class TestPeakResources(unittest.TestCase):
+    def test_parallel_steps(self):
+        workflow = Workflow(cwl=PARALLEL_CWL, workflow_id="branches")
+
+        # node_left and node_right run at the same time, then node_merge
+        self.assertEqual(
+            workflow.eval_peak_resource(), {"cores": 5, "ram": 9216, "tmpdir": 1200, "outdir": 1100}
+        )
+
+    def test_scattered_sub_workflow(self):
+        workflow = Workflow(cwl=self.get_reference_wf3(), workflow_id="dnbr")
+
+        # node_nbr runs 2 nbr_wf shards of 3 node_stac shards of 3 cores each
+        inputs = {"pre_stac_item": "pre", "post_stac_item": "post", "aoi": "bbox"}
+        self.assertEqual(workflow.eval_peak_resource(inputs=inputs)["cores"], 18)
+        # the maximum over the steps ignores the sub-workflow shards
+        self.assertEqual(max(workflow.eval_resource(inputs=inputs)["coresMin"]), 9)
+
+    def test_count_tool_runs(self):
+        workflow = Workflow(cwl=self.get_reference_wf3(), workflow_id="dnbr")
+
+        # node_nbr runs nbr_wf twice: 3 node_stac, 3 node_subset, node_nbr and node_cog
+        inputs = {"pre_stac_item": "pre", "post_stac_item": "post", "aoi": "bbox"}
+        self.assertEqual(workflow.count_tool_runs(inputs=inputs), 2 * 8 + 3)
+
+    @staticmethod
+    def get_reference_wf3():
+        with open(os.path.join("tests", "app-packages", "app-package-3.cwl"), "r") as stream:
+            return yaml.safe_load(stream)
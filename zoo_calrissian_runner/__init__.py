@@ -1,21 +1,54 @@
+import asyncio
+import copy
+import functools
 import inspect
+import json
+import math
 import os
 import sys
+import threading
+import time
 import uuid
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from typing import Union
 
 import attr
 import cwl_utils
-from cwl_utils.parser import load_document_by_yaml
 from cwl_wrapper.parser import Parser
 from loguru import logger
 from pycalrissian.context import CalrissianContext
-from pycalrissian.execution import CalrissianExecution
-from pycalrissian.job import CalrissianJob
-from pycalrissian.utils import copy_to_volume
 
+from zoo_calrissian_runner.admission import (
+    AdmissionTimeout,
+    ResourceDemand,
+    get_admission_controller,
+    to_mebibytes,
+)
+from zoo_calrissian_runner.backends import ExecutionBackend, get_execution_backend
+from zoo_calrissian_runner.batching import (
+    BATCH_ENTRY_POINT,
+    build_batch_workflow,
+    get_batch_parameters,
+    get_job_batcher,
+    split_batch_output,
+)
+from zoo_calrissian_runner.cache import (
+    cwl_digest,
+    get_wrapped_cwl,
+    load_cwl,
+    wrapped_cwl_key,
+)
+from zoo_calrissian_runner.dag import max_weight_antichain, transitive_closure
 from zoo_calrissian_runner.handlers import ExecutionHandler
+from zoo_calrissian_runner.history import get_usage_history, input_size_bucket
+from zoo_calrissian_runner.logs import LogSpool
+from zoo_calrissian_runner.metrics import MetricsSink, PhaseTimer, get_metrics_sink
+from zoo_calrissian_runner.monitoring import AdaptiveBackoffPolicy, FixedIntervalPolicy, PollingPolicy
+from zoo_calrissian_runner.pool import get_session_pool
+from zoo_calrissian_runner.progress import ProgressTracker
+from zoo_calrissian_runner.reaper import get_session_reaper
+from zoo_calrissian_runner.sweeper import session_labels
 
 
 # useful class for hints in CWL
@@ -53,21 +86,48 @@ except ImportError:
     zoo = ZooStub()
 
 
+async def _run_in_executor(func, *args, **kwargs):
+    """runs a blocking call in the default executor of the running event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
 class Workflow:
     def __init__(self, cwl, workflow_id):
-        self.raw_cwl = cwl
-        self.cwl = load_document_by_yaml(cwl, "io://")
         self.workflow_id = workflow_id
+        self.raw_cwl = cwl
+
+    @property
+    def raw_cwl(self):
+        return self._raw_cwl
+
+    @raw_cwl.setter
+    def raw_cwl(self, cwl):
+        # (re)parsing the CWL invalidates the id index and the resource summary
+        self._raw_cwl = cwl
+        self.digest = cwl_digest(cwl)
+        self.cwl = load_cwl(cwl, digest=self.digest)
+
+    @property
+    def cwl(self):
+        return self._cwl
+
+    @cwl.setter
+    def cwl(self, cwl):
+        self._cwl = cwl
+        self._index = {elem.id.split("#")[-1]: elem for elem in self._cwl}
+        self._resources = {}
+        self._peak_resources = {}
 
     def get_workflow(self) -> cwl_utils.parser.cwl_v1_0.Workflow:
         # returns a cwl_utils.parser.cwl_v1_0.Workflow)
-        ids = [elem.id.split("#")[-1] for elem in self.cwl]
-
-        return self.cwl[ids.index(self.workflow_id)]
+        return self.get_object_by_id(self.workflow_id)
 
     def get_object_by_id(self, id):
-        ids = [elem.id.split("#")[-1] for elem in self.cwl]
-        return self.cwl[ids.index(id)]
+        try:
+            return self._index[id]
+        except KeyError:
+            raise ValueError(f"'{id}' is not in the CWL $graph")
 
     def get_workflow_inputs(self, mandatory=False):
         inputs = []
@@ -136,7 +196,260 @@ class Workflow:
             if len(resource_requirement) == 1:
                 return resource_requirement[0]
 
-    def eval_resource(self):
+    def eval_resource(self, inputs=None):
+        """Returns the resource requirements of the workflows and their steps
+
+        The requirements of a scattered step are multiplied by its number of shards when
+        it can be computed from the inputs (see get_scatter_width), by SCATTER_MULTIPLIER
+        otherwise. The summary is memoized per input array lengths until the CWL is
+        changed.
+
+        Args:
+            inputs (dict): the workflow input values, None to use SCATTER_MULTIPLIER
+
+        Returns:
+            dict: lists of values per resource type (coresMin, ramMax, ...)
+        """
+        key = self.get_inputs_key(inputs)
+        if key not in self._resources:
+            self._resources[key] = self._eval_resource(inputs)
+
+        return {resource_type: list(value) for resource_type, value in self._resources[key].items()}
+
+    def eval_peak_resource(self, inputs=None):
+        """Returns the peak resources of the workflow steps running at the same time
+
+        The steps depending on each other through their inputs run one after the other,
+        the others may run at the same time: the peak cores, RAM and temporary storage
+        are the heaviest sets of steps not depending on each other (scattered steps and
+        sub-workflows included). The step outputs are kept on the volume until the end
+        of the execution, the output storage is the sum of the step outputs. The steps
+        without a ResourceRequirement inherit the one of their workflow.
+
+        Args:
+            inputs (dict): the workflow input values, None to use SCATTER_MULTIPLIER
+
+        Returns:
+            dict: the peak cores, ram, tmpdir and outdir
+        """
+        key = self.get_inputs_key(inputs)
+        if key not in self._peak_resources:
+            self._peak_resources[key] = self._eval_peak_resource(self.get_workflow(), None, inputs)
+
+        return dict(self._peak_resources[key])
+
+    @staticmethod
+    def get_demand(resource_requirement) -> dict:
+        """returns the cores, ram, tmpdir and outdir of a ResourceRequirement"""
+        return {
+            resource: max(
+                getattr(resource_requirement, f"{resource}Min", None) or 0,
+                getattr(resource_requirement, f"{resource}Max", None) or 0,
+            )
+            for resource in ["cores", "ram", "tmpdir", "outdir"]
+        }
+
+    @staticmethod
+    def get_step_dependencies(workflow) -> dict:
+        """returns the steps whose outputs are read by each step of the workflow"""
+        workflow_id = workflow.id.split("#")[-1]
+        step_ids = [step.id.split("/")[-1] for step in workflow.steps]
+
+        dependencies = {}
+        for step in workflow.steps:
+            upstream = set()
+            for step_input in step.in_:
+                sources = (
+                    step_input.source if isinstance(step_input.source, list) else [step_input.source]
+                )
+                for source in sources:
+                    parts = str(source).split("#")[-1].split("/")
+                    if len(parts) == 3 and parts[0] == workflow_id and parts[1] in step_ids:
+                        upstream.add(parts[1])
+            dependencies[step.id.split("/")[-1]] = upstream
+
+        return dependencies
+
+    def _eval_peak_resource(self, workflow, inherited_requirement, inputs):
+        resource_requirement = self.get_resource_requirement(workflow) or inherited_requirement
+
+        demands = {}
+        for step in workflow.steps:
+            run = self.get_object_by_id(step.run[1:])
+            if isinstance(
+                run,
+                (
+                    cwl_utils.parser.cwl_v1_0.Workflow,
+                    cwl_utils.parser.cwl_v1_1.Workflow,
+                    cwl_utils.parser.cwl_v1_2.Workflow,
+                ),
+            ):
+                demand = self._eval_peak_resource(run, resource_requirement, inputs)
+            else:
+                demand = self.get_demand(self.get_resource_requirement(run) or resource_requirement)
+
+            parallel, shards = self.get_scatter_multipliers(workflow, step, inputs)
+            demands[step.id.split("/")[-1]] = {
+                "cores": demand["cores"] * parallel,
+                "ram": demand["ram"] * parallel,
+                "tmpdir": demand["tmpdir"] * parallel,
+                "outdir": demand["outdir"] * shards,
+            }
+
+        ancestors = transitive_closure(self.get_step_dependencies(workflow))
+
+        peak = {
+            resource: max_weight_antichain(
+                {step_id: demand[resource] for step_id, demand in demands.items()}, ancestors
+            )
+            for resource in ["cores", "ram", "tmpdir"]
+        }
+        peak["outdir"] = sum(demand["outdir"] for demand in demands.values())
+
+        return peak
+
+    def count_tool_runs(self, inputs=None, workflow=None) -> int:
+        """Returns the number of command line tool runs (pods) of the workflow
+
+        The runs of the scattered steps are counted once per shard, see
+        get_scatter_multipliers.
+
+        Args:
+            inputs (dict): the workflow input values, None to use SCATTER_MULTIPLIER
+            workflow (Workflow): the (sub-)workflow, None for the main workflow
+        """
+        workflow = workflow or self.get_workflow()
+
+        runs = 0
+        for step in workflow.steps:
+            run = self.get_object_by_id(step.run[1:])
+            if isinstance(
+                run,
+                (
+                    cwl_utils.parser.cwl_v1_0.Workflow,
+                    cwl_utils.parser.cwl_v1_1.Workflow,
+                    cwl_utils.parser.cwl_v1_2.Workflow,
+                ),
+            ):
+                step_runs = self.count_tool_runs(inputs=inputs, workflow=run)
+            elif isinstance(
+                run,
+                (
+                    cwl_utils.parser.cwl_v1_0.CommandLineTool,
+                    cwl_utils.parser.cwl_v1_1.CommandLineTool,
+                    cwl_utils.parser.cwl_v1_2.CommandLineTool,
+                ),
+            ):
+                step_runs = 1
+            else:
+                # expression tools run in the Calrissian pod
+                step_runs = 0
+
+            runs += step_runs * self.get_scatter_multipliers(workflow, step, inputs)[1]
+
+        return runs
+
+    def get_inputs_key(self, inputs):
+        """returns the memoization key of the inputs, their names and array lengths"""
+        if inputs is None:
+            return None
+        return tuple(sorted((name, self.get_length(value)) for name, value in inputs.items()))
+
+    @staticmethod
+    def get_length(value):
+        """returns the length of an array, 1 for a single value and None if unknown"""
+        if value is None:
+            return None
+        return len(value) if isinstance(value, list) else 1
+
+    def get_source_length(self, workflow, source, inputs):
+        """Returns the length of a step input source, None if unknown
+
+        The sources are the workflow inputs, valued from the inputs for the main
+        workflow and from their default value otherwise, and the outputs of the
+        scattered steps, with one element per shard.
+        """
+        workflow_id = workflow.id.split("#")[-1]
+        parts = source.split("#")[-1].split("/")
+        if parts[0] != workflow_id:
+            return None
+
+        if len(parts) == 3:
+            for step in workflow.steps:
+                if step.id.split("/")[-1] == parts[1] and step.scatter:
+                    return self.get_scatter_width(workflow, step, inputs)
+            return None
+
+        if workflow_id == self.workflow_id and parts[1] in inputs:
+            return self.get_length(inputs[parts[1]])
+
+        for inp in workflow.inputs:
+            if inp.id.split("/")[-1] == parts[1]:
+                return self.get_length(inp.default)
+
+        return None
+
+    def get_scatter_width(self, workflow, step, inputs):
+        """Returns the number of shards of a scattered step, None if unknown
+
+        A dotproduct scatter has as many shards as its scattered arrays, the
+        nested_crossproduct and flat_crossproduct scatters have the product of their
+        lengths.
+        """
+        scatter = step.scatter if isinstance(step.scatter, list) else [step.scatter]
+        step_inputs = {step_input.id: step_input for step_input in step.in_}
+
+        lengths = []
+        for parameter in scatter:
+            step_input = step_inputs.get(parameter)
+            if step_input is None or step_input.source is None:
+                return None
+
+            if isinstance(step_input.source, list):
+                source_lengths = [
+                    self.get_source_length(workflow, source, inputs) for source in step_input.source
+                ]
+                if step_input.linkMerge == "merge_flattened":
+                    if None in source_lengths:
+                        return None
+                    length = sum(source_lengths)
+                else:
+                    # merge_nested, one element per source
+                    length = len(source_lengths)
+            else:
+                length = self.get_source_length(workflow, step_input.source, inputs)
+
+            if length is None:
+                return None
+            lengths.append(length)
+
+        if str(step.scatterMethod).split("#")[-1] in ["nested_crossproduct", "flat_crossproduct"]:
+            width = 1
+            for length in lengths:
+                width *= length
+            return width
+
+        return max(lengths)
+
+    def get_scatter_multipliers(self, workflow, step, inputs):
+        """Returns the multipliers of the running (cores, RAM, tmpdir) and output sizes
+
+        The shards running at the same time are capped by SCATTER_MAX_PARALLEL while the
+        outputs of all shards are kept on the volume.
+        """
+        if not step.scatter:
+            return 1, 1
+
+        width = None if inputs is None else self.get_scatter_width(workflow, step, inputs)
+        if width is None:
+            multiplier = int(os.getenv("SCATTER_MULTIPLIER", 2))
+            return multiplier, multiplier
+
+        width = max(width, 1)
+        max_parallel = os.environ.get("SCATTER_MAX_PARALLEL")
+        return min(width, int(max_parallel)) if max_parallel else width, width
+
+    def _eval_resource(self, inputs=None):
         resources = {
             "coresMin": [],
             "coresMax": [],
@@ -174,7 +487,7 @@ class Workflow:
                     if resource_requirement := self.get_resource_requirement(
                         self.get_object_by_id(step.run[1:])
                     ):
-                        multiplier = int(os.getenv("SCATTER_MULTIPLIER", 2)) if step.scatter else 1
+                        parallel, shards = self.get_scatter_multipliers(elem, step, inputs)
                         for resource_type in [
                             "coresMin",
                             "coresMax",
@@ -186,6 +499,7 @@ class Workflow:
                             "outdirMax",
                         ]:
                             if getattr(resource_requirement, resource_type):
+                                multiplier = shards if resource_type.startswith("outdir") else parallel
                                 resources[resource_type].append(
                                     getattr(resource_requirement, resource_type) * multiplier
                                 )
@@ -287,16 +601,31 @@ class ZooCalrissianRunner:
         inputs,
         outputs,
         execution_handler: Union[ExecutionHandler, None] = None,
+        polling_policy: Union[PollingPolicy, None] = None,
+        metrics_sink: Union[MetricsSink, None] = None,
+        backend: Union[ExecutionBackend, None] = None,
     ):
         self.zoo_conf = ZooConf(conf)
         self.inputs = ZooInputs(inputs)
         self.outputs = ZooOutputs(outputs)
-        self.cwl = Workflow(cwl, self.zoo_conf.workflow_id)
+        # a parsed Workflow may be shared by the runners of the same app package
+        self.cwl = cwl if isinstance(cwl, Workflow) else Workflow(cwl, self.zoo_conf.workflow_id)
 
         self.handler = execution_handler
+        self.backend = backend or get_execution_backend()
 
         self.storage_class = os.environ.get("STORAGE_CLASS", "openebs-nfs-test")
-        self.monitor_interval = 30
+        self.monitor_interval = int(os.environ.get("MONITOR_INTERVAL", 30))
+        self.monitor_mode = os.environ.get("MONITOR_MODE", "watch")
+        self.monitor_wall_time = (
+            int(os.environ["MONITOR_WALL_TIME"]) if os.environ.get("MONITOR_WALL_TIME") else None
+        )
+        self.polling_policy = polling_policy or self.get_polling_policy()
+        self.metrics_sink = metrics_sink or get_metrics_sink()
+        self.timer = PhaseTimer()
+        self.execution = None
+        self.log_spool = None
+        self.progress_tracker = None
         if "lenv" in self.zoo_conf.conf and "usid" in self.zoo_conf.conf["lenv"]:
             uuidString=self.zoo_conf.conf['lenv']['usid']
             self._namespace_name = self.shorten_namespace(
@@ -315,18 +644,41 @@ class ZooCalrissianRunner:
                 value = value[:-1]
         return value
 
+    def get_resources(self) -> dict:
+        """returns the resource requirements with the scatter widths of the inputs"""
+        return self.cwl.eval_resource(inputs=self.get_processing_parameters())
+
+    def get_peak_resources(self) -> Union[dict, None]:
+        """returns the peak resources of the steps running at the same time or None
+
+        The peak resources are used with RESOURCE_ESTIMATION set to dag.
+        """
+        resource_estimation = os.environ.get("RESOURCE_ESTIMATION", "max")
+        if resource_estimation not in ["max", "dag"]:
+            raise ValueError(f"unknown resource estimation {resource_estimation}")
+        if resource_estimation == "max":
+            return None
+        return self.cwl.eval_peak_resource(inputs=self.get_processing_parameters())
+
     def get_volume_size(self) -> str:
         """returns volume size that the pods share"""
 
-        resources = self.cwl.eval_resource()
+        if peak_resources := self.get_peak_resources():
+            volume_size = peak_resources["tmpdir"] + peak_resources["outdir"]
+        else:
+            resources = self.get_resources()
 
-        # TODO how to determine the "right" volume size
-        volume_size = max(max(resources["tmpdirMin"] or [0]), max(resources["tmpdirMax"] or [0])) + max(
-            max(resources["outdirMin"] or [0]), max(resources["outdirMax"] or [0])
-        )
+            # TODO how to determine the "right" volume size
+            volume_size = max(
+                max(resources["tmpdirMin"] or [0]), max(resources["tmpdirMax"] or [0])
+            ) + max(max(resources["outdirMin"] or [0]), max(resources["outdirMax"] or [0]))
 
         if volume_size == 0:
             volume_size = os.environ.get("DEFAULT_VOLUME_SIZE")
+            if volume_size is not None:
+                # the default volume size is a quantity, e.g. 10000 (Mi) or 10Gi
+                volume_size = math.ceil(to_mebibytes(volume_size))
+        volume_size = self.right_size("disk", volume_size)
 
         logger.info(f"volume_size: {volume_size}Mi")
 
@@ -334,27 +686,94 @@ class ZooCalrissianRunner:
 
     def get_max_cores(self) -> int:
         """returns the maximum number of cores that pods can use"""
-        resources = self.cwl.eval_resource()
-
-        max_cores = max(max(resources["coresMin"] or [0]), max(resources["coresMax"] or [0]))
+        if peak_resources := self.get_peak_resources():
+            max_cores = peak_resources["cores"]
+        else:
+            resources = self.get_resources()
+            max_cores = max(max(resources["coresMin"] or [0]), max(resources["coresMax"] or [0]))
 
         if max_cores == 0:
             max_cores = int(os.environ.get("DEFAULT_MAX_CORES"))
+        max_cores = self.right_size("cores", max_cores)
         logger.info(f"max cores: {max_cores}")
 
         return max_cores
 
     def get_max_ram(self) -> str:
         """returns the maximum RAM that pods can use"""
-        resources = self.cwl.eval_resource()
-        max_ram = max(max(resources["ramMin"] or [0]), max(resources["ramMax"] or [0]))
+        if peak_resources := self.get_peak_resources():
+            max_ram = peak_resources["ram"]
+        else:
+            resources = self.get_resources()
+            max_ram = max(max(resources["ramMin"] or [0]), max(resources["ramMax"] or [0]))
 
         if max_ram == 0:
             max_ram = int(os.environ.get("DEFAULT_MAX_RAM"))
+        max_ram = self.right_size("ram", max_ram)
         logger.info(f"max RAM: {max_ram}Mi")
 
         return f"{max_ram}Mi"
 
+    def right_size(self, resource, declared):
+        """Returns the resource estimated from the usage history, at most the declared one
+
+        The declared resource is returned if USAGE_HISTORY_SIZING is not true or if the
+        service has not enough usage records for the input size bucket of the execution.
+
+        Args:
+            resource (str): cores, ram or disk
+            declared: the resource declared in the CWL (or its default), the RAM and
+                volume size in mebibytes or as a quantity (e.g. 10Gi)
+
+        Returns:
+            the cores, RAM (Mi) or volume size (Mi)
+        """
+        if declared is None or os.environ.get("USAGE_HISTORY_SIZING", "false") != "true":
+            return declared
+
+        usage_history = get_usage_history()
+        if usage_history is None:
+            return declared
+
+        declared_value = float(declared) if resource == "cores" else to_mebibytes(declared)
+        if not declared_value:
+            return declared
+
+        estimate = usage_history.estimate(
+            self.zoo_conf.workflow_id, resource, bucket=self.get_input_size_bucket()
+        )
+        if estimate is None:
+            return declared
+
+        right_sized = min(math.ceil(estimate), math.ceil(declared_value))
+        logger.info(f"{resource} right-sized from {declared} to {right_sized} with the usage history")
+        return right_sized
+
+    def get_input_size_bucket(self) -> int:
+        """returns the input size bucket of the execution in the usage history"""
+        return input_size_bucket(self.get_processing_parameters())
+
+    def record_usage(self, usage_report):
+        """records the usage report of a successful execution in the usage history"""
+        usage_history = get_usage_history()
+        if usage_history is None or not usage_report:
+            return
+
+        try:
+            usage_history.record(
+                self.zoo_conf.workflow_id, usage_report, bucket=self.get_input_size_bucket()
+            )
+        except Exception as e:
+            logger.warning(f"usage not recorded: {e}")
+
+    def get_resource_demand(self) -> ResourceDemand:
+        """returns the cores, RAM (Mi) and volume size (Mi) of the execution"""
+        return ResourceDemand(
+            cores=self.get_max_cores(),
+            ram=to_mebibytes(self.get_max_ram()),
+            disk=to_mebibytes(self.get_volume_size()),
+        )
+
     def get_namespace_name(self):
         """creates or returns the namespace"""
         if self._namespace_name is None:
@@ -365,6 +784,90 @@ class ZooCalrissianRunner:
         else:
             return self._namespace_name
 
+    def create_session(self, namespace, image_pull_secrets=None, volume_size=None) -> CalrissianContext:
+        """Creates the Calrissian session (namespace and RWX volume) or leases one
+
+        The session is not leased from the pool with KEEP_SESSION set: a kept session is
+        never scrubbed nor returned to the pool.
+
+        Args:
+            namespace (str): the namespace name if the session is not leased from the pool
+            image_pull_secrets (dict): the image pull secrets
+            volume_size (str): the volume size, the one of the execution if None
+
+        Returns:
+            CalrissianContext: the initialised session
+        """
+        session_pool = get_session_pool(self.backend)
+        volume_size = volume_size or self.get_volume_size()
+        keep_session = os.environ.get("KEEP_SESSION", "false") != "false"
+
+        if session_pool is not None and not keep_session:
+            session = session_pool.lease(
+                storage_class=self.storage_class,
+                volume_size=volume_size,
+                image_pull_secrets=image_pull_secrets,
+            )
+            logger.info(f"using pooled session {session.namespace}")
+            return session
+
+        session = self.backend.create_context(
+            namespace=namespace,
+            storage_class=self.storage_class,
+            volume_size=volume_size,
+            image_pull_secrets=image_pull_secrets,
+            labels=session_labels(workflow_id=self.get_workflow_id(), keep_session=keep_session),
+        )
+        session.initialise()
+        return session
+
+    def clean_up(self, session: CalrissianContext, timer: Union[PhaseTimer, None] = None) -> None:
+        """Releases the resources of the execution, whether it succeeded or not
+
+        The progress reporting is stopped, the streamed logs and the local copies of
+        the execution files are removed, then the session is disposed, or released
+        and kept if KEEP_SESSION is set.
+
+        Args:
+            session (CalrissianContext): the Calrissian session
+            timer (PhaseTimer): times the disposal, the execution timer by default
+        """
+        timer = self.timer if timer is None else timer
+
+        if self.progress_tracker is not None:
+            self.progress_tracker.close()
+        if self.log_spool is not None:
+            self.log_spool.close()
+        if self.execution is not None:
+            self.backend.release_execution(self.execution)
+
+        # use an environment variable to decide if we want to clean up the resources
+        if os.environ.get("KEEP_SESSION", "false") == "false":
+            logger.info("clean-up kubernetes resources")
+            with timer.phase("dispose"):
+                self.dispose_session(session)
+        else:
+            logger.info("kubernetes resources not cleaned up")
+            self.backend.release_session(session)
+
+    def dispose_session(self, session: CalrissianContext) -> None:
+        """disposes the session or hands it over to the session reaper or to the pool"""
+        self.backend.release_session(session)
+
+        if getattr(session, "pool_key", None) is not None:
+            session_pool = get_session_pool(self.backend)
+            if session_pool is not None:
+                session_pool.release(session)
+                return
+            # the pool was disabled since the session was leased
+            logger.warning(f"no session pool to release {session.namespace} to, disposing it")
+
+        session_reaper = get_session_reaper(self.backend)
+        if session_reaper is not None:
+            session_reaper.submit(session)
+        else:
+            session.dispose()
+
     def update_status(self, progress: int, message: str = None) -> None:
         """updates the execution progress (%) and provides an optional message"""
         if message:
@@ -391,159 +894,747 @@ class ZooCalrissianRunner:
             for elem in self.get_workflow_inputs(mandatory=True)
         )
 
+    def get_polling_policy(self) -> PollingPolicy:
+        """returns the polling policy set with the MONITOR_POLICY environment variable"""
+        if os.environ.get("MONITOR_POLICY", "adaptive") == "fixed":
+            return FixedIntervalPolicy(interval=self.monitor_interval)
+
+        return AdaptiveBackoffPolicy(
+            initial=float(os.environ.get("MONITOR_INITIAL_INTERVAL", 1)),
+            factor=float(os.environ.get("MONITOR_BACKOFF_FACTOR", 2)),
+            maximum=self.monitor_interval,
+        )
+
+    def monitor(self):
+        """waits for the execution to complete using a job watch stream or polling"""
+        self.backend.monitor(
+            self.execution,
+            mode=self.monitor_mode,
+            policy=self.polling_policy,
+            watch_timeout=int(os.environ.get("MONITOR_WATCH_TIMEOUT", 60)),
+            wall_time=self.monitor_wall_time,
+        )
+
+    async def monitor_async(self):
+        """waits for the execution to complete in the event loop, see monitor"""
+        await self.backend.monitor_async(
+            self.execution,
+            mode=self.monitor_mode,
+            policy=self.polling_policy,
+            watch_timeout=int(os.environ.get("MONITOR_WATCH_TIMEOUT", 60)),
+            wall_time=self.monitor_wall_time,
+        )
+
+    def count_steps(self, wrapped_workflow: dict, processing_parameters: dict) -> int:
+        """Returns the number of steps (pods) of the wrapped workflow
+
+        The stage-in and stage-out steps added by the wrapper are counted with the
+        command line tool runs of the application workflow, scatter shards included.
+
+        Args:
+            wrapped_workflow (dict): the CWL returned by wrap
+            processing_parameters (dict): the processing parameters
+        """
+        steps = self.cwl.count_tool_runs(inputs=self.get_processing_parameters())
+
+        main = next(
+            (elem for elem in wrapped_workflow.get("$graph", []) if elem.get("id") == "main"), {}
+        )
+        wrapper_steps = main.get("steps", [])
+        if isinstance(wrapper_steps, dict):
+            wrapper_steps = wrapper_steps.values()
+
+        for step in wrapper_steps:
+            if step.get("run") == f"#{self.get_workflow_id()}":
+                continue
+
+            shards = 1
+            scatter = step.get("scatter") or []
+            for parameter in [scatter] if isinstance(scatter, str) else scatter:
+                source = step.get("in", {}).get(parameter)
+                if isinstance(source, dict):
+                    source = source.get("source")
+                value = processing_parameters.get(source) if isinstance(source, str) else None
+                if isinstance(value, list):
+                    shards = max(shards, len(value))
+            steps += shards
+
+        return steps
+
+    def start_progress_reporting(self, total) -> Union[ProgressTracker, None]:
+        """Reports the progress from the completed steps in a background thread
+
+        The progress goes from 23% (execution submitted) to 90% (execution complete),
+        reported at most every PROGRESS_INTERVAL seconds.
+
+        Args:
+            total (int): the number of steps, see count_steps
+
+        Returns:
+            ProgressTracker: to close once the execution is complete, None if
+            PROGRESS_REPORTING is not true
+        """
+        if os.environ.get("PROGRESS_REPORTING", "true") != "true":
+            return None
+
+        self.progress_tracker = ProgressTracker(
+            total=total,
+            callback=lambda progress, message: self.update_status(progress=progress, message=message),
+            start=23,
+            end=90,
+            min_interval=float(os.environ.get("PROGRESS_INTERVAL", 5)),
+        )
+        threading.Thread(target=self._watch_progress, name="progress", daemon=True).start()
+        return self.progress_tracker
+
+    def _watch_progress(self):
+        try:
+            for completed in self.backend.watch_progress(
+                self.execution, watch_timeout=int(os.environ.get("MONITOR_WATCH_TIMEOUT", 60))
+            ):
+                self.progress_tracker.update(completed)
+        except Exception as e:
+            logger.warning(f"progress not reported: {e}")
+
+    def stream_logs(self):
+        """Yields the log chunks of the execution pods until the execution is complete
+
+        Yields:
+            LogChunk: the chunks of the Calrissian pod and of the tool pods
+        """
+        yield from self.backend.stream_logs(
+            self.execution,
+            poll_interval=float(os.environ.get("LOG_STREAM_INTERVAL", 5)),
+            chunk_size=int(os.environ.get("LOG_CHUNK_SIZE", 2**16)),
+            max_chunks=int(os.environ.get("LOG_QUEUE_SIZE", 256)),
+        )
+
+    def start_log_streaming(self) -> Union[threading.Thread, None]:
+        """Streams the pod logs to the handler and to the log spool in a background thread
+
+        Returns:
+            Thread: the streaming thread, None if LOG_STREAMING is not true
+        """
+        if os.environ.get("LOG_STREAMING", "false") != "true":
+            return None
+
+        self.log_spool = LogSpool(max_size=int(os.environ.get("LOG_BUFFER_SIZE", 2**20)))
+        log_streaming = threading.Thread(target=self._pump_logs, name="log-streaming", daemon=True)
+        log_streaming.start()
+        return log_streaming
+
+    def _pump_logs(self):
+        try:
+            for chunk in self.stream_logs():
+                self.log_spool.write(chunk)
+                try:
+                    self.handler.handle_log_chunk(pod=chunk.pod, chunk=chunk.text)
+                except Exception as e:
+                    logger.warning(f"log chunk of pod {chunk.pod} not handled: {e}")
+        except Exception as e:
+            logger.warning(f"log streaming interrupted: {e}")
+            self.log_spool.execution_pod = None
+
+    def get_log(self, log_streaming=None) -> str:
+        """Returns the execution log
+
+        With log streaming, the last LOG_BUFFER_SIZE bytes of the streamed log are
+        returned once the streaming is over, the execution log is fetched if the
+        streaming failed.
+
+        Args:
+            log_streaming (Thread): the streaming thread, see start_log_streaming
+        """
+        if log_streaming is not None:
+            log_streaming.join(timeout=float(os.environ.get("LOG_STREAM_TIMEOUT", 60)))
+            execution_pod = self.log_spool.execution_pod
+            if not log_streaming.is_alive() and execution_pod is not None:
+                return self.log_spool.read(execution_pod, max_size=self.log_spool.max_size)
+            logger.warning("log streaming incomplete, fetching the execution log")
+
+        return self.execution.get_log()
+
+    def retrieve_results(self, log_streaming=None) -> tuple:
+        """Fetches the output, the log, the usage report and the tool logs concurrently
+
+        The output is set in the zoo outputs as soon as it is fetched. The tool logs are
+        fetched after the usage report listing them.
+
+        Args:
+            log_streaming (Thread): the log streaming thread, see start_log_streaming
+
+        Returns:
+            tuple: the output, the log, the usage report and the tool logs
+        """
+
+        def get_usage():
+            usage_report = self.execution.get_usage_report()
+            return usage_report, self.execution.get_tool_logs()
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="retrieval") as executor:
+            output_future = executor.submit(self.execution.get_output)
+            log_future = executor.submit(self.get_log, log_streaming)
+            usage_future = executor.submit(get_usage)
+
+            output = output_future.result()
+            self.outputs.set_output(output)
+
+            usage_report, tool_logs = usage_future.result()
+            return output, log_future.result(), usage_report, tool_logs
+
+    def upload_files(self, session: CalrissianContext, processing_parameters: dict) -> None:
+        """Uploads the File processing parameters to the Calrissian volume
+
+        The files are de-duplicated by content and copied concurrently with a single
+        helper pod, then their path is updated to point to the volume.
+
+        Args:
+            session (CalrissianContext): the Calrissian session
+            processing_parameters (dict): the processing parameters, updated in place
+        """
+        self.upload_parameter_files(session, [processing_parameters])
+
+    def upload_parameter_files(self, session: CalrissianContext, parameter_sets: list) -> None:
+        """Uploads the File parameters of several parameter sets to the Calrissian volume
+
+        The files are staged together, the files of different parameter sets with
+        the same name and a different content get different volume paths.
+
+        Args:
+            session (CalrissianContext): the Calrissian session
+            parameter_sets (list): the processing parameters, updated in place
+        """
+        files = [
+            value
+            for processing_parameters in parameter_sets
+            for value in processing_parameters.values()
+            if isinstance(value, dict) and value.get("class") == "File"
+        ]
+
+        if not files:
+            return
+
+        compress_threshold = int(os.environ.get("STAGING_COMPRESS_THRESHOLD", 64))
+
+        volume_paths = self.backend.stage_files(
+            session,
+            [value["path"] for value in files],
+            mount_path="/calrissian",
+            max_workers=int(os.environ.get("STAGING_WORKERS", 4)),
+            compress_threshold=compress_threshold * 2**20 if compress_threshold > 0 else None,
+        )
+
+        for value in files:
+            value["path"] = volume_paths[value["path"]]
+
     def execute(self):
+        """Runs the execution in a new event loop, see execute_async
+
+        If the caller runs an event loop, the new event loop runs in a separate thread.
+
+        Returns:
+            int: zoo.SERVICE_SUCCEEDED or zoo.SERVICE_FAILED
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.execute_async())
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="execute") as executor:
+            return executor.submit(lambda: asyncio.run(self.execute_async())).result()
+
+    async def execute_async(self):
+        """Runs the execution without blocking the event loop
+
+        The Kubernetes API calls, the file transfers and the handler hooks run in the
+        executor threads of the event loop, the monitoring waits in the event loop, so
+        one event loop drives many concurrent runners.
+
+        Returns:
+            int: zoo.SERVICE_SUCCEEDED or zoo.SERVICE_FAILED
+        """
+        self.timer = PhaseTimer()
+
         self.update_status(progress=2, message="Pre-execution hook")
-        self.handler.pre_execution_hook()
+        with self.timer.phase("pre_hook"):
+            await _run_in_executor(self.handler.pre_execution_hook)
+
+        with self.timer.phase("parameter_check"):
+            parameters_provided = self.assert_parameters()
 
-        if not (self.assert_parameters()):
+        if not parameters_provided:
             logger.error("Mandatory parameters missing")
+            await _run_in_executor(self.report_timings, zoo.SERVICE_FAILED)
             return zoo.SERVICE_FAILED
 
+        admission_controller = get_admission_controller()
+        if admission_controller is None:
+            return await self._execute_async()
+
+        self.update_status(progress=3, message="waiting for cluster resources")
+        try:
+            with self.timer.phase("admission"):
+                ticket = await admission_controller.acquire_async(
+                    demand=self.get_resource_demand(),
+                    service=self.get_workflow_id(),
+                    priority_class=self.handler.get_priority_class(),
+                    timeout=float(os.environ["ADMISSION_TIMEOUT"])
+                    if os.environ.get("ADMISSION_TIMEOUT")
+                    else None,
+                )
+        except AdmissionTimeout as e:
+            logger.error(str(e))
+            self.update_status(progress=100, message="execution failed, cluster resources unavailable")
+            await _run_in_executor(self.report_timings, zoo.SERVICE_FAILED)
+            return zoo.SERVICE_FAILED
+
+        try:
+            return await self._execute_async()
+        finally:
+            admission_controller.release(ticket)
+
+    async def _execute_async(self):
+        job_batcher = get_job_batcher(self.run_batch)
+        if job_batcher is not None:
+            # waits for the compatible executions of the batch window
+            exit_value = await asyncio.wrap_future(await _run_in_executor(job_batcher.submit, self))
+            if exit_value is not None:
+                await _run_in_executor(self.report_timings, exit_value)
+                self.update_status(progress=100, message="execution successful")
+                return exit_value
+            logger.info("execution not batched, running it alone")
+
         logger.info("execution started")
         self.update_status(progress=5, message="starting execution")
 
-        logger.info("wrap CWL workflow with stage-in/out steps")
-        wrapped_workflow = self.wrap()
-        self.update_status(progress=10, message="workflow wrapped, creating processing environment")
-
         logger.info("create kubernetes namespace for Calrissian execution")
 
         # TODO how do we manage the secrets
-        secret_config = self.handler.get_secrets()
+        secret_config = await _run_in_executor(self.handler.get_secrets)
 
         namespace = self.get_namespace_name()
 
         self.handler.set_job_id(job_id=namespace)
 
-        logger.info(f"namespace: {namespace}")
+        # the processing environment is created while the workflow is wrapped
+        # and the processing parameters are prepared
+        session_future = asyncio.ensure_future(
+            _run_in_executor(self.open_session, namespace=namespace, image_pull_secrets=secret_config)
+        )
 
-        session = CalrissianContext(
-            namespace=namespace,
-            storage_class=self.storage_class,
-            volume_size=self.get_volume_size(),
-            image_pull_secrets=secret_config,
+        try:
+            logger.info("wrap CWL workflow with stage-in/out steps")
+            with self.timer.phase("wrap"):
+                wrapped_workflow = await _run_in_executor(self.wrap)
+            self.update_status(progress=10, message="workflow wrapped, creating processing environment")
+
+            processing_parameters = {
+                **self.get_processing_parameters(),
+                **(await _run_in_executor(self.handler.get_additional_parameters)),
+            }
+        except Exception:
+            (session,) = await asyncio.gather(session_future, return_exceptions=True)
+            if not isinstance(session, BaseException):
+                await _run_in_executor(self.clean_up, session)
+            raise
+
+        session = await session_future
+        try:
+            processing_parameters = {"process": session.namespace, **processing_parameters}
+
+            await _run_in_executor(
+                self.submit_execution,
+                session,
+                cwl=wrapped_workflow,
+                params=processing_parameters,
+                cwl_entry_point="main",
+                max_cores=self.get_max_cores(),
+                max_ram=self.get_max_ram(),
+            )
+
+            try:
+                steps = self.count_steps(wrapped_workflow, processing_parameters)
+            except Exception as e:
+                logger.warning(f"steps not counted, progress not reported: {e}")
+                steps = None
+
+            exit_value, log_streaming = await self.monitor_execution(steps=steps)
+
+            output, log, usage_report, tool_logs = await self.fetch_results(log_streaming)
+
+            if exit_value == zoo.SERVICE_SUCCEEDED:
+                await _run_in_executor(self.record_usage, usage_report)
+
+            await _run_in_executor(
+                self.deliver_outputs,
+                log=log,
+                output=output,
+                usage_report=usage_report,
+                tool_logs=tool_logs,
+            )
+        finally:
+            await _run_in_executor(self.clean_up, session)
+
+        await _run_in_executor(self.report_timings, exit_value)
+
+        self.update_status(
+            progress=100,
+            message=f'execution {"failed" if exit_value == zoo.SERVICE_FAILED else "successful"}',
         )
-        session.initialise()
-        self.update_status(progress=15, message="processing environment created, preparing execution")
 
-        processing_parameters = {
-            "process": namespace,
-            **self.get_processing_parameters(),
-            **self.handler.get_additional_parameters(),
-        }
+        return exit_value
 
+    def open_session(
+        self, namespace, image_pull_secrets=None, volume_size=None, runners=None, timer=None
+    ) -> CalrissianContext:
+        """Creates or leases the session and sets its namespace as the job id
 
-        self.update_status(progress=20, message="upload required files")
+        A session leased from the pool has its own namespace.
+
+        Args:
+            namespace (str): the namespace of a new session
+            image_pull_secrets (dict): the image pull secrets
+            volume_size (str): the volume size, see get_volume_size by default
+            runners (list): the executions run in the session, this one by default
+            timer (PhaseTimer): the timer of the phases, the execution timer by default
+
+        Returns:
+            CalrissianContext: the session
+        """
+        timer = self.timer if timer is None else timer
 
+        with timer.phase("namespace_init"):
+            session = self.create_session(
+                namespace=namespace, image_pull_secrets=image_pull_secrets, volume_size=volume_size
+            )
+        logger.info(f"namespace: {session.namespace}")
+
+        for runner in runners or [self]:
+            runner.handler.set_job_id(job_id=session.namespace)
+
+        return session
+
+    def submit_execution(
+        self,
+        session: CalrissianContext,
+        cwl: dict,
+        params: dict,
+        cwl_entry_point="main",
+        max_cores=None,
+        max_ram=None,
+        parameter_sets=None,
+        runners=None,
+        timer=None,
+    ) -> None:
+        """Uploads the input files, creates the Calrissian job and submits it
+
+        Args:
+            session (CalrissianContext): the Calrissian session
+            cwl (dict): the wrapped workflow
+            params (dict): the job parameters
+            cwl_entry_point (str): the id of the workflow to run
+            max_cores (int): the maximum number of cores
+            max_ram (str): the maximum RAM
+            parameter_sets (list): the parameters with the File inputs to upload,
+                updated in place, [params] by default
+            runners (list): the executions reporting their status, this one by default
+            timer (PhaseTimer): the timer of the phases, the execution timer by default
+        """
+        runners = runners or [self]
+        timer = self.timer if timer is None else timer
+
+        for runner in runners:
+            runner.update_status(
+                progress=15, message="processing environment created, preparing execution"
+            )
+            runner.update_status(progress=20, message="upload required files")
 
         # Upload input complex data into calrissian_wdir
-        for i in processing_parameters:
-            if isinstance(processing_parameters[i],dict):
-                if processing_parameters[i]["class"]=="File":
-                    copy_to_volume(
-                        context=session,
-                        volume={
-                            "name": session.calrissian_wdir,
-                            "persistentVolumeClaim": {
-                                "claimName": session.calrissian_wdir
-                            }
-                        },
-                        volume_mount={
-                            "name": session.calrissian_wdir,
-                            "mountPath": "/calrissian",
-                        },
-                        source_paths=[
-                            processing_parameters[i]["path"]
-                        ],
-                        destination_path="/calrissian",
-                    )
-                    processing_parameters[i]["path"]=processing_parameters[i]["path"].replace(self.zoo_conf.conf["main"]["tmpPath"],"/calrissian")
-        # checks if all parameters where provided
+        with timer.phase("upload"):
+            self.upload_parameter_files(session, parameter_sets or [params])
 
         logger.info("create Calrissian job")
-        job = CalrissianJob(
-            cwl=wrapped_workflow,
-            params=processing_parameters,
-            runtime_context=session,
-            cwl_entry_point="main",
-            max_cores=self.get_max_cores(),
-            max_ram=self.get_max_ram(),
-            pod_env_vars=self.handler.get_pod_env_vars(),
-            pod_node_selector=self.handler.get_pod_node_selector(),
-            debug=True,
-            no_read_only=True,
-            tool_logs=True,
-        )
+        with timer.phase("job_creation"):
+            job = self.backend.create_job(
+                cwl=cwl,
+                params=params,
+                runtime_context=session,
+                cwl_entry_point=cwl_entry_point,
+                max_cores=max_cores,
+                max_ram=max_ram,
+                pod_env_vars=self.handler.get_pod_env_vars(),
+                pod_node_selector=self.handler.get_pod_node_selector(),
+                debug=True,
+                no_read_only=True,
+                tool_logs=True,
+            )
 
-        self.update_status(progress=23, message="execution submitted")
+        for runner in runners:
+            runner.update_status(progress=23, message="execution submitted")
 
         logger.info("execution")
-        self.execution = CalrissianExecution(job=job, runtime_context=session)
-        self.execution.submit()
+        self.execution = self.backend.create_execution(job=job, runtime_context=session)
+        with timer.phase("submit"):
+            self.execution.submit()
+
+    async def monitor_execution(self, steps=None, stream_logs=True, timer=None) -> tuple:
+        """Waits for the submitted execution to complete
+
+        Args:
+            steps (int): the number of steps to report the progress of, see
+                count_steps, the progress is not reported if None
+            stream_logs (bool): streams the pod logs to the handler, see
+                start_log_streaming
+            timer (PhaseTimer): the timer of the phases, the execution timer by default
+
+        Returns:
+            tuple: the exit value and the log streaming thread
+        """
+        progress_tracker = self.start_progress_reporting(steps) if steps is not None else None
+
+        submitted = datetime.now(timezone.utc)
+        monitoring_start = time.perf_counter()
+        log_streaming = self.start_log_streaming() if stream_logs else None
+        await self.monitor_async()
+        elapsed = time.perf_counter() - monitoring_start
+        await _run_in_executor(self.record_run_timings, submitted, elapsed, timer=timer)
 
-        self.execution.monitor(interval=self.monitor_interval)
+        if progress_tracker is not None:
+            progress_tracker.close()
 
-        if self.execution.is_complete():
+        if await _run_in_executor(self.execution.is_complete):
             logger.info("execution complete")
 
-        if self.execution.is_succeeded():
-            exit_value = zoo.SERVICE_SUCCEEDED
-        else:
-            exit_value = zoo.SERVICE_FAILED
+        if await _run_in_executor(self.execution.is_succeeded):
+            return zoo.SERVICE_SUCCEEDED, log_streaming
+        return zoo.SERVICE_FAILED, log_streaming
+
+    async def fetch_results(self, log_streaming=None, runners=None, timer=None) -> tuple:
+        """Retrieves the output, the log, the usage report and the tool logs
+
+        Args:
+            log_streaming (Thread): the log streaming thread, see start_log_streaming
+            runners (list): the executions reporting their status, this one by default
+            timer (PhaseTimer): the timer of the phases, the execution timer by default
+
+        Returns:
+            tuple: the output, the log, the usage report and the tool logs
+        """
+        timer = self.timer if timer is None else timer
 
-        self.update_status(progress=90, message="delivering outputs, logs and usage report")
+        for runner in runners or [self]:
+            runner.update_status(progress=90, message="delivering outputs, logs and usage report")
 
         logger.info("handle outputs execution logs")
-        output = self.execution.get_output()
-        log = self.execution.get_log()
-        usage_report = self.execution.get_usage_report()
-        tool_logs = self.execution.get_tool_logs()
-
-        self.outputs.set_output(output)
-
-        self.handler.handle_outputs(
-            log=log,
-            output=output,
-            usage_report=usage_report,
-            tool_logs=tool_logs,
-        )
+        with timer.phase("output_retrieval"):
+            return await _run_in_executor(self.retrieve_results, log_streaming)
+
+    def deliver_outputs(self, output, log, usage_report, tool_logs) -> None:
+        """hands the output, the log, the usage report and the tool logs to the handler"""
+        with self.timer.phase("handle_outputs"):
+            self.handler.handle_outputs(
+                log=log,
+                output=output,
+                usage_report=usage_report,
+                tool_logs=tool_logs,
+            )
 
         self.update_status(progress=97, message="Post-execution hook")
-        self.handler.post_execution_hook(
-            log=log,
-            output=output,
-            usage_report=usage_report,
-            tool_logs=tool_logs,
-        )
+        with self.timer.phase("post_hook"):
+            self.handler.post_execution_hook(
+                log=log,
+                output=output,
+                usage_report=usage_report,
+                tool_logs=tool_logs,
+            )
 
         self.update_status(progress=99, message="clean-up processing resources")
 
-        # use an environment variable to decide if we want to clean up the resources
-        if os.environ.get("KEEP_SESSION", "false") == "false":
-            logger.info("clean-up kubernetes resources")
-            session.dispose()
-        else:
-            logger.info("kubernetes resources not cleaned up")
+    @staticmethod
+    def run_batch(runners) -> list:
+        """Runs compatible executions as one Calrissian execution, see JobBatcher
+
+        The wrapped workflow of the first runner is scattered over the processing
+        parameters of all the runners, in a session of its own sized for all of them.
+        The session namespace is the job id of all the executions, the `process`
+        parameter of each execution is the namespace with the position of the
+        execution in the batch. The batch goes through the steps of an execution run
+        alone and its executions report the same statuses. The output of each
+        execution is handed over to its own handler with the log, the usage report
+        and the tool logs of the whole batch. If the batch fails, the failed
+        executions are not known: all of them run alone.
 
-        self.update_status(
-            progress=100,
-            message=f'execution {"failed" if exit_value == zoo.SERVICE_FAILED else "successful"}',
+        Args:
+            runners (list): the runners of the compatible executions
+
+        Returns:
+            list: the exit value of each execution or the exception its hooks raised,
+            None for all of them if the batch failed
+        """
+        return asyncio.run(ZooCalrissianRunner._run_batch_async(runners))
+
+    @staticmethod
+    async def _run_batch_async(runners) -> list:
+        lead = runners[0]
+        timer = PhaseTimer()
+
+        for runner in runners:
+            runner.update_status(progress=5, message=f"starting execution in a batch of {len(runners)}")
+
+        with timer.phase("wrap"):
+            batch_workflow = build_batch_workflow(await _run_in_executor(lead.wrap))
+        for runner in runners:
+            runner.update_status(
+                progress=10, message="workflow wrapped, creating processing environment"
+            )
+
+        # the staged file paths are updated in the copies, not in the zoo inputs
+        parameter_sets = [
+            {
+                **copy.deepcopy(runner.get_processing_parameters()),
+                **runner.handler.get_additional_parameters(),
+            }
+            for runner in runners
+        ]
+
+        # the batch never runs in the namespace of one of its executions, they may run
+        # alone if the batch fails
+        volume_size = sum(to_mebibytes(runner.get_volume_size()) for runner in runners)
+        max_ram = sum(to_mebibytes(runner.get_max_ram()) for runner in runners)
+        session = await _run_in_executor(
+            lead.open_session,
+            namespace=lead.shorten_namespace(f"batch-{uuid.uuid4()}"),
+            image_pull_secrets=lead.handler.get_secrets(),
+            volume_size=f"{math.ceil(volume_size)}Mi" if volume_size else None,
+            runners=runners,
+            timer=timer,
         )
+        logger.info(f"batch of {len(runners)} executions in the namespace {session.namespace}")
 
-        return exit_value
+        try:
+            parameter_sets = [
+                {"process": f"{session.namespace}-{index + 1}", **parameters}
+                for index, parameters in enumerate(parameter_sets)
+            ]
+
+            # the files of all the executions are staged together, so that the files
+            # with the same name do not overwrite each other
+            await _run_in_executor(
+                lead.submit_execution,
+                session,
+                cwl=batch_workflow,
+                params=get_batch_parameters(batch_workflow, parameter_sets),
+                cwl_entry_point=BATCH_ENTRY_POINT,
+                max_cores=sum(runner.get_max_cores() for runner in runners),
+                max_ram=f"{math.ceil(max_ram)}Mi",
+                parameter_sets=parameter_sets,
+                runners=runners,
+                timer=timer,
+            )
+
+            exit_value, _ = await lead.monitor_execution(stream_logs=False, timer=timer)
+            if exit_value != zoo.SERVICE_SUCCEEDED:
+                logger.warning(f"batch {session.namespace} failed, running its executions alone")
+                return [None] * len(runners)
+
+            output, log, usage_report, tool_logs = await lead.fetch_results(runners=runners, timer=timer)
+
+            results = []
+            for index, (runner, runner_output) in enumerate(
+                zip(runners, split_batch_output(output, len(runners)))
+            ):
+                runner.outputs.set_output(runner_output)
+                # the log, usage report and tool logs cannot be split per execution
+                runner_log = (
+                    f"execution {index + 1} of the batch {session.namespace} "
+                    f"({len(runners)} executions), the log, the usage report and the tool logs "
+                    f"are those of the whole batch\n{log}"
+                )
+                try:
+                    await _run_in_executor(
+                        runner.deliver_outputs,
+                        log=runner_log,
+                        output=runner_output,
+                        usage_report=usage_report,
+                        tool_logs=tool_logs,
+                    )
+                    results.append(zoo.SERVICE_SUCCEEDED)
+                except Exception as e:
+                    logger.error(f"execution {index + 1} of the batch {session.namespace} failed: {e}")
+                    results.append(e)
+            return results
+        finally:
+            await _run_in_executor(lead.clean_up, session, timer=timer)
+
+            for runner in runners:
+                for phase, seconds in timer.timings.items():
+                    runner.timer.record(phase, seconds)
+
+    def record_run_timings(self, submitted: datetime, elapsed: float, timer=None) -> None:
+        """Splits the monitoring wall time into the queue wait and the run phases
+
+        The queue wait lasts until the Calrissian container starts, if its start time
+        cannot be read the whole monitoring wall time is recorded as the run phase.
+        """
+        timer = self.timer if timer is None else timer
+
+        queue_wait = 0
+        try:
+            started = self.backend.get_start_time(self.execution)
+            if started is not None:
+                queue_wait = min(max((started - submitted).total_seconds(), 0), elapsed)
+        except Exception as e:
+            logger.warning(f"cannot read the Calrissian pod start time: {e}")
+
+        timer.record("queue_wait", queue_wait)
+        timer.record("run", elapsed - queue_wait)
+
+    def report_timings(self, exit_value) -> dict:
+        """logs the phase timings of the execution and exports them to the metrics sink"""
+        record = {
+            "workflow_id": self.get_workflow_id(),
+            "job_id": self.handler.job_id if self.handler else None,
+            "status": "failed" if exit_value == zoo.SERVICE_FAILED else "successful",
+            "timings": {phase: round(seconds, 6) for phase, seconds in self.timer.timings.items()},
+            "total": round(self.timer.elapsed(), 6),
+        }
+        logger.info(f"execution timings: {json.dumps(record)}")
+
+        if self.metrics_sink is not None:
+            try:
+                self.metrics_sink.emit(record)
+            except Exception as e:
+                logger.warning(f"execution timings not exported: {e}")
+
+        return record
 
     def wrap(self):
         workflow_id = self.get_workflow_id()
 
-        wf = Parser(
-            cwl=self.cwl.raw_cwl,
-            output=None,
-            stagein=os.environ.get("WRAPPER_STAGE_IN", "/assets/stagein.yaml"),
-            stageout=os.environ.get("WRAPPER_STAGE_OUT", "/assets/stageout.yaml"),
-            maincwl=os.environ.get("WRAPPER_MAIN", "/assets/maincwl.yaml"),
-            rulez=os.environ.get("WRAPPER_RULES", "/assets/rules.yaml"),
-            assets=None,
-            workflow_id=workflow_id,
-        )
+        stagein = os.environ.get("WRAPPER_STAGE_IN", "/assets/stagein.yaml")
+        stageout = os.environ.get("WRAPPER_STAGE_OUT", "/assets/stageout.yaml")
+        maincwl = os.environ.get("WRAPPER_MAIN", "/assets/maincwl.yaml")
+        rulez = os.environ.get("WRAPPER_RULES", "/assets/rules.yaml")
+
+        def _wrap():
+            # cwl-wrapper updates the CWL it is given, keep the raw CWL intact
+            wf = Parser(
+                cwl=copy.deepcopy(self.cwl.raw_cwl),
+                output=None,
+                stagein=stagein,
+                stageout=stageout,
+                maincwl=maincwl,
+                rulez=rulez,
+                assets=None,
+                workflow_id=workflow_id,
+            )
+
+            return wf.out
+
+        try:
+            key = wrapped_cwl_key(self.cwl.digest, workflow_id, [stagein, stageout, maincwl, rulez])
+        except OSError:
+            # let cwl-wrapper report the missing template
+            return _wrap()
 
-        return wf.out
+        return get_wrapped_cwl(key, _wrap)
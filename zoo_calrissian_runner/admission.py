@@ -0,0 +1,280 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
+from kubernetes import client
+from kubernetes.utils import parse_quantity
+from loguru import logger
+from pycalrissian.context import CalrissianContext
+
+
+@attr.s
+class ResourceDemand:
+    """Cores, RAM (Mi) and volume storage (Mi) used by an execution"""
+
+    cores = attr.ib(default=0)
+    ram = attr.ib(default=0)
+    disk = attr.ib(default=0)
+
+    def __add__(self, other):
+        return ResourceDemand(self.cores + other.cores, self.ram + other.ram, self.disk + other.disk)
+
+    def __sub__(self, other):
+        return ResourceDemand(self.cores - other.cores, self.ram - other.ram, self.disk - other.disk)
+
+    def fits(self, capacity) -> bool:
+        """returns True if the demand is within the capacity"""
+        return self.cores <= capacity.cores and self.ram <= capacity.ram and self.disk <= capacity.disk
+
+    def clamp(self, capacity):
+        """returns the demand capped to the capacity"""
+        return ResourceDemand(
+            min(self.cores, capacity.cores), min(self.ram, capacity.ram), min(self.disk, capacity.disk)
+        )
+
+    def share(self, capacity) -> float:
+        """returns the dominant share of the demand in the capacity"""
+        return max(
+            self.cores / capacity.cores if capacity.cores else 0,
+            self.ram / capacity.ram if capacity.ram else 0,
+            self.disk / capacity.disk if capacity.disk not in [0, float("inf")] else 0,
+        )
+
+
+@attr.s
+class Ticket:
+    """An execution waiting for or holding its resources"""
+
+    demand = attr.ib()
+    service = attr.ib()
+    priority = attr.ib()
+    seq = attr.ib()
+    admitted = attr.ib(default=False)
+
+
+class AdmissionTimeout(Exception):
+    """raised when an execution is not admitted within the timeout"""
+
+
+def to_mebibytes(quantity) -> float:
+    """returns a quantity (e.g. 20000Mi, 10Gi or 4096) in mebibytes, 0 if invalid"""
+    quantity = str(quantity)
+    try:
+        if quantity.isdigit():
+            return float(quantity)
+        return float(parse_quantity(quantity)) / 2**20
+    except ValueError:
+        return 0
+
+
+def capacity_from_nodes(core_v1_api, label_selector=None) -> ResourceDemand:
+    """Returns the allocatable cores and RAM of the schedulable nodes
+
+    The volume storage is not limited.
+    """
+    capacity = ResourceDemand(cores=0, ram=0, disk=float("inf"))
+    for node in core_v1_api.list_node(label_selector=label_selector).items:
+        if node.spec.unschedulable:
+            continue
+        allocatable = node.status.allocatable or {}
+        capacity.cores += float(parse_quantity(allocatable.get("cpu", "0")))
+        capacity.ram += float(parse_quantity(allocatable.get("memory", "0"))) / 2**20
+
+    return capacity
+
+
+class AdmissionController:
+    """Queues the executions until their resources are available
+
+    An execution is admitted when its resource demand fits in the capacity left by the
+    executions already admitted. The waiting executions are admitted by priority class,
+    then by dominant resource share of their service (the service with the lowest share
+    of the admitted resources goes first) and then in arrival order. An execution
+    demanding more than the capacity is admitted alone.
+
+    Args:
+        capacity (ResourceDemand): the cores, RAM and volume storage available
+        priority_classes (dict): priority of each priority class name, higher first
+        default_priority (str): priority class of the executions without one
+    """
+
+    def __init__(self, capacity: ResourceDemand, priority_classes=None, default_priority="normal"):
+        self.capacity = capacity
+        self.priority_classes = priority_classes or {"high": 100, "normal": 50, "low": 0}
+        self.default_priority = default_priority
+
+        self._used = ResourceDemand()
+        self._usage = {}
+        self._waiting = []
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+
+    def _order(self, ticket):
+        share = self._usage.get(ticket.service, ResourceDemand()).share(self.capacity)
+        return (-ticket.priority, share, ticket.seq)
+
+    def _schedule(self):
+        while self._waiting:
+            ticket = min(self._waiting, key=self._order)
+            if not (self._used + ticket.demand).fits(self.capacity):
+                break
+
+            self._waiting.remove(ticket)
+            self._used = self._used + ticket.demand
+            self._usage[ticket.service] = (
+                self._usage.get(ticket.service, ResourceDemand()) + ticket.demand
+            )
+            ticket.admitted = True
+
+        self._condition.notify_all()
+
+    def acquire(self, demand: ResourceDemand, service, priority_class=None, timeout=None) -> Ticket:
+        """Blocks until the execution is admitted
+
+        Args:
+            demand (ResourceDemand): the execution resources
+            service (str): the service identifier, used for the fair sharing
+            priority_class (str): the priority class name
+            timeout (float): maximum waiting time in seconds, None to wait forever
+
+        Returns:
+            Ticket: to release once the execution is over
+
+        Raises:
+            AdmissionTimeout: if the execution is not admitted within the timeout
+        """
+        priority_class = priority_class or self.default_priority
+        if priority_class not in self.priority_classes:
+            raise ValueError(f"unknown priority class {priority_class}")
+
+        if not demand.fits(self.capacity):
+            logger.warning(f"demand {demand} exceeds the capacity {self.capacity}")
+
+        ticket = Ticket(
+            demand=demand.clamp(self.capacity),
+            service=service,
+            priority=self.priority_classes[priority_class],
+            seq=next(self._seq),
+        )
+
+        start = time.monotonic()
+        with self._condition:
+            self._waiting.append(ticket)
+            self._schedule()
+            if not ticket.admitted:
+                logger.info(
+                    f"{service} execution queued ({len(self._waiting)} waiting, "
+                    f"{self._used} of {self.capacity} used)"
+                )
+            if not self._condition.wait_for(lambda: ticket.admitted, timeout=timeout):
+                self._waiting.remove(ticket)
+                self._schedule()
+                raise AdmissionTimeout(f"{service} execution not admitted after {timeout}s")
+
+        logger.info(f"{service} execution admitted after {time.monotonic() - start:.1f}s")
+        return ticket
+
+    async def acquire_async(
+        self, demand: ResourceDemand, service, priority_class=None, timeout=None
+    ) -> Ticket:
+        """Waits until the execution is admitted without blocking the event loop
+
+        The wait holds a thread of the admission wait executor, not an event loop
+        executor thread. If the waiting task is cancelled, the ticket admitted after
+        the cancellation is released.
+
+        Returns:
+            Ticket: to release once the execution is over, see acquire
+        """
+        future = _wait_executor.submit(
+            self.acquire, demand=demand, service=service, priority_class=priority_class, timeout=timeout
+        )
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._release_abandoned)
+            raise
+
+    def _release_abandoned(self, future):
+        if not future.cancelled() and future.exception() is None:
+            logger.info("execution cancelled while waiting for admission, releasing its ticket")
+            self.release(future.result())
+
+    def release(self, ticket: Ticket):
+        """frees the resources of an admitted execution"""
+        with self._condition:
+            self._used = self._used - ticket.demand
+            self._usage[ticket.service] = self._usage[ticket.service] - ticket.demand
+            self._schedule()
+
+    def stats(self) -> dict:
+        """returns the used resources and the number of waiting executions per service"""
+        with self._condition:
+            waiting = {}
+            for ticket in self._waiting:
+                waiting[ticket.service] = waiting.get(ticket.service, 0) + 1
+            return {"capacity": self.capacity, "used": self._used, "waiting": waiting}
+
+
+# the waits for admission are long, each one holds a thread of this executor
+_wait_executor = ThreadPoolExecutor(max_workers=256, thread_name_prefix="admission")
+
+_admission_controller = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Returns the process-wide admission controller, None if ADMISSION_CONTROL is false
+
+    The capacity is set with ADMISSION_CORES, ADMISSION_RAM and ADMISSION_DISK, the
+    cores and RAM not set are read from the allocatable resources of the nodes
+    selected with ADMISSION_NODE_SELECTOR.
+    """
+    global _admission_controller
+
+    if os.environ.get("ADMISSION_CONTROL", "false") != "true":
+        return None
+
+    with _admission_controller_lock:
+        if _admission_controller is None:
+            _admission_controller = _create_admission_controller()
+        return _admission_controller
+
+
+def _create_admission_controller():
+    cores = os.environ.get("ADMISSION_CORES")
+    ram = os.environ.get("ADMISSION_RAM")
+    disk = os.environ.get("ADMISSION_DISK")
+
+    if cores and ram:
+        capacity = ResourceDemand(cores=float(cores), ram=float(ram), disk=float("inf"))
+    else:
+        core_v1_api = client.CoreV1Api(CalrissianContext._get_api_client())
+        capacity = capacity_from_nodes(
+            core_v1_api, label_selector=os.environ.get("ADMISSION_NODE_SELECTOR")
+        )
+        capacity.cores = float(cores) if cores else capacity.cores
+        capacity.ram = float(ram) if ram else capacity.ram
+    if disk:
+        capacity.disk = float(disk)
+
+    logger.info(f"admission capacity: {capacity}")
+
+    priority_classes = None
+    if os.environ.get("ADMISSION_PRIORITY_CLASSES"):
+        priority_classes = {
+            name.strip(): int(value)
+            for name, value in (
+                item.split("=") for item in os.environ["ADMISSION_PRIORITY_CLASSES"].split(",")
+            )
+        }
+
+    return AdmissionController(
+        capacity=capacity,
+        priority_classes=priority_classes,
+        default_priority=os.environ.get("ADMISSION_DEFAULT_PRIORITY", "normal"),
+    )
@@ -0,0 +1,718 @@
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+from loguru import logger
+from pycalrissian.context import CalrissianContext
+from pycalrissian.execution import CalrissianExecution
+from pycalrissian.job import CalrissianJob
+
+from zoo_calrissian_runner.batching import BATCH_ENTRY_POINT
+from zoo_calrissian_runner.logs import LogChunk, PodLogStreamer
+from zoo_calrissian_runner.monitoring import JobPoller, JobWatcher, WatchUnavailable
+from zoo_calrissian_runner.progress import PodCompletionWatcher
+from zoo_calrissian_runner.staging import SessionVolume, VolumeStager
+
+
+class ExecutionBackend(ABC):
+    """Creates and drives the processing sessions, jobs and executions of the runner"""
+
+    @abstractmethod
+    def create_context(
+        self, namespace, storage_class, volume_size, image_pull_secrets=None, labels=None
+    ):
+        """returns a session (labelled namespace and RWX volume), not initialised"""
+
+    @abstractmethod
+    def create_job(self, **kwargs):
+        """returns a job, the keyword arguments are the CalrissianJob ones"""
+
+    @abstractmethod
+    def create_execution(self, job, runtime_context):
+        """returns an execution of the job in the session, not submitted"""
+
+    @abstractmethod
+    def stage_files(self, context, source_paths, mount_path, max_workers=4, compress_threshold=None):
+        """Copies local files to the session volume
+
+        Returns:
+            dict: the volume path of each source path
+        """
+
+    @abstractmethod
+    def monitor(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        """blocks until the submitted execution is complete"""
+
+    async def monitor_async(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        """Waits for the submitted execution to complete
+
+        The default implementation runs monitor in an executor thread.
+        """
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: self.monitor(
+                execution, mode, policy, watch_timeout=watch_timeout, wall_time=wall_time
+            ),
+        )
+
+    @abstractmethod
+    def get_start_time(self, execution):
+        """returns the time the execution started running, None if unknown"""
+
+    @abstractmethod
+    def scrub(self, context, scrub_image="busybox"):
+        """deletes the jobs, pods and configuration maps and wipes the session volume"""
+
+    def release_session(self, context):
+        """Stops the helpers of the session before it is kept, disposed or pooled
+
+        The default implementation does nothing.
+        """
+
+    def release_execution(self, execution):
+        """Removes the local copies of the execution files once handled
+
+        The default implementation does nothing.
+        """
+
+    def stream_logs(self, execution, poll_interval=5, chunk_size=2**16, max_chunks=256):
+        """Yields the log chunks of the execution pods until the execution is complete
+
+        The default implementation yields the whole execution log once complete.
+
+        Yields:
+            LogChunk: the log chunks
+        """
+        while not execution.is_complete():
+            time.sleep(poll_interval)
+        yield LogChunk(pod=execution.job.job_name, text=execution.get_log() or "", execution=True)
+
+    def watch_progress(self, execution, watch_timeout=60):
+        """Yields the number of completed steps of the execution as the steps complete
+
+        The default implementation yields nothing.
+
+        Yields:
+            int: the number of completed steps
+        """
+        yield from ()
+
+
+_api_clients = {}
+_api_clients_lock = threading.Lock()
+
+
+def get_api_client(kubeconfig_file=None):
+    """Returns the process-wide Kubernetes API client, see CalrissianContext
+
+    The kubeconfig is loaded and the connection pool created once per configuration
+    (HTTP_PROXY, KUBECONFIG and kubeconfig file).
+    """
+    key = (os.environ.get("HTTP_PROXY"), os.environ.get("KUBECONFIG"), kubeconfig_file)
+
+    with _api_clients_lock:
+        if key not in _api_clients:
+            _api_clients[key] = CalrissianContext._get_api_client(kubeconfig_file)
+        return _api_clients[key]
+
+
+class SharedClientContext(CalrissianContext):
+    """A CalrissianContext using the process-wide Kubernetes API client"""
+
+    @staticmethod
+    def _get_api_client(kubeconfig_file=None):
+        return get_api_client(kubeconfig_file)
+
+
+class SessionExecution(CalrissianExecution):
+    """A CalrissianExecution copying its files from the volume with the session helper pod
+
+    Args:
+        job (CalrissianJob): the job
+        runtime_context (CalrissianContext): the Calrissian session
+        volume (SessionVolume): the session volume
+    """
+
+    def __init__(self, job, runtime_context, volume: SessionVolume):
+        super().__init__(job=job, runtime_context=runtime_context)
+        self.volume = volume
+        self.local_path = None
+        self._local_path_lock = threading.Lock()
+
+    def get_local_path(self) -> str:
+        """returns the local folder of the execution files, created on first use"""
+        with self._local_path_lock:
+            if self.local_path is None:
+                self.local_path = tempfile.mkdtemp(prefix="zoo-calrissian-")
+            return self.local_path
+
+    def get_file_from_volume(self, filenames):
+        destination_path = self.get_local_path()
+        self.volume.download(
+            [os.path.join(self.job.calrissian_base_path, filename) for filename in filenames],
+            destination=destination_path,
+        )
+        return [os.path.join(destination_path, filename) for filename in filenames]
+
+    def get_tool_logs(self):
+        """copies the tool logs from the volume, returns their local paths"""
+        usage_report = self.get_usage_report()
+        if "children" in usage_report.keys():
+            filenames = [f"{tool['name']}.log" for tool in usage_report["children"]]
+            return self.get_file_from_volume(filenames)
+
+    def cleanup(self):
+        """removes the local folder of the execution files"""
+        with self._local_path_lock:
+            if self.local_path is not None:
+                shutil.rmtree(self.local_path, ignore_errors=True)
+                self.local_path = None
+
+
+class CalrissianBackend(ExecutionBackend):
+    """Runs the executions with Calrissian on the Kubernetes cluster
+
+    The volume of each session is served by one helper pod, see SessionVolume, kept
+    until the session is released.
+
+    The asynchronous monitoring watches at most `watch_workers` executions at a time,
+    each watch stream holding a thread of a dedicated pool. The other executions are
+    polled in the event loop.
+
+    Args:
+        transfer_timeout (float): maximum duration in seconds of a volume transfer
+        watch_workers (int): number of executions watched at the same time by
+            monitor_async, 0 to poll them all
+    """
+
+    def __init__(self, transfer_timeout=600, watch_workers=16):
+        self.transfer_timeout = transfer_timeout
+        self.watch_workers = watch_workers
+        self._watch_slots = threading.BoundedSemaphore(max(watch_workers, 1))
+        self._watch_executor = ThreadPoolExecutor(
+            max_workers=max(watch_workers, 1), thread_name_prefix="watch"
+        )
+        self._volumes = {}
+        self._volumes_lock = threading.Lock()
+
+    def get_session_volume(self, context, mount_path="/calrissian") -> SessionVolume:
+        """returns the volume of the session, its helper pod is started on first use"""
+        with self._volumes_lock:
+            if context.namespace not in self._volumes:
+                self._volumes[context.namespace] = SessionVolume(
+                    context=context, mount_path=mount_path, timeout=self.transfer_timeout
+                )
+            return self._volumes[context.namespace]
+
+    def release_session(self, context):
+        """deletes the volume helper pod of the session"""
+        with self._volumes_lock:
+            volume = self._volumes.pop(context.namespace, None)
+        if volume is not None:
+            volume.close()
+
+    def release_execution(self, execution):
+        """removes the output, usage report and tool logs copied from the volume"""
+        if isinstance(execution, SessionExecution):
+            execution.cleanup()
+
+    def create_context(
+        self, namespace, storage_class, volume_size, image_pull_secrets=None, labels=None
+    ):
+        return SharedClientContext(
+            namespace=namespace,
+            storage_class=storage_class,
+            volume_size=volume_size,
+            image_pull_secrets=image_pull_secrets,
+            labels=labels,
+        )
+
+    def create_job(self, **kwargs):
+        return CalrissianJob(**kwargs)
+
+    def create_execution(self, job, runtime_context):
+        return SessionExecution(
+            job=job,
+            runtime_context=runtime_context,
+            volume=self.get_session_volume(runtime_context, mount_path=job.calrissian_base_path),
+        )
+
+    def stage_files(self, context, source_paths, mount_path, max_workers=4, compress_threshold=None):
+        stager = VolumeStager(
+            volume=self.get_session_volume(context, mount_path=mount_path),
+            mount_path=mount_path,
+            max_workers=max_workers,
+            compress_threshold=compress_threshold,
+        )
+        try:
+            return stager.stage(source_paths)
+        except Exception:
+            # the helper pod is not kept running, a new one serves the next transfers
+            self.release_session(context)
+            raise
+
+    def monitor(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        if mode == "watch":
+            try:
+                JobWatcher(execution=execution, timeout=watch_timeout, wall_time=wall_time).monitor()
+                return
+            except WatchUnavailable as e:
+                logger.warning(f"cannot watch the execution, falling back to polling: {e}")
+
+        JobPoller(execution=execution, policy=policy, wall_time=wall_time).monitor()
+
+    async def monitor_async(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        """a watch stream holds a watch pool thread, polling sleeps in the event loop"""
+        if mode == "watch" and self.watch_workers > 0 and self._watch_slots.acquire(blocking=False):
+            try:
+                await JobWatcher(
+                    execution=execution, timeout=watch_timeout, wall_time=wall_time
+                ).monitor_async(executor=self._watch_executor)
+                return
+            except WatchUnavailable as e:
+                logger.warning(f"cannot watch the execution, falling back to polling: {e}")
+            finally:
+                self._watch_slots.release()
+        elif mode == "watch":
+            logger.debug("all the watch streams are busy, polling the execution")
+
+        await JobPoller(execution=execution, policy=policy, wall_time=wall_time).monitor_async()
+
+    def stream_logs(self, execution, poll_interval=5, chunk_size=2**16, max_chunks=256):
+        streamer = PodLogStreamer(
+            execution=execution,
+            poll_interval=poll_interval,
+            chunk_size=chunk_size,
+            max_chunks=max_chunks,
+        )
+        yield from streamer.stream()
+
+    def watch_progress(self, execution, watch_timeout=60):
+        yield from PodCompletionWatcher(execution=execution, timeout=watch_timeout).stream()
+
+    def get_start_time(self, execution):
+        """returns the start time of the Calrissian container"""
+        pods = execution.runtime_context.core_v1_api.list_namespaced_pod(
+            namespace=execution.runtime_context.namespace,
+            label_selector=f"job-name={execution.job.job_name}",
+        )
+        started = [
+            state.started_at
+            for pod in pods.items
+            for container_status in pod.status.container_statuses or []
+            for state in [container_status.state.running or container_status.state.terminated]
+            if state is not None and state.started_at is not None
+        ]
+        return min(started) if started else None
+
+    def scrub(self, context, scrub_image="busybox"):
+        logger.info(f"scrub session {context.namespace}")
+        self.release_session(context)
+
+        for job in context.batch_v1_api.list_namespaced_job(context.namespace).items:
+            context.batch_v1_api.delete_namespaced_job(
+                name=job.metadata.name,
+                namespace=context.namespace,
+                propagation_policy="Background",
+            )
+
+        for pod in context.core_v1_api.list_namespaced_pod(context.namespace).items:
+            context.delete_pod(pod.metadata.name)
+
+        for name in ["cwl-workflow", "params", "pod-env-vars", "pod-node-selector"]:
+            try:
+                context.core_v1_api.delete_namespaced_config_map(name=name, namespace=context.namespace)
+            except ApiException as e:
+                if e.status != 404:
+                    raise e
+
+        self._wipe_volume(context, scrub_image)
+
+    def _wipe_volume(self, context, scrub_image, timeout=300):
+        pod_name = f"scrub-{uuid.uuid4().hex[:6]}"
+        pod = client.V1Pod(
+            metadata=client.V1ObjectMeta(name=pod_name),
+            spec=client.V1PodSpec(
+                restart_policy="Never",
+                volumes=[
+                    client.V1Volume(
+                        name="calrissian-wdir",
+                        persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                            claim_name=context.calrissian_wdir
+                        ),
+                    )
+                ],
+                containers=[
+                    client.V1Container(
+                        name="scrub",
+                        image=scrub_image,
+                        command=["/bin/sh", "-c", "rm -rf /calrissian/* /calrissian/.[!.]*"],
+                        volume_mounts=[
+                            client.V1VolumeMount(name="calrissian-wdir", mount_path="/calrissian")
+                        ],
+                    )
+                ],
+            ),
+        )
+        context.core_v1_api.create_namespaced_pod(namespace=context.namespace, body=pod)
+
+        phase = None
+        w = watch.Watch()
+        try:
+            for event in w.stream(
+                context.core_v1_api.list_namespaced_pod,
+                namespace=context.namespace,
+                field_selector=f"metadata.name={pod_name}",
+                timeout_seconds=timeout,
+            ):
+                phase = event["object"].status.phase
+                if phase in ["Succeeded", "Failed"]:
+                    break
+        finally:
+            w.stop()
+            context.delete_pod(pod_name)
+
+        if phase != "Succeeded":
+            raise RuntimeError(f"volume of session {context.namespace} not wiped (pod phase: {phase})")
+
+
+class FakeContext:
+    """In-process stand-in of a CalrissianContext"""
+
+    def __init__(
+        self, backend, namespace, storage_class, volume_size, image_pull_secrets=None, labels=None
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.storage_class = storage_class
+        self.volume_size = volume_size
+        self.image_pull_secrets = image_pull_secrets
+        self.labels = labels
+        self.calrissian_wdir = "calrissian-wdir"
+
+    def initialise(self):
+        self.backend._sleep(self.backend.namespace_latency)
+        if self.backend._fails(self.backend.namespace_failure_rate):
+            self.backend._count("namespaces_failed")
+            raise RuntimeError(f"namespace {self.namespace} not created (simulated failure)")
+        self.backend._count("namespaces_created", active=1)
+
+    def dispose(self):
+        self.backend._sleep(self.backend.dispose_latency)
+        self.backend._count("namespaces_disposed", active=-1)
+
+
+class FakeJob:
+    """In-process stand-in of a CalrissianJob"""
+
+    def __init__(self, runtime_context, **kwargs):
+        self.runtime_context = runtime_context
+        self.job_name = f"job-{uuid.uuid4().hex[:10]}"
+        self.params = kwargs
+
+
+class FakeExecution:
+    """In-process stand-in of a CalrissianExecution
+
+    The execution starts running `pod_start_latency` seconds after its submission and
+    completes `run_latency` seconds later.
+    """
+
+    def __init__(self, backend, job, runtime_context):
+        self.backend = backend
+        self.job = job
+        self.runtime_context = runtime_context
+        self.killed = False
+        self.submitted_at = None
+        self.started_at = None
+        self.completed_at = None
+        self.succeeded = None
+
+    def submit(self):
+        self.submitted_at = time.monotonic()
+        self.started_at = self.submitted_at + self.backend._delay(self.backend.pod_start_latency)
+        self.completed_at = self.started_at + self.backend._delay(self.backend.run_latency)
+        self.succeeded = not self.backend._fails(self.backend.failure_rate)
+        self.backend._count("jobs_submitted")
+
+    def get_status(self):
+        if self.submitted_at is None:
+            return "pending"
+        now = time.monotonic()
+        if now < self.started_at:
+            return "pending"
+        if now < self.completed_at:
+            return "running"
+        return "succeeded" if self.succeeded else "failed"
+
+    def is_complete(self):
+        return self.get_status() in ["succeeded", "failed"]
+
+    def is_succeeded(self):
+        return self.get_status() == "succeeded"
+
+    def get_output(self):
+        self.backend._sleep(self.backend.retrieval_latency)
+        if not self.is_succeeded():
+            return None
+        if self.job.params.get("cwl_entry_point") == BATCH_ENTRY_POINT:
+            # one output per parameter set of the batch
+            size = len(self.job.params["params"]["process"])
+            return {
+                "stac_catalog": [
+                    f"/calrissian/{self.job.job_name}/{index}/catalog.json" for index in range(size)
+                ]
+            }
+        return {"stac_catalog": f"/calrissian/{self.job.job_name}/catalog.json"}
+
+    def get_log(self):
+        self.backend._sleep(self.backend.retrieval_latency)
+        return f"{self.job.job_name} {self.get_status()} (simulated execution)\n"
+
+    def get_usage_report(self):
+        self.backend._sleep(self.backend.retrieval_latency)
+        return {
+            "start_time": self.started_at,
+            "end_time": self.completed_at,
+            "elapsed_seconds": self.completed_at - self.started_at,
+            "max_parallel_cpus": self.job.params.get("max_cores"),
+            "max_parallel_ram_megabytes": int(str(self.job.params.get("max_ram", "0")).rstrip("Mi")),
+            "children": [],
+        }
+
+    def get_tool_logs(self):
+        self.backend._sleep(self.backend.retrieval_latency)
+        return []
+
+
+class FakeBackend(ExecutionBackend):
+    """In-process backend simulating the Kubernetes and Calrissian latencies
+
+    Used to load test the runner without a cluster: the sessions, jobs and executions
+    only sleep for the configured latencies (in seconds, each one drawn uniformly within
+    +/- `jitter` of its value) and fail with the configured rates.
+
+    Args:
+        namespace_latency (float): namespace, RBAC and volume creation time
+        pod_start_latency (float): time between the job submission and the pod start
+        run_latency (float): Calrissian run time
+        dispose_latency (float): session deletion time
+        upload_latency (float): staging time of one file
+        retrieval_latency (float): retrieval time of the output, the log, the usage report
+            and the tool logs, each
+        failure_rate (float): probability of an execution to fail
+        namespace_failure_rate (float): probability of a session creation to fail
+        jitter (float): relative variation of the latencies
+        seed (int): seed of the random generator
+    """
+
+    def __init__(
+        self,
+        namespace_latency=1.0,
+        pod_start_latency=2.0,
+        run_latency=10.0,
+        dispose_latency=1.0,
+        upload_latency=0.1,
+        retrieval_latency=0.5,
+        failure_rate=0.0,
+        namespace_failure_rate=0.0,
+        jitter=0.2,
+        seed=None,
+    ):
+        self.namespace_latency = namespace_latency
+        self.pod_start_latency = pod_start_latency
+        self.run_latency = run_latency
+        self.dispose_latency = dispose_latency
+        self.upload_latency = upload_latency
+        self.retrieval_latency = retrieval_latency
+        self.failure_rate = failure_rate
+        self.namespace_failure_rate = namespace_failure_rate
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def _delay(self, latency) -> float:
+        with self._lock:
+            return max(latency * self._random.uniform(1 - self.jitter, 1 + self.jitter), 0)
+
+    def _sleep(self, latency):
+        time.sleep(self._delay(latency))
+
+    def _fails(self, rate) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def _count(self, counter, active=0):
+        with self._lock:
+            self._stats[counter] += 1
+            self._stats["namespaces_active"] += active
+            self._stats["namespaces_peak"] = max(
+                self._stats["namespaces_peak"], self._stats["namespaces_active"]
+            )
+
+    def reset_stats(self):
+        """resets the counters and the monitoring latencies"""
+        with self._lock:
+            self._stats = {
+                "namespaces_created": 0,
+                "namespaces_failed": 0,
+                "namespaces_disposed": 0,
+                "namespaces_active": 0,
+                "namespaces_peak": 0,
+                "jobs_submitted": 0,
+                "files_staged": 0,
+            }
+            self._monitor_latencies = []
+
+    def stats(self) -> dict:
+        """Returns the backend counters
+
+        monitor_latency_mean and monitor_latency_max are the time in seconds between the
+        simulated completion of the executions and its detection by the runner.
+        """
+        with self._lock:
+            latencies = list(self._monitor_latencies)
+            stats = dict(self._stats)
+
+        stats["monitor_latency_mean"] = sum(latencies) / len(latencies) if latencies else None
+        stats["monitor_latency_max"] = max(latencies) if latencies else None
+        return stats
+
+    def create_context(
+        self, namespace, storage_class, volume_size, image_pull_secrets=None, labels=None
+    ):
+        return FakeContext(
+            backend=self,
+            namespace=namespace,
+            storage_class=storage_class,
+            volume_size=volume_size,
+            image_pull_secrets=image_pull_secrets,
+            labels=labels,
+        )
+
+    def create_job(self, **kwargs):
+        return FakeJob(**kwargs)
+
+    def create_execution(self, job, runtime_context):
+        return FakeExecution(backend=self, job=job, runtime_context=runtime_context)
+
+    def stage_files(self, context, source_paths, mount_path, max_workers=4, compress_threshold=None):
+        source_paths = list(dict.fromkeys(source_paths))
+        for _ in range(0, len(source_paths), max_workers):
+            self._sleep(self.upload_latency)
+        with self._lock:
+            self._stats["files_staged"] += len(source_paths)
+        return {path: os.path.join(mount_path, os.path.basename(path)) for path in source_paths}
+
+    def monitor(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        """Waits for the simulated completion
+
+        A watch wakes up at the completion, polling checks the status at the intervals
+        decided by the policy.
+        """
+        if mode == "watch":
+            time.sleep(max(execution.completed_at - time.monotonic(), 0))
+        else:
+            policy.reset()
+            while not execution.is_complete():
+                time.sleep(policy.next_interval(execution.get_status()))
+
+        with self._lock:
+            self._monitor_latencies.append(time.monotonic() - execution.completed_at)
+
+    async def monitor_async(self, execution, mode, policy, watch_timeout=60, wall_time=None):
+        """waits for the simulated completion in the event loop, see monitor"""
+        if mode == "watch":
+            await asyncio.sleep(max(execution.completed_at - time.monotonic(), 0))
+        else:
+            policy.reset()
+            while not execution.is_complete():
+                await asyncio.sleep(policy.next_interval(execution.get_status()))
+
+        with self._lock:
+            self._monitor_latencies.append(time.monotonic() - execution.completed_at)
+
+    def stream_logs(self, execution, poll_interval=5, chunk_size=2**16, max_chunks=256):
+        """yields a log line of the Calrissian pod and of a tool pod five times per run"""
+        tool_pod = f"{execution.job.job_name}-tool"
+        line = 0
+        while True:
+            complete = execution.is_complete()
+            if execution.get_status() != "pending":
+                line += 1
+                yield LogChunk(
+                    pod=execution.job.job_name, text=f"calrissian line {line}\n", execution=True
+                )
+                yield LogChunk(pod=tool_pod, text=f"tool line {line}\n")
+            if complete:
+                return
+            time.sleep(max(self.run_latency / 5, 0.001))
+
+    def watch_progress(self, execution, watch_timeout=60):
+        """yields a completed step five times per run"""
+        completed = 0
+        while not execution.is_complete():
+            time.sleep(max(self.run_latency / 5, 0.001))
+            if execution.get_status() != "pending":
+                completed += 1
+                yield completed
+
+    def get_start_time(self, execution):
+        if execution.started_at is None:
+            return None
+        return datetime.now(timezone.utc) + timedelta(seconds=execution.started_at - time.monotonic())
+
+    def scrub(self, context, scrub_image="busybox"):
+        self._sleep(self.dispose_latency)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_execution_backend() -> ExecutionBackend:
+    """Returns the process-wide backend set with EXECUTION_BACKEND (calrissian or fake)
+
+    The fake backend is configured with the FAKE_BACKEND_* environment variables.
+    """
+    name = os.environ.get("EXECUTION_BACKEND", "calrissian")
+
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _create_execution_backend(name)
+        return _backends[name]
+
+
+def _create_execution_backend(name):
+    if name == "calrissian":
+        return CalrissianBackend(
+            transfer_timeout=float(os.environ.get("VOLUME_TRANSFER_TIMEOUT", 600)),
+            watch_workers=int(os.environ.get("MONITOR_WATCH_WORKERS", 16)),
+        )
+    if name == "fake":
+        seed = os.environ.get("FAKE_BACKEND_SEED")
+        return FakeBackend(
+            namespace_latency=float(os.environ.get("FAKE_BACKEND_NAMESPACE_LATENCY", 1)),
+            pod_start_latency=float(os.environ.get("FAKE_BACKEND_POD_START_LATENCY", 2)),
+            run_latency=float(os.environ.get("FAKE_BACKEND_RUN_LATENCY", 10)),
+            dispose_latency=float(os.environ.get("FAKE_BACKEND_DISPOSE_LATENCY", 1)),
+            upload_latency=float(os.environ.get("FAKE_BACKEND_UPLOAD_LATENCY", 0.1)),
+            retrieval_latency=float(os.environ.get("FAKE_BACKEND_RETRIEVAL_LATENCY", 0.5)),
+            failure_rate=float(os.environ.get("FAKE_BACKEND_FAILURE_RATE", 0)),
+            namespace_failure_rate=float(os.environ.get("FAKE_BACKEND_NAMESPACE_FAILURE_RATE", 0)),
+            jitter=float(os.environ.get("FAKE_BACKEND_JITTER", 0.2)),
+            seed=int(seed) if seed else None,
+        )
+
+    raise ValueError(f"unsupported execution backend {name}")
@@ -0,0 +1,224 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+
+from loguru import logger
+
+# id of the workflow scattering the entry point over the parameter sets of a batch
+BATCH_ENTRY_POINT = "batch"
+
+# id of the step running the entry point for each parameter set
+BATCH_STEP = "run"
+
+
+def expand_type(type_):
+    """returns a CWL type with the `?` and `[]` shorthands expanded"""
+    if isinstance(type_, str):
+        if type_.endswith("?"):
+            return ["null", expand_type(type_[:-1])]
+        if type_.endswith("[]"):
+            return {"type": "array", "items": expand_type(type_[:-2])}
+    return type_
+
+
+def optional_type(type_):
+    """returns a CWL type accepting null"""
+    type_ = expand_type(type_)
+    if type_ == "null" or (isinstance(type_, list) and "null" in type_):
+        return type_
+    if isinstance(type_, list):
+        return ["null", *type_]
+    return ["null", type_]
+
+
+def _as_map(fields) -> dict:
+    # the inputs, outputs and steps are either a map or a list of fields with an id
+    if isinstance(fields, dict):
+        return fields
+    return {field["id"].lstrip("#"): field for field in fields}
+
+
+def build_batch_workflow(wrapped_workflow: dict, entry_point="main") -> dict:
+    """Returns the wrapped workflow with a batch workflow running the entry point once per
+    parameter set
+
+    The batch workflow (BATCH_ENTRY_POINT) takes an array per entry point input, with
+    the value of each parameter set (null for the default value), scatters the entry
+    point over them with the dotproduct method and returns an array per entry point
+    output, with the output of each parameter set.
+
+    Args:
+        wrapped_workflow (dict): the workflow wrapped with the stage-in/out steps
+        entry_point (str): the id of the wrapped workflow entry point
+
+    Returns:
+        dict: the wrapped workflow with the batch workflow added to its graph
+    """
+    graph = wrapped_workflow["$graph"]
+    main = next(element for element in graph if element["id"].lstrip("#") == entry_point)
+    inputs = _as_map(main["inputs"])
+    outputs = _as_map(main["outputs"])
+
+    batch = {
+        "class": "Workflow",
+        "id": BATCH_ENTRY_POINT,
+        "requirements": {"ScatterFeatureRequirement": {}, "SubworkflowFeatureRequirement": {}},
+        "inputs": {
+            name: {"type": {"type": "array", "items": optional_type(field["type"])}}
+            for name, field in inputs.items()
+        },
+        "outputs": {
+            name: {
+                "type": {"type": "array", "items": expand_type(field["type"])},
+                "outputSource": f"{BATCH_STEP}/{name}",
+            }
+            for name, field in outputs.items()
+        },
+        "steps": {
+            BATCH_STEP: {
+                "run": f"#{entry_point}",
+                "in": {name: name for name in inputs},
+                "out": list(outputs),
+                "scatter": list(inputs),
+                "scatterMethod": "dotproduct",
+            }
+        },
+    }
+
+    batch_workflow = copy.copy(wrapped_workflow)
+    batch_workflow["$graph"] = [*graph, batch]
+    return batch_workflow
+
+
+def get_batch_parameters(batch_workflow: dict, parameter_sets: list) -> dict:
+    """returns the batch workflow parameters, the parameter set values per input"""
+    batch = next(element for element in batch_workflow["$graph"] if element["id"] == BATCH_ENTRY_POINT)
+    return {name: [parameters.get(name) for parameters in parameter_sets] for name in batch["inputs"]}
+
+
+def split_batch_output(output: dict, size) -> list:
+    """returns the output of each parameter set from the batch workflow output"""
+    output = output or {}
+    return [{name: values[index] for name, values in output.items()} for index in range(size)]
+
+
+def batch_key(runner) -> str:
+    """Returns the key of the batches an execution can join
+
+    The executions of the same app package and workflow id, with the same backend,
+    image pull secrets, pod environment variables and node selector are compatible.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            [
+                runner.cwl.digest,
+                runner.get_workflow_id(),
+                id(runner.backend),
+                runner.handler.get_secrets(),
+                runner.handler.get_pod_env_vars(),
+                runner.handler.get_pod_node_selector(),
+            ],
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+class JobBatcher:
+    """Groups the compatible executions submitted within a short window into batches
+
+    The first execution of a batch opens a window of `window` seconds, the batch is
+    run when the window closes or as soon as it holds `max_size` executions. A batch of
+    one execution is not run, the execution runs alone.
+
+    Args:
+        run_batch (callable): runs the runners of a batch and returns, for each runner,
+            its exit value, an exception to raise or None to run it alone
+        window (float): time in seconds compatible executions are waited for
+        max_size (int): maximum number of executions of a batch
+    """
+
+    def __init__(self, run_batch, window=2, max_size=16):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max_size
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, runner) -> Future:
+        """Adds an execution to the batch of the compatible executions
+
+        Returns:
+            Future: the exit value of the execution, None if it has to run alone
+        """
+        key = batch_key(runner)
+        future = Future()
+
+        with self._lock:
+            batch = self._batches.setdefault(key, [])
+            batch.append((runner, future))
+            if len(batch) == 1:
+                timer = threading.Timer(self.window, self._flush, args=(key, batch))
+                timer.daemon = True
+                timer.start()
+            full = len(batch) >= self.max_size
+            if full:
+                del self._batches[key]
+
+        if full:
+            threading.Thread(target=self._run, args=(batch,), name="batch", daemon=True).start()
+        return future
+
+    def _flush(self, key, batch):
+        with self._lock:
+            if self._batches.get(key) is not batch:
+                # already run when it got full
+                return
+            del self._batches[key]
+        self._run(batch)
+
+    def _run(self, batch):
+        runners = [runner for runner, _ in batch]
+
+        if len(runners) == 1:
+            results = [None]
+        else:
+            logger.info(f"run a batch of {len(runners)} executions")
+            try:
+                results = self.run_batch(runners)
+            except Exception as e:
+                logger.error(f"batch of {len(runners)} executions failed, running them alone: {e}")
+                results = [None] * len(runners)
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_job_batcher = None
+_job_batcher_lock = threading.Lock()
+
+
+def get_job_batcher(run_batch):
+    """Returns the process-wide job batcher, None if BATCH_WINDOW is not set or 0
+
+    The batches are run with run_batch, see JobBatcher.
+    """
+    global _job_batcher
+
+    if float(os.environ.get("BATCH_WINDOW", 0)) <= 0:
+        return None
+
+    with _job_batcher_lock:
+        if _job_batcher is None:
+            _job_batcher = JobBatcher(
+                run_batch=run_batch,
+                window=float(os.environ["BATCH_WINDOW"]),
+                max_size=int(os.environ.get("BATCH_MAX_SIZE", 16)),
+            )
+        return _job_batcher
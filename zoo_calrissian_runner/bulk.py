@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import copy
+import importlib
+import json
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from loguru import logger
+
+from zoo_calrissian_runner import Workflow, ZooCalrissianRunner, zoo
+from zoo_calrissian_runner.handlers import ExecutionHandler
+
+
+class BulkExecutionHandler(ExecutionHandler):
+    """Handler of the bulk executions without a service handler: no secrets, pod
+    environment variables, node selector, additional parameters or hooks"""
+
+    def pre_execution_hook(self, **kwargs):
+        pass
+
+    def post_execution_hook(self, **kwargs):
+        pass
+
+    def get_secrets(self):
+        return None
+
+    def get_pod_env_vars(self):
+        return {}
+
+    def get_pod_node_selector(self):
+        return None
+
+    def handle_outputs(self, **kwargs):
+        pass
+
+    def get_additional_parameters(self):
+        return {}
+
+
+def read_manifest(path):
+    """Yields the zoo inputs of the executions of a JSONL manifest, one per line"""
+    with open(path, "r") as manifest:
+        for line in manifest:
+            if line.strip():
+                yield json.loads(line)
+
+
+class BulkSubmission:
+    """Runs many executions of an app package concurrently on one event loop
+
+    The CWL is parsed once and shared by the runners, the wrapped workflow is cached
+    (see WRAPPER_CACHE_SIZE) and the sessions share the Kubernetes API client of the
+    process. The manifest is read as the executions start and the result of each
+    execution is written as soon as it completes.
+
+    Args:
+        cwl (dict): the app package
+        workflow_id (str): the workflow id (CWL entry point)
+        max_concurrency (int): number of executions running at the same time
+        handler_factory (callable): returns the ExecutionHandler of an execution from
+            its zoo conf, a BulkExecutionHandler if None
+        conf (dict): the zoo conf of the executions, each one gets a copy with the
+            workflow id and its own usid
+        executor_workers (int): threads running the blocking calls of the executions
+        backend (ExecutionBackend): runs the executions, see get_execution_backend
+    """
+
+    def __init__(
+        self,
+        cwl,
+        workflow_id,
+        max_concurrency=10,
+        handler_factory=None,
+        conf=None,
+        executor_workers=32,
+        backend=None,
+    ):
+        self.workflow = Workflow(cwl, workflow_id)
+        self.workflow_id = workflow_id
+        self.max_concurrency = max_concurrency
+        self.handler_factory = handler_factory or (lambda conf: BulkExecutionHandler(conf=conf))
+        self.conf = conf or {}
+        self.executor_workers = executor_workers
+        self.backend = backend
+
+    def create_runner(self, inputs) -> ZooCalrissianRunner:
+        """returns the runner of an execution of the zoo inputs"""
+        conf = copy.deepcopy(self.conf)
+        conf.setdefault("lenv", {}).update(
+            {"Identifier": self.workflow_id, "usid": str(uuid.uuid4()), "message": ""}
+        )
+        return ZooCalrissianRunner(
+            cwl=self.workflow,
+            conf=conf,
+            inputs=copy.deepcopy(inputs),
+            outputs={"stac": {"value": None}},
+            execution_handler=self.handler_factory(conf),
+            backend=self.backend,
+        )
+
+    async def run_job(self, index, inputs) -> dict:
+        """Runs one execution
+
+        Returns:
+            dict: the manifest line index, the job id (namespace), the status
+            (successful, failed or error), the error message, the outputs, the phase
+            timings and the wall time of the execution
+        """
+        start = time.perf_counter()
+        runner = None
+        status, error = "error", None
+        try:
+            runner = self.create_runner(inputs)
+            exit_value = await runner.execute_async()
+            status = "successful" if exit_value == zoo.SERVICE_SUCCEEDED else "failed"
+        except Exception as e:
+            logger.error(f"execution {index} raised an error: {e}")
+            error = str(e)
+
+        return {
+            "index": index,
+            "job_id": runner.handler.job_id if runner is not None else None,
+            "status": status,
+            "error": error,
+            "outputs": runner.outputs.get_output_parameters() if runner is not None else None,
+            "timings": {phase: round(seconds, 6) for phase, seconds in runner.timer.timings.items()}
+            if runner is not None
+            else {},
+            "elapsed": round(time.perf_counter() - start, 6),
+        }
+
+    async def run_async(self, manifest, results) -> dict:
+        """Runs the executions of a manifest, max_concurrency at a time
+
+        Args:
+            manifest (iterable): the zoo inputs of each execution, see read_manifest
+            results (TextIO): where the execution results are written as JSON lines,
+                in completion order
+
+        Returns:
+            dict: the number of executions per status
+        """
+        jobs = enumerate(manifest)
+        summary = {}
+
+        async def worker():
+            # the workers share the manifest iterator, read between two awaits
+            for index, inputs in jobs:
+                record = await self.run_job(index, inputs)
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                summary[record["status"]] = summary.get(record["status"], 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+        return summary
+
+    def run(self, manifest, results) -> dict:
+        """runs run_async in a new event loop with executor_workers executor threads"""
+
+        async def main():
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="bulk")
+            )
+            return await self.run_async(manifest, results)
+
+        return asyncio.run(main())
+
+
+def load_handler_factory(path):
+    """returns the factory of the ExecutionHandler class `package.module:Class`"""
+    module_name, class_name = path.split(":")
+    handler_class = getattr(importlib.import_module(module_name), class_name)
+    return lambda conf: handler_class(conf=conf)
+
+
+def main():
+    """Runs an app package for each line of zoo inputs of a JSONL manifest"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("cwl", help="the app package (CWL)")
+    parser.add_argument("manifest", help="JSONL file with the zoo inputs of one execution per line")
+    parser.add_argument("--workflow-id", required=True, help="the workflow id (CWL entry point)")
+    parser.add_argument(
+        "--results", required=True, help="JSONL file the execution results are written to"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="executions running at the same time"
+    )
+    parser.add_argument(
+        "--executor-workers", type=int, default=32, help="threads running the blocking calls"
+    )
+    parser.add_argument("--handler", help="the ExecutionHandler class, as package.module:Class")
+    parser.add_argument("--conf", help="YAML or JSON file with the zoo conf of the executions")
+    args = parser.parse_args()
+
+    with open(args.cwl, "r") as stream:
+        cwl = yaml.safe_load(stream)
+
+    conf = None
+    if args.conf:
+        with open(args.conf, "r") as stream:
+            conf = yaml.safe_load(stream)
+
+    submission = BulkSubmission(
+        cwl=cwl,
+        workflow_id=args.workflow_id,
+        max_concurrency=args.concurrency,
+        handler_factory=load_handler_factory(args.handler) if args.handler else None,
+        conf=conf,
+        executor_workers=args.executor_workers,
+    )
+
+    start = time.perf_counter()
+    with open(args.results, "w") as results:
+        summary = submission.run(read_manifest(args.manifest), results)
+
+    logger.info(
+        f"{sum(summary.values())} execution(s) in {time.perf_counter() - start:.1f}s: "
+        + ", ".join(f"{count} {status}" for status, count in sorted(summary.items()))
+    )
+    sys.exit(0 if set(summary) <= {"successful"} else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cwl_utils.parser import load_document_by_yaml
+from loguru import logger
+
+
+class LRUCache:
+    """Thread-safe, bounded LRU cache with an optional time-to-live
+
+    Args:
+        max_size (int): maximum number of entries kept in the cache
+        ttl (float): entries older than ttl seconds are discarded, None to disable
+        name (str): name used in the log messages
+    """
+
+    def __init__(self, max_size=32, ttl=None, name="cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._get(key) is not None
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if self.ttl is not None and time.monotonic() - created > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        """returns the cached value for key and updates the hit/miss counters"""
+        with self._lock:
+            entry = self._get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """adds or replaces the value for key, evicting the least recently used entries"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.debug(f"{self.name}: evicted {evicted}")
+
+    def get_or_create(self, key, factory):
+        """returns the cached value for key or stores and returns factory()"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """empties the cache and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """returns the cache counters"""
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _get_ttl(variable):
+    ttl = os.environ.get(variable)
+    return float(ttl) if ttl else None
+
+
+def cwl_digest(cwl) -> str:
+    """returns a stable sha256 digest of a raw CWL document (dict)"""
+    return hashlib.sha256(json.dumps(cwl, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+# parsed cwl_utils documents shared by all the runners of the zoo process
+parsed_cwl_cache = LRUCache(
+    max_size=int(os.environ.get("CWL_CACHE_SIZE", 32)),
+    ttl=_get_ttl("CWL_CACHE_TTL"),
+    name="parsed-cwl",
+)
+
+
+def load_cwl(cwl, digest=None):
+    """Parses the raw CWL with cwl_utils, reusing the process-wide parsed CWL cache
+
+    Args:
+        cwl (dict): raw CWL document
+        digest (str): digest of the raw CWL, computed with cwl_digest if not provided
+
+    Returns:
+        the parsed CWL document
+    """
+    if digest is None:
+        digest = cwl_digest(cwl)
+
+    return parsed_cwl_cache.get_or_create(digest, lambda: load_document_by_yaml(cwl, "io://"))
+
+
+# cwl-wrapper outputs shared by all the runners of the zoo process
+wrapped_cwl_cache = LRUCache(
+    max_size=int(os.environ.get("WRAPPER_CACHE_SIZE", 32)),
+    ttl=_get_ttl("WRAPPER_CACHE_TTL"),
+    name="wrapped-cwl",
+)
+
+
+def wrapped_cwl_key(digest, workflow_id, assets):
+    """Returns the key of a wrapped workflow
+
+    Args:
+        digest (str): digest of the raw CWL
+        workflow_id (str): CWL workflow entry point
+        assets (list): paths of the cwl-wrapper templates
+
+    Returns:
+        str: a digest of the CWL, the workflow id and the templates path, size and mtime
+    """
+    key = hashlib.sha256()
+    key.update(digest.encode("utf-8"))
+    key.update(str(workflow_id).encode("utf-8"))
+    for asset in assets:
+        stat = os.stat(asset)
+        key.update(f"{os.path.abspath(asset)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return key.hexdigest()
+
+
+def get_wrapped_cwl(key, wrap):
+    """Returns the wrapped workflow for key, calling wrap() on a cache miss
+
+    The wrapped workflows are kept in memory and, if WRAPPER_CACHE_DIR is set, as JSON
+    files in that directory so that they survive the zoo process.
+
+    Args:
+        key (str): the wrapped workflow key (see wrapped_cwl_key)
+        wrap (callable): returns the wrapped workflow
+
+    Returns:
+        dict: a copy of the wrapped workflow
+    """
+    wrapped = wrapped_cwl_cache.get(key)
+
+    cache_dir = os.environ.get("WRAPPER_CACHE_DIR")
+    cache_file = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+
+    if wrapped is None and cache_file and os.path.exists(cache_file):
+        logger.info(f"load wrapped workflow from {cache_file}")
+        with open(cache_file, "r") as stream:
+            wrapped = json.load(stream)
+        wrapped_cwl_cache.set(key, wrapped)
+
+    if wrapped is None:
+        wrapped = wrap()
+        wrapped_cwl_cache.set(key, wrapped)
+
+        if cache_file:
+            os.makedirs(cache_dir, exist_ok=True)
+            # write and rename so that concurrent workers never read a partial file
+            tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_file, "w") as stream:
+                json.dump(wrapped, stream)
+            os.replace(tmp_file, cache_file)
+
+    return copy.deepcopy(wrapped)
+
+
+def cache_stats():
+    """returns the hit/miss counters of the process-wide caches"""
+    return {cache.name: cache.stats() for cache in [parsed_cwl_cache, wrapped_cwl_cache]}
@@ -0,0 +1,97 @@
+from collections import deque
+
+
+def transitive_closure(dependencies: dict) -> dict:
+    """Returns the ancestors of the nodes of a DAG
+
+    Args:
+        dependencies (dict): the direct upstream nodes of each node
+
+    Returns:
+        dict: the set of all the upstream nodes of each node
+    """
+    ancestors = {}
+
+    def visit(node, path):
+        if node in ancestors:
+            return ancestors[node]
+        if node in path:
+            raise ValueError(f"cycle detected at {node}")
+
+        path.add(node)
+        node_ancestors = set()
+        for upstream in dependencies.get(node, []):
+            node_ancestors.add(upstream)
+            node_ancestors |= visit(upstream, path)
+        path.remove(node)
+
+        ancestors[node] = node_ancestors
+        return node_ancestors
+
+    for node in dependencies:
+        visit(node, set())
+
+    return ancestors
+
+
+def _max_flow(capacities: dict, source, sink) -> float:
+    # Edmonds-Karp, the capacities are updated in place into the residual graph
+    flow = 0
+    while True:
+        parents = {source: None}
+        queue = deque([source])
+        while queue and sink not in parents:
+            node = queue.popleft()
+            for neighbour, capacity in capacities[node].items():
+                if capacity > 0 and neighbour not in parents:
+                    parents[neighbour] = node
+                    queue.append(neighbour)
+
+        if sink not in parents:
+            return flow
+
+        path_flow = float("inf")
+        node = sink
+        while parents[node] is not None:
+            path_flow = min(path_flow, capacities[parents[node]][node])
+            node = parents[node]
+
+        node = sink
+        while parents[node] is not None:
+            capacities[parents[node]][node] -= path_flow
+            capacities[node].setdefault(parents[node], 0)
+            capacities[node][parents[node]] += path_flow
+            node = parents[node]
+
+        flow += path_flow
+
+
+def max_weight_antichain(weights: dict, ancestors: dict) -> float:
+    """Returns the largest total weight of the nodes that can run at the same time
+
+    The nodes running at the same time form an antichain of the DAG (no node is an
+    ancestor of another one). By the weighted Dilworth theorem, the heaviest antichain
+    weighs as much as the minimum chain cover, the total weight minus a maximum flow
+    in the bipartite graph of the comparable pairs.
+
+    Args:
+        weights (dict): the non-negative weight of each node
+        ancestors (dict): the upstream nodes of each node, see transitive_closure
+
+    Returns:
+        float: the weight of the heaviest antichain
+    """
+    source, sink = ("source",), ("sink",)
+    capacities = {source: {}, sink: {}}
+
+    for node, weight in weights.items():
+        capacities[source][("out", node)] = weight
+        capacities[("out", node)] = {}
+        capacities[("in", node)] = {sink: weight}
+
+    for node in weights:
+        for upstream in ancestors.get(node, []):
+            if upstream in weights:
+                capacities[("out", upstream)][("in", node)] = float("inf")
+
+    return sum(weights.values()) - _max_flow(capacities, source, sink)
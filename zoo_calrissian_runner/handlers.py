@@ -36,3 +36,18 @@ class ExecutionHandler(ABC):
     @abstractmethod
     def get_additional_parameters(self):
         pass
+
+    def get_priority_class(self):
+        """returns the admission priority class name, None for the default one"""
+        return None
+
+    def handle_log_chunk(self, pod, chunk):
+        """Receives the pod logs while the execution runs, with LOG_STREAMING set to true
+
+        Called from the log streaming thread, a slow handler holds back the streaming.
+
+        Args:
+            pod (str): the pod name
+            chunk (str): the next piece of the pod log
+        """
+        pass
@@ -0,0 +1,203 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from loguru import logger
+
+# the execution as a whole is recorded with an empty step name
+EXECUTION_STEP = ""
+
+
+def percentile(values, q) -> float:
+    """returns the q-th percentile (nearest rank) of the values"""
+    values = sorted(values)
+    rank = max(math.ceil(q / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def input_size_bucket(parameters: dict) -> int:
+    """Returns the size class of the inputs of an execution
+
+    The input values are counted, the items of an array one by one, and the count is
+    rounded up to the next power of two: the executions scattered over arrays of
+    similar lengths share a bucket.
+    """
+    count = sum(len(value) if isinstance(value, list) else 1 for value in parameters.values())
+    bucket = 1
+    while bucket < count:
+        bucket *= 2
+    return bucket
+
+
+def parse_usage_report(usage_report: dict) -> dict:
+    """Returns the usage of an execution and of its steps from a Calrissian usage report
+
+    Returns:
+        dict: the cores, ram (Mi), disk (Mi) and duration (s) per step name, the whole
+        execution under EXECUTION_STEP
+    """
+
+    def duration(report):
+        if report.get("elapsed_seconds") is not None:
+            return report["elapsed_seconds"]
+        if report.get("elapsed_hours") is not None:
+            return report["elapsed_hours"] * 3600
+        return None
+
+    children = usage_report.get("children") or []
+
+    usage = {
+        EXECUTION_STEP: {
+            "cores": usage_report.get("max_parallel_cpus"),
+            "ram": usage_report.get("max_parallel_ram_megabytes"),
+            "disk": usage_report.get(
+                "total_disk_megabytes",
+                sum(child.get("disk_megabytes") or 0 for child in children) or None,
+            ),
+            "duration": duration(usage_report),
+        }
+    }
+
+    for child in children:
+        if not child.get("name"):
+            continue
+        usage[child["name"]] = {
+            "cores": child.get("cpus"),
+            "ram": child.get("ram_megabytes"),
+            "disk": child.get("disk_megabytes"),
+            "duration": duration(child),
+        }
+
+    return usage
+
+
+class UsageHistory:
+    """Keeps the resources used by the executions of the services in a SQLite database
+
+    The peak cores, RAM, disk and the duration of each execution and of its steps are
+    read from the Calrissian usage report, the `max_records` most recent records are
+    kept per service, input size bucket (see input_size_bucket) and step. The
+    resources of a service are estimated with the `q`-th percentile of its records,
+    multiplied by `headroom`, once the service has `min_samples` records.
+
+    Args:
+        path (str): the SQLite database file, shared by the runner processes
+        q (float): the percentile of the records used as estimate
+        headroom (float): the estimate multiplier
+        min_samples (int): number of records of a service before it is estimated
+        max_records (int): number of records kept per service, bucket and step
+    """
+
+    def __init__(self, path, q=95, headroom=1.2, min_samples=5, max_records=100):
+        self.path = path
+        self.q = q
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.max_records = max_records
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS usage (service TEXT NOT NULL, step TEXT NOT NULL, "
+                "recorded REAL NOT NULL, cores REAL, ram REAL, disk REAL, duration REAL, "
+                "bucket INTEGER)"
+            )
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(usage)")]
+            if "bucket" not in columns:
+                # the records of the databases created without buckets have a null bucket
+                connection.execute("ALTER TABLE usage ADD COLUMN bucket INTEGER")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS usage_service_bucket_step "
+                "ON usage (service, bucket, step, recorded)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record(self, service, usage_report: dict, recorded=None, bucket=None):
+        """records the usage of an execution of the service and of its steps"""
+        recorded = time.time() if recorded is None else recorded
+
+        with closing(self._connect()) as connection, connection:
+            for step, usage in parse_usage_report(usage_report).items():
+                if all(value is None for value in usage.values()):
+                    continue
+                connection.execute(
+                    "INSERT INTO usage (service, step, recorded, cores, ram, disk, duration, bucket) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        service,
+                        step,
+                        recorded,
+                        usage["cores"],
+                        usage["ram"],
+                        usage["disk"],
+                        usage["duration"],
+                        bucket,
+                    ),
+                )
+                connection.execute(
+                    "DELETE FROM usage WHERE service = ? AND bucket IS ? AND step = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM usage WHERE service = ? AND bucket IS ? AND step = ? "
+                    "ORDER BY recorded DESC LIMIT ?)",
+                    (service, bucket, step, service, bucket, step, self.max_records),
+                )
+
+    def get_records(self, service, resource, step=EXECUTION_STEP, bucket=None) -> list:
+        """Returns the recorded values of a resource (cores, ram, disk or duration)
+
+        The records of all the input size buckets are returned if bucket is None.
+        """
+        if resource not in ["cores", "ram", "disk", "duration"]:
+            raise ValueError(f"unknown resource {resource}")
+
+        query = f"SELECT {resource} FROM usage WHERE service = ? AND step = ? AND {resource} IS NOT NULL"
+        parameters = (service, step)
+        if bucket is not None:
+            query += " AND bucket = ?"
+            parameters += (bucket,)
+
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, parameters).fetchall()
+
+        return [row[0] for row in rows]
+
+    def estimate(self, service, resource, step=EXECUTION_STEP, bucket=None):
+        """returns the estimated resource of the service, None if not enough records"""
+        records = self.get_records(service, resource, step=step, bucket=bucket)
+        if len(records) < self.min_samples:
+            return None
+        return percentile(records, self.q) * self.headroom
+
+
+_usage_history = None
+_usage_history_lock = threading.Lock()
+
+
+def get_usage_history():
+    """Returns the process-wide usage history, None if USAGE_HISTORY_PATH is not set"""
+    global _usage_history
+
+    if not os.environ.get("USAGE_HISTORY_PATH"):
+        return None
+
+    with _usage_history_lock:
+        if _usage_history is None or _usage_history.path != os.environ["USAGE_HISTORY_PATH"]:
+            _usage_history = _create_usage_history()
+        return _usage_history
+
+
+def _create_usage_history():
+    path = os.environ["USAGE_HISTORY_PATH"]
+    logger.info(f"usage history: {path}")
+
+    return UsageHistory(
+        path=path,
+        q=float(os.environ.get("USAGE_HISTORY_PERCENTILE", 95)),
+        headroom=float(os.environ.get("USAGE_HISTORY_HEADROOM", 1.2)),
+        min_samples=int(os.environ.get("USAGE_HISTORY_MIN_SAMPLES", 5)),
+        max_records=int(os.environ.get("USAGE_HISTORY_MAX_RECORDS", 100)),
+    )
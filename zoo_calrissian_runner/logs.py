@@ -0,0 +1,165 @@
+import codecs
+import queue
+import tempfile
+import threading
+import time
+
+import attr
+from kubernetes.client.rest import ApiException
+from loguru import logger
+from pycalrissian.execution import ContainerNames
+
+# pods created by the runner in the session namespace, not by the execution
+RUNNER_POD_PREFIXES = ["kube-cp-", "scrub-"]
+
+
+@attr.s
+class LogChunk:
+    """A piece of the log of a pod"""
+
+    pod = attr.ib()
+    text = attr.ib()
+    # True for the Calrissian pod, False for the tool pods
+    execution = attr.ib(default=False)
+
+
+class PodLogStreamer:
+    """Streams the logs of the pods of an execution while it runs
+
+    The Calrissian pod and the tool pods it creates are discovered every
+    `poll_interval` seconds and their logs are followed by one thread per pod. The
+    chunks are handed over through a queue of `max_chunks` chunks: the threads stop
+    reading the logs when the queue is full, until the chunks are consumed.
+
+    Args:
+        execution (CalrissianExecution): the submitted execution
+        poll_interval (float): delay in seconds between two pod discoveries
+        chunk_size (int): maximum size in bytes of a chunk
+        max_chunks (int): number of chunks buffered
+    """
+
+    def __init__(self, execution, poll_interval=5, chunk_size=2**16, max_chunks=256):
+        self.execution = execution
+        self.context = execution.runtime_context
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._followers = {}
+
+    def _follow(self, pod_name, execution):
+        # the chunks may split multi-byte characters
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            response = self.context.core_v1_api.read_namespaced_pod_log(
+                name=pod_name,
+                namespace=self.context.namespace,
+                container=ContainerNames.CALRISSIAN.value if execution else None,
+                follow=True,
+                _preload_content=False,
+            )
+            try:
+                for data in response.stream(self.chunk_size):
+                    self._chunks.put(
+                        LogChunk(pod=pod_name, text=decoder.decode(data), execution=execution)
+                    )
+                if tail := decoder.decode(b"", final=True):
+                    self._chunks.put(LogChunk(pod=pod_name, text=tail, execution=execution))
+            finally:
+                response.release_conn()
+        except ApiException as e:
+            logger.warning(f"log of pod {pod_name} not streamed: {e.reason}")
+
+    def _discover(self):
+        for pod in self.context.core_v1_api.list_namespaced_pod(namespace=self.context.namespace).items:
+            name = pod.metadata.name
+            if name in self._followers or pod.status.phase == "Pending":
+                continue
+            if any(name.startswith(prefix) for prefix in RUNNER_POD_PREFIXES):
+                continue
+
+            execution = (pod.metadata.labels or {}).get("job-name") == self.execution.job.job_name
+            follower = threading.Thread(
+                target=self._follow, args=(name, execution), name=f"log-{name}", daemon=True
+            )
+            follower.start()
+            self._followers[name] = follower
+
+    def stream(self):
+        """Yields the log chunks of the pods until the execution is complete
+
+        Yields:
+            LogChunk: the chunks in the order they are read, interleaved across pods
+        """
+        complete = False
+        next_discovery = 0
+
+        while True:
+            if time.monotonic() >= next_discovery:
+                # checked before the discovery so that the last pods are followed
+                complete = self.execution.is_complete()
+                self._discover()
+                next_discovery = time.monotonic() + self.poll_interval
+
+            try:
+                yield self._chunks.get(timeout=min(self.poll_interval, 1))
+            except queue.Empty:
+                if complete and not any(follower.is_alive() for follower in self._followers.values()):
+                    if self._chunks.empty():
+                        return
+
+
+class LogSpool:
+    """Keeps the streamed logs of the pods
+
+    The log of each pod is kept in memory up to `max_size` bytes, then spilled to a
+    temporary file.
+
+    Args:
+        max_size (int): size in bytes of a pod log kept in memory
+    """
+
+    def __init__(self, max_size=2**20):
+        self.max_size = max_size
+        self.execution_pod = None
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def write(self, chunk: LogChunk):
+        """appends a chunk to the log of its pod"""
+        with self._lock:
+            if chunk.pod not in self._files:
+                self._files[chunk.pod] = tempfile.SpooledTemporaryFile(max_size=self.max_size)
+            if chunk.execution:
+                self.execution_pod = chunk.pod
+            spool = self._files[chunk.pod]
+            spool.seek(0, 2)
+            spool.write(chunk.text.encode("utf-8"))
+
+    def pods(self) -> list:
+        """returns the pods with a log"""
+        with self._lock:
+            return list(self._files)
+
+    def read(self, pod, max_size=None) -> str:
+        """returns the log of a pod, its last max_size bytes if max_size is set"""
+        with self._lock:
+            if pod not in self._files:
+                return ""
+            spool = self._files[pod]
+            size = spool.seek(0, 2)
+            start = 0 if max_size is None else max(size - max_size, 0)
+            spool.seek(start)
+            data = spool.read()
+
+        text = data.decode("utf-8", errors="replace")
+        if start:
+            return f"[{start} bytes not shown]\n{text}"
+        return text
+
+    def close(self):
+        """removes the spilled logs"""
+        with self._lock:
+            for spool in self._files.values():
+                spool.close()
+            self._files = {}
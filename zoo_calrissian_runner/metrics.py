@@ -0,0 +1,173 @@
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from loguru import logger
+
+
+class PhaseTimer:
+    """Records the wall time of the execution phases (in seconds)
+
+    The phases may overlap (e.g. wrap and namespace_init), the wall time of the whole
+    execution is measured from the creation of the timer, see elapsed.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """adds seconds to the phase wall time"""
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        """times the wrapped block as the phase `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def total(self):
+        """returns the sum of the phases wall time"""
+        return sum(self.timings.values())
+
+    def elapsed(self):
+        """returns the wall time since the timer was created"""
+        return time.monotonic() - self.started
+
+
+class MetricsSink(ABC):
+    """Exports the per-job timing records"""
+
+    @abstractmethod
+    def emit(self, record: dict):
+        """Exports a timing record
+
+        Args:
+            record (dict): with the keys workflow_id, job_id, status, timings (phase
+                name to seconds) and total
+        """
+
+    def gauge(self, name: str, value: float):
+        """exports the current value of a runner gauge (e.g. the cleanup backlog)"""
+
+
+class PrometheusTextFileSink(MetricsSink):
+    """Writes the phase durations in a file for the node exporter textfile collector
+
+    Args:
+        path (str): the .prom file, rewritten atomically after each job
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sums = {}
+        self._counts = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record: dict):
+        with self._lock:
+            for phase, seconds in record["timings"].items():
+                key = (record["workflow_id"], phase)
+                self._sums[key] = self._sums.get(key, 0) + seconds
+                self._counts[key] = self._counts.get(key, 0) + 1
+            self._write()
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+            self._write()
+
+    def _write(self):
+        lines = [
+            "# HELP zoo_calrissian_runner_phase_seconds Wall time of the execution phases.",
+            "# TYPE zoo_calrissian_runner_phase_seconds summary",
+        ]
+        for (workflow_id, phase), seconds in sorted(self._sums.items()):
+            labels = f'workflow_id="{workflow_id}",phase="{phase}"'
+            lines.append(f"zoo_calrissian_runner_phase_seconds_sum{{{labels}}} {seconds:.6f}")
+            lines.append(
+                f"zoo_calrissian_runner_phase_seconds_count{{{labels}}} "
+                f"{self._counts[(workflow_id, phase)]}"
+            )
+
+        for name, value in sorted(self._gauges.items()):
+            lines.append(f"# TYPE zoo_calrissian_runner_{name} gauge")
+            lines.append(f"zoo_calrissian_runner_{name} {value}")
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+class StatsdSink(MetricsSink):
+    """Sends the phase durations as StatsD timers over UDP
+
+    Args:
+        host (str): the StatsD host
+        port (int): the StatsD port
+        prefix (str): the metrics prefix
+    """
+
+    def __init__(self, host="localhost", port=8125, prefix="zoo_calrissian_runner"):
+        self.address = (host, port)
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def emit(self, record: dict):
+        workflow_id = str(record["workflow_id"]).replace(".", "_")
+        for phase, seconds in record["timings"].items():
+            self._send(f"{self.prefix}.{workflow_id}.{phase}:{seconds * 1000:.3f}|ms")
+
+    def gauge(self, name: str, value: float):
+        self._send(f"{self.prefix}.{name}:{value}|g")
+
+    def _send(self, metric):
+        try:
+            self._socket.sendto(metric.encode("utf-8"), self.address)
+        except OSError as e:
+            logger.warning(f"metric {metric} not sent: {e}")
+
+
+_metrics_sinks = {}
+_metrics_sinks_lock = threading.Lock()
+
+
+def get_metrics_sink():
+    """Returns the process-wide metrics sink configured with METRICS_SINK
+
+    METRICS_SINK is either prometheus:///path/to/file.prom or statsd://host:port,
+    None is returned if it is not set.
+    """
+    url = os.environ.get("METRICS_SINK")
+    if not url:
+        return None
+
+    with _metrics_sinks_lock:
+        if url not in _metrics_sinks:
+            _metrics_sinks[url] = _create_metrics_sink(url)
+        return _metrics_sinks[url]
+
+
+def _create_metrics_sink(url):
+    parsed = urlparse(url)
+    if parsed.scheme == "prometheus":
+        return PrometheusTextFileSink(path=parsed.path)
+    if parsed.scheme == "statsd":
+        return StatsdSink(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 8125,
+            prefix=os.environ.get("METRICS_PREFIX", "zoo_calrissian_runner"),
+        )
+
+    raise ValueError(f"unsupported metrics sink {url}")
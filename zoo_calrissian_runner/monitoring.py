@@ -0,0 +1,269 @@
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from http import HTTPStatus
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+from loguru import logger
+
+
+class WatchUnavailable(Exception):
+    """raised when the job cannot be monitored with a Kubernetes watch stream"""
+
+
+class PollingPolicy(ABC):
+    """Decides how long to wait before the next job status check"""
+
+    @abstractmethod
+    def next_interval(self, state) -> float:
+        """returns the time in seconds to wait given the last observed job state"""
+
+    def reset(self):
+        """called when a new execution is monitored"""
+
+
+class FixedIntervalPolicy(PollingPolicy):
+    """Polls the job status every `interval` seconds"""
+
+    def __init__(self, interval=30):
+        self.interval = interval
+
+    def next_interval(self, state) -> float:
+        return self.interval
+
+
+class AdaptiveBackoffPolicy(PollingPolicy):
+    """Polls often at first and less and less often while the job state does not change
+
+    The interval starts at `initial` seconds, is multiplied by `factor` after each
+    unchanged job state up to `maximum` seconds and goes back to `initial` when the
+    job state changes (e.g. a pod becomes active or ready).
+    """
+
+    def __init__(self, initial=1, factor=2, maximum=30):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.reset()
+
+    def reset(self):
+        self._state = None
+        self._interval = None
+
+    def next_interval(self, state) -> float:
+        if self._interval is None or state != self._state:
+            self._interval = self.initial
+        else:
+            self._interval = min(self._interval * self.factor, self.maximum)
+        self._state = state
+        return self._interval
+
+
+class JobMonitor(ABC):
+    """Blocks until the Calrissian job of an execution is complete
+
+    Args:
+        execution (CalrissianExecution): the submitted execution
+        grace_period (int): time in seconds after which the job is killed if pods are
+            in ImagePullBackOff
+        wall_time (int): time in seconds after which the job is killed, None for no limit
+    """
+
+    def __init__(self, execution, grace_period=120, wall_time=None):
+        self.execution = execution
+        self.grace_period = grace_period
+        self.wall_time = wall_time
+
+    @property
+    def context(self):
+        return self.execution.runtime_context
+
+    @property
+    def job_name(self):
+        return self.execution.job.job_name
+
+    @staticmethod
+    def get_state(job):
+        """returns the job counters that define the job state"""
+        status = job.status
+        return (status.active, getattr(status, "ready", None), status.succeeded, status.failed)
+
+    def _is_finished(self, job) -> bool:
+        status = job.status
+        logger.debug(
+            f"job {self.job_name}: active={status.active}, "
+            f"succeeded={status.succeeded}, failed={status.failed}"
+        )
+        return bool(status.succeeded or status.failed)
+
+    def _has_waiting_pods(self) -> bool:
+        for pod in self.context.core_v1_api.list_namespaced_pod(namespace=self.context.namespace).items:
+            for container_status in pod.status.container_statuses or []:
+                waiting = container_status.state.waiting
+                if waiting and waiting.reason in ["ImagePullBackOff"]:
+                    return True
+        return False
+
+    def _kill_job(self):
+        """deletes the job and flags the execution as killed"""
+        self.execution.killed = True
+        self.context.batch_v1_api.delete_namespaced_job(
+            namespace=self.context.namespace,
+            name=self.job_name,
+        )
+
+    def _check_waiting_pods(self, start_time) -> bool:
+        """kills the job if pods are in ImagePullBackOff after the grace period"""
+        if time.monotonic() - start_time > self.grace_period and self._has_waiting_pods():
+            logger.warning("found pods in waiting status with reason ImagePullBackOff, killing job")
+            self._kill_job()
+            return True
+        return False
+
+    def _remaining_time(self, start_time):
+        """returns the seconds left before the wall time, None if there is no limit"""
+        if self.wall_time is None:
+            return None
+        return self.wall_time - (time.monotonic() - start_time)
+
+    def _check_wall_time(self, start_time) -> bool:
+        """kills the job if it has been running for longer than the wall time"""
+        remaining = self._remaining_time(start_time)
+        if remaining is not None and remaining <= 0:
+            logger.warning(
+                f"job {self.job_name} reached the wall time of {self.wall_time}s, killing job"
+            )
+            self._kill_job()
+            return True
+        return False
+
+    @abstractmethod
+    def monitor(self):
+        """blocks until the job is complete"""
+
+    async def monitor_async(self, executor=None):
+        """waits for the job to complete, by default in a thread of the executor"""
+        await asyncio.get_running_loop().run_in_executor(executor, self.monitor)
+
+
+class JobWatcher(JobMonitor):
+    """Monitors a CalrissianExecution with a Kubernetes watch stream on its job
+
+    The watcher wakes up on the job status changes only, so the job completion is
+    detected as soon as the API server reports it. The stream is re-opened every
+    `timeout` seconds to check the pods stuck in ImagePullBackOff after the grace period,
+    and earlier when the wall time is about to be reached.
+
+    Args:
+        execution (CalrissianExecution): the submitted execution
+        timeout (int): lifetime in seconds of a watch stream
+        grace_period (int): time in seconds after which the job is killed if pods are
+            in ImagePullBackOff
+        wall_time (int): time in seconds after which the job is killed, None for no limit
+    """
+
+    def __init__(self, execution, timeout=60, grace_period=120, wall_time=None):
+        super().__init__(execution=execution, grace_period=grace_period, wall_time=wall_time)
+        self.timeout = timeout
+
+    def monitor(self):
+        """Blocks until the job is complete
+
+        Raises:
+            WatchUnavailable: if the job cannot be watched (e.g. forbidden by the RBAC)
+        """
+        start_time = time.monotonic()
+        resource_version = None
+        w = watch.Watch()
+
+        try:
+            while True:
+                if self._check_wall_time(start_time):
+                    return
+                timeout = self.timeout
+                remaining = self._remaining_time(start_time)
+                if remaining is not None:
+                    timeout = max(1, min(timeout, math.ceil(remaining)))
+
+                logger.info(f"job {self.job_name} is active")
+                try:
+                    for event in w.stream(
+                        self.context.batch_v1_api.list_namespaced_job,
+                        namespace=self.context.namespace,
+                        field_selector=f"metadata.name={self.job_name}",
+                        resource_version=resource_version,
+                        timeout_seconds=timeout,
+                    ):
+                        resource_version = event["object"].metadata.resource_version
+                        if self._is_finished(event["object"]):
+                            logger.info(f"job {self.job_name} is complete")
+                            return
+                except ApiException as e:
+                    if e.status != HTTPStatus.GONE:
+                        raise WatchUnavailable(str(e)) from e
+                    # the resource version is too old, restart from the current state
+                    logger.debug(f"watch on job {self.job_name} expired, restarting it")
+                    resource_version = None
+
+                if self._check_waiting_pods(start_time):
+                    return
+        finally:
+            w.stop()
+
+
+class JobPoller(JobMonitor):
+    """Monitors a CalrissianExecution by reading its job status periodically
+
+    Args:
+        execution (CalrissianExecution): the submitted execution
+        policy (PollingPolicy): decides the time between two job status checks
+        grace_period (int): time in seconds after which the job is killed if pods are
+            in ImagePullBackOff
+        wall_time (int): time in seconds after which the job is killed, None for no limit
+    """
+
+    def __init__(self, execution, policy: PollingPolicy, grace_period=120, wall_time=None):
+        super().__init__(execution=execution, grace_period=grace_period, wall_time=wall_time)
+        self.policy = policy
+
+    def _poll(self, start_time):
+        """checks the job, returns the delay before the next check, None if complete"""
+        job = self.context.batch_v1_api.read_namespaced_job_status(
+            name=self.job_name,
+            namespace=self.context.namespace,
+        )
+        if self._is_finished(job):
+            logger.info(f"job {self.job_name} is complete")
+            return None
+
+        if self._check_waiting_pods(start_time) or self._check_wall_time(start_time):
+            return None
+
+        state = self.get_state(job)
+        interval = self.policy.next_interval(state)
+        remaining = self._remaining_time(start_time)
+        if remaining is not None:
+            interval = min(interval, remaining)
+        logger.info(
+            f"job {self.job_name} is active (active, ready, succeeded, failed: {state}), "
+            f"{type(self.policy).__name__} next check in {interval}s"
+        )
+        return interval
+
+    def monitor(self):
+        start_time = time.monotonic()
+        self.policy.reset()
+
+        while (interval := self._poll(start_time)) is not None:
+            time.sleep(interval)
+
+    async def monitor_async(self):
+        """waits for the job to complete, the job status is read in an executor thread"""
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        self.policy.reset()
+
+        while (interval := await loop.run_in_executor(None, self._poll, start_time)) is not None:
+            await asyncio.sleep(interval)
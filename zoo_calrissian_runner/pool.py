@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+from pycalrissian.context import CalrissianContext
+
+from zoo_calrissian_runner.admission import to_mebibytes
+from zoo_calrissian_runner.backends import CalrissianBackend
+from zoo_calrissian_runner.sweeper import session_labels
+
+
+def volume_bucket(volume_size: str, minimum=1024) -> str:
+    """Rounds a volume size up to the next power of two mebibytes
+
+    Args:
+        volume_size (str): the volume size, a Kubernetes quantity (e.g. 20000Mi, 10Gi
+            or 20G) or mebibytes
+        minimum (int): the smallest bucket in mebibytes
+
+    Returns:
+        str: the bucket volume size, e.g. 32768Mi
+    """
+    size = to_mebibytes(volume_size)
+    if size <= 0:
+        raise ValueError(f"invalid volume size {volume_size}")
+
+    bucket = minimum
+    while bucket < size:
+        bucket *= 2
+
+    return f"{bucket}Mi"
+
+
+class SessionPool:
+    """Pool of initialised Calrissian sessions (namespace, RBAC and RWX volume)
+
+    The pool keeps `size` idle sessions per storage class, volume size bucket and
+    image pull secrets, and at most `max_idle` idle sessions in total. A leased session
+    is scrubbed (jobs, pods, configuration maps and volume content deleted) when
+    released and returned to the pool instead of being disposed, unless the pool is
+    full. The sessions idle for more than `idle_ttl` seconds are disposed.
+
+    Args:
+        size (int): number of idle sessions kept per storage class and volume size bucket
+        namespace_prefix (str): prefix of the pooled namespaces
+        scrub_image (str): container image used to wipe the volume content
+        max_workers (int): number of threads provisioning and scrubbing sessions
+        backend (ExecutionBackend): creates and scrubs the sessions
+        max_idle (int): number of idle sessions kept in total, None for no limit
+        idle_ttl (float): time in seconds after which an idle session is disposed,
+            None to keep the idle sessions
+    """
+
+    def __init__(
+        self,
+        size=2,
+        namespace_prefix="zoo-pool",
+        scrub_image="busybox",
+        max_workers=4,
+        backend=None,
+        max_idle=None,
+        idle_ttl=None,
+    ):
+        self.backend = backend or CalrissianBackend()
+        self.size = size
+        self.namespace_prefix = namespace_prefix
+        self.scrub_image = scrub_image
+        self.max_idle = max_idle
+        self.idle_ttl = idle_ttl
+        self._idle = {}
+        self._provisioning = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-pool")
+        self._closed = threading.Event()
+
+        if self.idle_ttl is not None:
+            threading.Thread(target=self._evict, name="session-pool-eviction", daemon=True).start()
+
+    @staticmethod
+    def get_key(storage_class, volume_size, image_pull_secrets=None):
+        secrets = hashlib.sha256(
+            json.dumps(image_pull_secrets, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        return (storage_class, volume_bucket(volume_size), secrets[:12])
+
+    def _create_session(self, key, image_pull_secrets):
+        storage_class, volume_size, _ = key
+        session = self.backend.create_context(
+            namespace=f"{self.namespace_prefix}-{uuid.uuid4()}",
+            storage_class=storage_class,
+            volume_size=volume_size,
+            image_pull_secrets=image_pull_secrets,
+            labels=session_labels(pooled=True),
+        )
+        logger.info(f"provision pooled session {session.namespace} ({storage_class}, {volume_size})")
+        session.initialise()
+        session.pool_key = key
+        return session
+
+    def _add_idle(self, key, image_pull_secrets):
+        try:
+            session = self._create_session(key, image_pull_secrets)
+        except Exception as e:
+            logger.error(f"pooled session not provisioned: {e}")
+            return
+        finally:
+            with self._lock:
+                self._provisioning[key] -= 1
+
+        self._return(session)
+
+    def _count_idle(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+    def _return(self, session):
+        with self._lock:
+            idle = self._idle.setdefault(session.pool_key, [])
+            if len(idle) < self.size and (self.max_idle is None or self._count_idle() < self.max_idle):
+                session.idle_since = time.monotonic()
+                idle.append(session)
+                return
+        logger.info(f"pool is full, dispose session {session.namespace}")
+        session.dispose()
+
+    def _replenish(self, key, image_pull_secrets):
+        with self._lock:
+            missing = self.size - len(self._idle.get(key, [])) - self._provisioning.get(key, 0)
+            if self.max_idle is not None:
+                available = self.max_idle - self._count_idle() - sum(self._provisioning.values())
+                missing = min(missing, available)
+            self._provisioning[key] = self._provisioning.get(key, 0) + max(missing, 0)
+
+        for _ in range(missing):
+            self._executor.submit(self._add_idle, key, image_pull_secrets)
+
+    def fill(self, storage_class, volume_size, image_pull_secrets=None):
+        """provisions the idle sessions for a storage class and volume size"""
+        self._replenish(self.get_key(storage_class, volume_size, image_pull_secrets), image_pull_secrets)
+
+    def lease(self, storage_class, volume_size, image_pull_secrets=None) -> CalrissianContext:
+        """Returns an initialised session with a volume of at least volume_size
+
+        An idle session is returned if available, otherwise a new session is created.
+        The idle sessions are replenished in the background.
+        """
+        key = self.get_key(storage_class, volume_size, image_pull_secrets)
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+            session = idle.pop() if idle else None
+
+        self._replenish(key, image_pull_secrets)
+
+        if session is None:
+            logger.info("no idle pooled session available")
+            session = self._create_session(key, image_pull_secrets)
+        else:
+            logger.info(f"lease pooled session {session.namespace}")
+
+        return session
+
+    def release(self, session: CalrissianContext):
+        """scrubs the session in the background and returns it to the pool"""
+        self._executor.submit(self._recycle, session)
+
+    def _recycle(self, session):
+        try:
+            self.scrub(session)
+        except Exception as e:
+            logger.error(f"session {session.namespace} not scrubbed, disposing it: {e}")
+            session.dispose()
+            return
+
+        self._return(session)
+
+    def scrub(self, session: CalrissianContext):
+        """deletes the jobs, pods and configuration maps and wipes the volume"""
+        self.backend.scrub(session, scrub_image=self.scrub_image)
+
+    def evict_expired(self) -> int:
+        """disposes the sessions idle for more than idle_ttl seconds, returns how many"""
+        if self.idle_ttl is None:
+            return 0
+
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                expired.extend(session for session in idle if now - session.idle_since > self.idle_ttl)
+                idle[:] = [session for session in idle if now - session.idle_since <= self.idle_ttl]
+                if not idle:
+                    del self._idle[key]
+
+        for session in expired:
+            logger.info(f"pooled session {session.namespace} expired, disposing it")
+            try:
+                session.dispose()
+            except Exception as e:
+                logger.error(f"expired session {session.namespace} not disposed: {e}")
+        return len(expired)
+
+    def _evict(self):
+        while not self._closed.wait(min(self.idle_ttl, 60)):
+            self.evict_expired()
+
+    def close(self):
+        """disposes the idle sessions"""
+        self._closed.set()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session in idle]
+            self._idle.clear()
+
+        for session in sessions:
+            session.dispose()
+
+
+_session_pools = {}
+_session_pools_lock = threading.Lock()
+
+
+def get_session_pool(backend=None):
+    """Returns the process-wide session pool of the backend
+
+    None is returned if SESSION_POOL_SIZE is not set or 0.
+    """
+    size = int(os.environ.get("SESSION_POOL_SIZE", 0))
+    if size <= 0:
+        return None
+
+    with _session_pools_lock:
+        if backend not in _session_pools:
+            _session_pools[backend] = SessionPool(
+                size=size,
+                namespace_prefix=os.environ.get("SESSION_POOL_PREFIX", "zoo-pool"),
+                scrub_image=os.environ.get("SESSION_POOL_SCRUB_IMAGE", "busybox"),
+                backend=backend,
+                max_idle=int(os.environ.get("SESSION_POOL_MAX_IDLE", 4 * size)),
+                idle_ttl=float(os.environ.get("SESSION_POOL_IDLE_TTL", 1800)) or None,
+            )
+        return _session_pools[backend]
@@ -0,0 +1,150 @@
+import threading
+import time
+
+from kubernetes import watch
+from loguru import logger
+
+from zoo_calrissian_runner.logs import RUNNER_POD_PREFIXES
+
+
+class ProgressTracker:
+    """Maps the completed steps of an execution to a throttled progress
+
+    The progress goes from `start` to `end` as the steps complete. It is reported with
+    `callback(progress, message)` when it increases, at most every `min_interval`
+    seconds, until the tracker is closed. The latest throttled progress is reported
+    at the end of the throttle window or when the tracker is closed.
+
+    Args:
+        total (int): number of steps of the execution
+        callback (callable): reports the progress (%) and a message
+        start (int): progress when no step is complete
+        end (int): progress when all the steps are complete
+        min_interval (float): minimum delay in seconds between two reports
+    """
+
+    def __init__(self, total, callback, start=23, end=90, min_interval=5):
+        self.total = max(total, 1)
+        self.callback = callback
+        self.start = start
+        self.end = end
+        self.min_interval = min_interval
+
+        self._progress = start
+        self._reported_at = None
+        self._pending = None
+        self._flush_timer = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def get_progress(self, completed) -> int:
+        """returns the progress (%) of the completed steps"""
+        return self.start + (self.end - self.start) * min(completed, self.total) // self.total
+
+    def update(self, completed) -> bool:
+        """Reports the progress of the completed steps if not throttled
+
+        A throttled progress is kept pending and reported when the throttle window
+        ends or when the tracker is closed, whichever comes first.
+
+        Returns:
+            bool: True if the progress was reported
+        """
+        progress = self.get_progress(completed)
+        message = f"{min(completed, self.total)} of {self.total} steps completed"
+        now = time.monotonic()
+
+        with self._lock:
+            latest = self._pending[0] if self._pending is not None else self._progress
+            if self._closed or progress <= latest:
+                return False
+            if self._reported_at is not None and now - self._reported_at < self.min_interval:
+                self._pending = (progress, message)
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(
+                        self.min_interval - (now - self._reported_at), self._flush
+                    )
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return False
+
+            self._report(progress, message, now)
+            return True
+
+    def _report(self, progress, message, now):
+        # called with the lock held
+        self._progress = progress
+        self._reported_at = now
+        self._pending = None
+        self.callback(progress, message)
+
+    def _flush(self):
+        with self._lock:
+            self._flush_timer = None
+            if not self._closed and self._pending is not None:
+                self._report(*self._pending, time.monotonic())
+
+    def close(self):
+        """reports the pending progress and stops the reports"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._closed and self._pending is not None:
+                self._report(*self._pending, time.monotonic())
+            self._closed = True
+
+
+class PodCompletionWatcher:
+    """Counts the tool pods of an execution completed while it runs
+
+    The pods of the execution namespace are watched, a tool pod is complete when it
+    succeeds, fails or is deleted by Calrissian. The Calrissian pod and the pods
+    created by the runner are not counted.
+
+    Args:
+        execution (CalrissianExecution): the submitted execution
+        timeout (int): duration in seconds of a watch request, renewed until the
+            execution is complete
+    """
+
+    def __init__(self, execution, timeout=60):
+        self.execution = execution
+        self.context = execution.runtime_context
+        self.timeout = timeout
+
+    def stream(self):
+        """Yields the number of completed tool pods each time a tool pod completes
+
+        Yields:
+            int: the number of completed tool pods
+        """
+        completed = set()
+
+        while not self.execution.is_complete():
+            w = watch.Watch()
+            try:
+                for event in w.stream(
+                    self.context.core_v1_api.list_namespaced_pod,
+                    namespace=self.context.namespace,
+                    timeout_seconds=self.timeout,
+                ):
+                    pod = event["object"]
+                    name = pod.metadata.name
+                    done = event["type"] == "DELETED" or pod.status.phase in ["Succeeded", "Failed"]
+
+                    if (pod.metadata.labels or {}).get("job-name") == self.execution.job.job_name:
+                        if done:
+                            return
+                        continue
+                    if name in completed or any(
+                        name.startswith(prefix) for prefix in RUNNER_POD_PREFIXES
+                    ):
+                        continue
+
+                    if done:
+                        completed.add(name)
+                        logger.debug(f"tool pod {name} complete")
+                        yield len(completed)
+            finally:
+                w.stop()
@@ -0,0 +1,293 @@
+import argparse
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from kubernetes.client.rest import ApiException
+from loguru import logger
+
+from zoo_calrissian_runner.backends import get_execution_backend
+from zoo_calrissian_runner.metrics import get_metrics_sink
+
+
+class SessionReaper:
+    """Disposes the sessions in background threads
+
+    The sessions handed over with `submit` are disposed by `workers` threads, a failed
+    disposal is retried up to `max_attempts` times with an exponential delay starting
+    at `retry_delay` seconds. With a `queue_dir`, each pending session is also written
+    to a JSON file removed once the session is disposed, so the sessions left behind by
+    a process that exited before disposing them can be disposed by the
+    zoo-calrissian-reaper command.
+
+    Args:
+        backend (ExecutionBackend): re-creates the sessions read from the queue directory
+        workers (int): number of disposal threads
+        max_attempts (int): number of disposal attempts of a session
+        retry_delay (float): delay in seconds before the first retry
+        queue_dir (str): directory of the durable queue, None to keep it in memory only
+        metrics_sink (MetricsSink): exports the cleanup_backlog gauge
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        workers=2,
+        max_attempts=5,
+        retry_delay=10,
+        queue_dir=None,
+        metrics_sink=None,
+    ):
+        self.backend = backend or get_execution_backend()
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.queue_dir = queue_dir
+        self.metrics_sink = metrics_sink
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._stats = {"submitted": 0, "disposed": 0, "retried": 0, "failed": 0, "backlog": 0}
+
+        if self.queue_dir:
+            os.makedirs(self.queue_dir, exist_ok=True)
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"session-reaper-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _entry_path(self, namespace):
+        return os.path.join(self.queue_dir, f"{namespace}.json")
+
+    def _persist(self, entry):
+        if not self.queue_dir:
+            return
+        path = self._entry_path(entry["namespace"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _forget(self, entry):
+        if not self.queue_dir:
+            return
+        try:
+            os.remove(self._entry_path(entry["namespace"]))
+        except FileNotFoundError:
+            pass
+
+    def _update_backlog(self, delta):
+        # exported with the lock held, the last exported value is the current one
+        with self._lock:
+            self._stats["backlog"] += delta
+            backlog = self._stats["backlog"]
+
+            logger.debug(f"cleanup backlog: {backlog} session(s)")
+            if self.metrics_sink is not None:
+                try:
+                    self.metrics_sink.gauge("cleanup_backlog", backlog)
+                except Exception as e:
+                    logger.warning(f"cleanup backlog not exported: {e}")
+
+            if backlog == 0:
+                self._idle.notify_all()
+
+    def _count(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def submit(self, session):
+        """hands over the session to the reaper, returns immediately"""
+        entry = {
+            "namespace": session.namespace,
+            "storage_class": getattr(session, "storage_class", None),
+            "volume_size": getattr(session, "volume_size", None),
+            "attempts": 0,
+            "submitted": time.time(),
+        }
+        self._persist(entry)
+        self._count("submitted")
+        self._update_backlog(1)
+        logger.info(f"session {session.namespace} handed over to the reaper")
+        self._queue.put((entry, session))
+
+    def recover(self, min_age=0) -> int:
+        """Queues the sessions of the queue directory handed over min_age seconds ago
+
+        Returns:
+            int: the number of queued sessions
+        """
+        if not self.queue_dir:
+            return 0
+
+        recovered = 0
+        for name in sorted(os.listdir(self.queue_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.queue_dir, name)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"queue entry {name} not readable: {e}")
+                continue
+
+            if time.time() - entry.get("submitted", 0) < min_age:
+                continue
+
+            logger.info(f"recover session {entry['namespace']}")
+            self._count("submitted")
+            self._update_backlog(1)
+            self._queue.put((entry, None))
+            recovered += 1
+
+        return recovered
+
+    def _work(self):
+        while True:
+            entry, session = self._queue.get()
+            try:
+                self._dispose(entry, session)
+            finally:
+                self._queue.task_done()
+
+    def _dispose(self, entry, session):
+        entry["attempts"] += 1
+        try:
+            if session is None:
+                session = self.backend.create_context(
+                    namespace=entry["namespace"],
+                    storage_class=entry["storage_class"],
+                    volume_size=entry["volume_size"],
+                )
+            session.dispose()
+        except ApiException as e:
+            if e.status == 404:
+                logger.info(f"session {entry['namespace']} already disposed")
+            else:
+                self._retry(entry, session, e)
+                return
+        except Exception as e:
+            self._retry(entry, session, e)
+            return
+
+        logger.info(f"session {entry['namespace']} disposed")
+        self._forget(entry)
+        self._count("disposed")
+        self._update_backlog(-1)
+
+    def _retry(self, entry, session, error):
+        if entry["attempts"] >= self.max_attempts:
+            logger.error(
+                f"session {entry['namespace']} not disposed after {entry['attempts']} attempts: {error}"
+            )
+            self._count("failed")
+            self._update_backlog(-1)
+            return
+
+        delay = self.retry_delay * 2 ** (entry["attempts"] - 1)
+        logger.warning(f"session {entry['namespace']} not disposed, retrying in {delay}s: {error}")
+        self._persist(entry)
+        self._count("retried")
+
+        timer = threading.Timer(delay, self._queue.put, args=[(entry, session)])
+        timer.daemon = True
+        timer.start()
+
+    def stats(self) -> dict:
+        """returns the submitted, disposed, retried, failed and backlog counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def wait(self, timeout=None) -> bool:
+        """Blocks until the backlog is empty
+
+        Returns:
+            bool: False if the backlog is not empty after timeout seconds
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._stats["backlog"] == 0, timeout=timeout)
+
+
+_session_reapers = {}
+_session_reapers_lock = threading.Lock()
+
+
+def get_session_reaper(backend=None):
+    """Returns the process-wide session reaper of the backend
+
+    None is returned if ASYNC_DISPOSE is not set to true. At the process exit, the
+    pending disposals are waited for up to REAPER_EXIT_TIMEOUT seconds.
+    """
+    if os.environ.get("ASYNC_DISPOSE", "false") != "true":
+        return None
+
+    with _session_reapers_lock:
+        if backend not in _session_reapers:
+            reaper = SessionReaper(
+                backend=backend,
+                workers=int(os.environ.get("REAPER_WORKERS", 2)),
+                max_attempts=int(os.environ.get("REAPER_MAX_ATTEMPTS", 5)),
+                retry_delay=float(os.environ.get("REAPER_RETRY_DELAY", 10)),
+                queue_dir=os.environ.get("REAPER_QUEUE_DIR") or None,
+                metrics_sink=get_metrics_sink(),
+            )
+            atexit.register(reaper.wait, timeout=float(os.environ.get("REAPER_EXIT_TIMEOUT", 300)))
+            _session_reapers[backend] = reaper
+        return _session_reapers[backend]
+
+
+def main():
+    """Disposes the sessions left in the durable queue by the runner processes"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--queue-dir",
+        default=os.environ.get("REAPER_QUEUE_DIR"),
+        required="REAPER_QUEUE_DIR" not in os.environ,
+        help="directory of the durable queue (REAPER_QUEUE_DIR)",
+    )
+    parser.add_argument(
+        "--min-age",
+        type=float,
+        default=600,
+        help="dispose the sessions handed over at least min-age seconds ago",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="number of disposal threads")
+    parser.add_argument("--max-attempts", type=int, default=5, help="attempts per session")
+    parser.add_argument("--retry-delay", type=float, default=10, help="first retry delay (s)")
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="scan the queue every interval seconds, 0 to scan it once",
+    )
+    args = parser.parse_args()
+
+    reaper = SessionReaper(
+        workers=args.workers,
+        max_attempts=args.max_attempts,
+        retry_delay=args.retry_delay,
+        queue_dir=args.queue_dir,
+        metrics_sink=get_metrics_sink(),
+    )
+
+    while True:
+        logger.info(f"{reaper.recover(min_age=args.min_age)} session(s) to dispose")
+        reaper.wait()
+        if args.interval <= 0:
+            break
+        time.sleep(args.interval)
+
+    stats = reaper.stats()
+    logger.info(f"disposed {stats['disposed']} session(s), {stats['failed']} failed")
+    sys.exit(1 if stats["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
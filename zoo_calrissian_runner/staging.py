@@ -0,0 +1,335 @@
+import gzip
+import hashlib
+import io
+import os
+import shlex
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kubernetes.stream import stream
+from loguru import logger
+from pycalrissian.context import CalrissianContext
+from pycalrissian.utils import HelperPod
+
+
+def file_digest(path, chunk_size=2**20) -> str:
+    """returns the sha256 digest of a file content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream_:
+        for chunk in iter(lambda: stream_.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SessionVolume:
+    """Serves the uploads and downloads of a session volume with one helper pod
+
+    The helper pod mounts the Calrissian RWX volume of the session, it is started on
+    first use and kept until the volume is closed with the session. The files are
+    transferred as tar streams over the pod exec channels and the commands (checksums,
+    decompression) run in the same pod, no pod is started per transfer.
+
+    Args:
+        context (CalrissianContext): the Calrissian session
+        mount_path (str): where the volume is mounted in the helper pod
+        timeout (float): maximum duration in seconds of a transfer or a command
+        chunk_size (int): size in bytes of the chunks written to the helper pod
+    """
+
+    def __init__(
+        self, context: CalrissianContext, mount_path="/calrissian", timeout=600, chunk_size=2**20
+    ):
+        self.context = context
+        self.mount_path = mount_path
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.helper_pod = None
+        self._lock = threading.Lock()
+
+    def start(self) -> HelperPod:
+        """starts the helper pod if not started, returns it"""
+        with self._lock:
+            if self.helper_pod is None:
+                logger.info(f"start the volume helper pod of session {self.context.namespace}")
+                self.helper_pod = HelperPod(
+                    context=self.context,
+                    volume={
+                        "name": self.context.calrissian_wdir,
+                        "persistentVolumeClaim": {"claimName": self.context.calrissian_wdir},
+                    },
+                    volume_mount={
+                        "name": self.context.calrissian_wdir,
+                        "mountPath": self.mount_path,
+                    },
+                )
+            return self.helper_pod
+
+    def close(self):
+        """deletes the helper pod"""
+        with self._lock:
+            if self.helper_pod is not None:
+                self.helper_pod.dismiss()
+                self.helper_pod = None
+
+    def _stream(self, command, **kwargs):
+        helper_pod = self.start()
+        return stream(
+            self.context.core_v1_api.connect_get_namespaced_pod_exec,
+            helper_pod.pod_name,
+            self.context.namespace,
+            container=helper_pod.container_name,
+            command=["/bin/sh", "-c", command],
+            stderr=True,
+            stdout=True,
+            tty=False,
+            **kwargs,
+        )
+
+    def _wait(self, response, stdout=None) -> tuple:
+        """reads the command output until it exits, returns its exit code and stderr"""
+        stderr = b""
+        deadline = time.monotonic() + self.timeout
+
+        def drain():
+            nonlocal stderr
+            if response.peek_stdout():
+                data = response.read_stdout()
+                if stdout is not None:
+                    stdout.write(data)
+            if response.peek_stderr():
+                stderr += response.read_stderr()
+
+        while response.is_open():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"command not complete after {self.timeout}s")
+            response.update(timeout=1)
+            drain()
+        drain()
+
+        return response.returncode, stderr.decode("utf-8", errors="replace").strip()
+
+    def exec(self, command) -> str:
+        """Runs a shell command in the helper pod
+
+        Returns:
+            str: the command output
+
+        Raises:
+            RuntimeError: if the command exits with a non-zero status
+        """
+        output = io.BytesIO()
+        response = self._stream(command, stdin=False, binary=True, _preload_content=False)
+        try:
+            returncode, stderr = self._wait(response, stdout=output)
+        finally:
+            response.close()
+
+        if returncode != 0:
+            raise RuntimeError(f"command {command} failed with exit code {returncode}: {stderr}")
+        return output.getvalue().decode("utf-8", errors="replace")
+
+    def upload(self, source_path, volume_path):
+        """copies a local file to the volume"""
+        with tempfile.TemporaryFile() as tar_buffer:
+            with tarfile.open(fileobj=tar_buffer, mode="w", format=tarfile.GNU_FORMAT) as tar:
+                tar.add(source_path, arcname=os.path.basename(volume_path))
+            size = tar_buffer.tell()
+            tar_buffer.seek(0)
+
+            # stdin is not closed by the exec protocol, tar reads exactly the archive
+            response = self._stream(
+                f"head -c {size} | tar xf - -C {shlex.quote(os.path.dirname(volume_path))}",
+                stdin=True,
+                binary=True,
+                _preload_content=False,
+            )
+            try:
+                for chunk in iter(lambda: tar_buffer.read(self.chunk_size), b""):
+                    response.write_stdin(chunk)
+                returncode, stderr = self._wait(response)
+            finally:
+                response.close()
+
+        if returncode != 0:
+            raise RuntimeError(f"{source_path} not copied to {volume_path}: {stderr}")
+
+    def download(self, volume_paths, destination=".") -> list:
+        """Copies volume files to a local folder
+
+        Args:
+            volume_paths (list): the volume file paths
+            destination (str): the local folder the files are copied to, by name
+
+        Returns:
+            list: the local paths of the files copied
+        """
+        quoted = " ".join(shlex.quote(path) for path in volume_paths)
+
+        local_paths = []
+        with tempfile.TemporaryFile() as tar_buffer:
+            response = self._stream(
+                f"tar cf - {quoted}", stdin=False, binary=True, _preload_content=False
+            )
+            try:
+                returncode, stderr = self._wait(response, stdout=tar_buffer)
+            finally:
+                response.close()
+
+            if returncode != 0:
+                logger.warning(f"volume files not all copied: {stderr}")
+            if tar_buffer.tell() == 0:
+                return local_paths
+
+            tar_buffer.seek(0)
+            with tarfile.open(fileobj=tar_buffer, mode="r:") as tar:
+                for member in tar:
+                    if not member.isfile():
+                        continue
+                    local_path = os.path.join(destination, os.path.basename(member.name))
+                    with tar.extractfile(member) as src, open(local_path, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    local_paths.append(local_path)
+
+        return local_paths
+
+
+class VolumeStager:
+    """Stages local files to the Calrissian RWX volume
+
+    The files are hashed and de-duplicated by content, the files already present on the
+    volume with the same content are skipped and the remaining files are copied
+    concurrently through the helper pod of the session volume. Files larger than
+    `compress_threshold` bytes are gzip-compressed for the transfer and decompressed
+    in the helper pod.
+
+    Args:
+        volume (SessionVolume): the session volume
+        mount_path (str): where the volume is mounted in the helper pod
+        max_workers (int): number of concurrent transfers
+        compress_threshold (int): size in bytes above which files are compressed,
+            None to disable the compression
+    """
+
+    def __init__(
+        self,
+        volume: SessionVolume,
+        mount_path="/calrissian",
+        max_workers=4,
+        compress_threshold=None,
+    ):
+        self.volume = volume
+        self.mount_path = mount_path
+        self.max_workers = max_workers
+        self.compress_threshold = compress_threshold
+
+    def _exec(self, command) -> str:
+        return self.volume.exec(command)
+
+    def _get_volume_digests(self, volume_paths) -> dict:
+        """returns the sha256 digest of the volume files that exist"""
+        quoted = " ".join(shlex.quote(path) for path in volume_paths)
+        output = self._exec(f"sha256sum {quoted} 2>/dev/null || true")
+
+        digests = {}
+        for line in output.splitlines():
+            parts = line.split(maxsplit=1)
+            if len(parts) == 2:
+                digests[parts[1].strip()] = parts[0]
+        return digests
+
+    def _upload(self, source_path, volume_path):
+        size = os.path.getsize(source_path)
+
+        if self.compress_threshold is None or size <= self.compress_threshold:
+            logger.info(f"copy {source_path} to {volume_path}")
+            self.volume.upload(source_path, volume_path)
+            return
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            compressed = os.path.join(tmp_dir, f"{os.path.basename(volume_path)}.gz")
+            with open(source_path, "rb") as src, gzip.open(compressed, "wb", compresslevel=1) as dst:
+                shutil.copyfileobj(src, dst)
+
+            logger.info(
+                f"copy {source_path} to {volume_path} compressed "
+                f"({size} bytes, {os.path.getsize(compressed)} bytes compressed)"
+            )
+            self.volume.upload(compressed, f"{volume_path}.gz")
+
+        self._exec(f"gunzip -f {shlex.quote(volume_path + '.gz')}")
+
+    def plan(self, source_paths, digests) -> dict:
+        """Returns the volume path of each source path
+
+        Files with the same content share the same volume path. Files with the same name
+        and a different content are placed in a sub-folder named after their digest.
+        """
+        volume_paths = {}
+        by_digest = {}
+        by_name = {}
+
+        for source_path in source_paths:
+            digest = digests[source_path]
+            if digest in by_digest:
+                volume_paths[source_path] = by_digest[digest]
+                continue
+
+            name = os.path.basename(source_path)
+            if name in by_name and by_name[name] != digest:
+                volume_path = os.path.join(self.mount_path, digest[:12], name)
+            else:
+                volume_path = os.path.join(self.mount_path, name)
+
+            by_name.setdefault(name, digest)
+            by_digest[digest] = volume_path
+            volume_paths[source_path] = volume_path
+
+        return volume_paths
+
+    def stage(self, source_paths) -> dict:
+        """Stages the files to the volume
+
+        Args:
+            source_paths (list): the local file paths
+
+        Returns:
+            dict: the volume path of each source path
+        """
+        source_paths = list(dict.fromkeys(source_paths))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            digests = dict(zip(source_paths, executor.map(file_digest, source_paths)))
+
+        volume_paths = self.plan(source_paths, digests)
+
+        # one upload per volume path, from the source path the volume path is named after
+        uploads = {}
+        for source_path, volume_path in volume_paths.items():
+            uploads.setdefault(volume_path, (source_path, digests[source_path]))
+
+        existing = self._get_volume_digests(uploads.keys())
+        for volume_path, (_, digest) in list(uploads.items()):
+            if existing.get(volume_path) == digest:
+                logger.info(f"{volume_path} already on the volume, skipping it")
+                del uploads[volume_path]
+
+        sub_folders = {os.path.dirname(path) for path in uploads} - {self.mount_path}
+        if sub_folders:
+            self._exec("mkdir -p " + " ".join(shlex.quote(path) for path in sub_folders))
+
+        logger.info(
+            f"stage {len(uploads)} file(s) to the volume "
+            f"({len(source_paths) - len(uploads)} de-duplicated or already staged)"
+        )
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in [
+                executor.submit(self._upload, source_path, volume_path)
+                for volume_path, (source_path, _) in uploads.items()
+            ]:
+                future.result()
+
+        return volume_paths
@@ -0,0 +1,219 @@
+import argparse
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from kubernetes.utils import parse_quantity
+from loguru import logger
+from pycalrissian.context import CalrissianContext
+
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+MANAGED_BY = "zoo-calrissian-runner"
+WORKFLOW_ID_LABEL = "zoo-calrissian-runner/workflow-id"
+KEEP_SESSION_LABEL = "zoo-calrissian-runner/keep-session"
+POOLED_LABEL = "zoo-calrissian-runner/pooled"
+
+
+def label_value(value) -> str:
+    """returns a valid Kubernetes label value"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "-", str(value))[:63].strip("-_.")
+
+
+def session_labels(workflow_id=None, keep_session=False, pooled=False) -> dict:
+    """Returns the labels of the namespaces created by the runner
+
+    Args:
+        workflow_id (str): the workflow id (CWL entry point)
+        keep_session (bool): True if the namespace is not deleted after the execution
+        pooled (bool): True if the namespace belongs to the session pool
+
+    Returns:
+        dict: the namespace labels
+    """
+    labels = {MANAGED_BY_LABEL: MANAGED_BY}
+    if workflow_id is not None:
+        labels[WORKFLOW_ID_LABEL] = label_value(workflow_id)
+    if keep_session:
+        labels[KEEP_SESSION_LABEL] = "true"
+    if pooled:
+        labels[POOLED_LABEL] = "true"
+    return labels
+
+
+class NamespaceSweeper:
+    """Deletes the namespaces left behind by the runner
+
+    A namespace labelled as created by the runner is deleted if it is older than
+    `max_age` seconds (`kept_max_age` seconds if created with KEEP_SESSION=true) and
+    none of its jobs is running. The pooled namespaces are skipped unless
+    `include_pooled` is True.
+
+    Args:
+        core_v1_api (CoreV1Api): the Kubernetes core API
+        batch_v1_api (BatchV1Api): the Kubernetes batch API
+        max_age (float): age in seconds after which a namespace is orphaned
+        kept_max_age (float): age in seconds after which a kept namespace is orphaned
+        include_pooled (bool): also sweep the session pool namespaces
+        max_workers (int): number of namespaces checked and deleted concurrently
+        dry_run (bool): report the orphaned namespaces without deleting them
+    """
+
+    def __init__(
+        self,
+        core_v1_api,
+        batch_v1_api,
+        max_age=6 * 3600,
+        kept_max_age=72 * 3600,
+        include_pooled=False,
+        max_workers=8,
+        dry_run=False,
+    ):
+        self.core_v1_api = core_v1_api
+        self.batch_v1_api = batch_v1_api
+        self.max_age = max_age
+        self.kept_max_age = kept_max_age
+        self.include_pooled = include_pooled
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+
+    def get_candidates(self, now=None) -> list:
+        """returns the runner namespaces old enough to be swept"""
+        now = now or datetime.now(timezone.utc)
+        candidates = []
+
+        for namespace in self.core_v1_api.list_namespace(
+            label_selector=f"{MANAGED_BY_LABEL}={MANAGED_BY}"
+        ).items:
+            labels = namespace.metadata.labels or {}
+            name = namespace.metadata.name
+
+            if namespace.status is not None and namespace.status.phase == "Terminating":
+                continue
+            if labels.get(POOLED_LABEL) == "true" and not self.include_pooled:
+                continue
+
+            max_age = self.kept_max_age if labels.get(KEEP_SESSION_LABEL) == "true" else self.max_age
+            age = (now - namespace.metadata.creation_timestamp).total_seconds()
+            if age < max_age:
+                logger.debug(f"namespace {name} is {age:.0f}s old, keeping it")
+                continue
+
+            candidates.append(name)
+
+        return candidates
+
+    def has_running_jobs(self, namespace) -> bool:
+        """returns True if a job of the namespace is neither complete nor failed"""
+        for job in self.batch_v1_api.list_namespaced_job(namespace=namespace).items:
+            conditions = job.status.conditions or []
+            if not any(
+                condition.type in ["Complete", "Failed"] and condition.status == "True"
+                for condition in conditions
+            ):
+                return True
+        return False
+
+    def get_storage(self, namespace) -> int:
+        """returns the storage in bytes requested by the persistent volume claims"""
+        storage = 0
+        for claim in self.core_v1_api.list_namespaced_persistent_volume_claim(namespace=namespace).items:
+            capacity = (claim.status.capacity if claim.status else None) or {}
+            requests = (claim.spec.resources.requests if claim.spec.resources else None) or {}
+            size = capacity.get("storage") or requests.get("storage")
+            if size:
+                storage += int(parse_quantity(size))
+        return storage
+
+    def _sweep(self, namespace) -> tuple:
+        if self.has_running_jobs(namespace):
+            logger.info(f"namespace {namespace} has running jobs, keeping it")
+            return "running", 0
+
+        storage = self.get_storage(namespace)
+        if self.dry_run:
+            logger.info(f"namespace {namespace} is orphaned ({storage} bytes)")
+            return "orphaned", storage
+
+        try:
+            self.core_v1_api.delete_namespace(name=namespace, propagation_policy="Background")
+        except ApiException as e:
+            if e.status != 404:
+                raise e
+        logger.info(f"namespace {namespace} deleted ({storage} bytes reclaimed)")
+        return "deleted", storage
+
+    def sweep(self) -> dict:
+        """Deletes the orphaned namespaces
+
+        Returns:
+            dict: the deleted (or orphaned with dry_run), running and failed namespaces
+            and the reclaimed storage in bytes
+        """
+        candidates = self.get_candidates()
+        logger.info(f"{len(candidates)} namespace(s) old enough to be swept")
+
+        report = {"deleted": [], "orphaned": [], "running": [], "failed": [], "reclaimed_bytes": 0}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {namespace: executor.submit(self._sweep, namespace) for namespace in candidates}
+
+        for namespace, future in futures.items():
+            try:
+                outcome, storage = future.result()
+            except Exception as e:
+                logger.error(f"namespace {namespace} not swept: {e}")
+                report["failed"].append(namespace)
+                continue
+
+            report[outcome].append(namespace)
+            if outcome in ["deleted", "orphaned"]:
+                report["reclaimed_bytes"] += storage
+
+        return report
+
+
+def main():
+    """Deletes the namespaces left behind by crashed or kept runner executions"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        "--max-age", type=float, default=6 * 3600, help="age in seconds of an orphaned namespace"
+    )
+    parser.add_argument(
+        "--kept-max-age",
+        type=float,
+        default=72 * 3600,
+        help="age in seconds of an orphaned namespace created with KEEP_SESSION=true",
+    )
+    parser.add_argument(
+        "--include-pooled", action="store_true", help="also sweep the session pool namespaces"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="namespaces deleted concurrently")
+    parser.add_argument("--dry-run", action="store_true", help="report without deleting")
+    args = parser.parse_args()
+
+    api_client = CalrissianContext._get_api_client()
+    sweeper = NamespaceSweeper(
+        core_v1_api=client.CoreV1Api(api_client),
+        batch_v1_api=client.BatchV1Api(api_client),
+        max_age=args.max_age,
+        kept_max_age=args.kept_max_age,
+        include_pooled=args.include_pooled,
+        max_workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    report = sweeper.sweep()
+
+    logger.info(
+        f"{len(report['orphaned' if args.dry_run else 'deleted'])} namespace(s) "
+        f"{'orphaned' if args.dry_run else 'deleted'}, "
+        f"{report['reclaimed_bytes'] / 2**30:.2f} GiB "
+        f"{'reclaimable' if args.dry_run else 'reclaimed'}"
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()